@@ -0,0 +1,175 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+'''Validation of many templates in one go.
+
+The templates are parsed by a pool of worker processes. Each worker loads
+the definitions of the TOSCA profiles once and shares the imported files
+it loads between the templates it parses, e.g.:
+
+    from toscaparser import batch
+    for result in batch.validate_templates(paths, workers=4):
+        print(result.path, result.valid)
+'''
+
+from concurrent import futures
+import contextlib
+import contextvars
+import logging
+import os
+import time
+
+from toscaparser.common.exception import ValidationError
+from toscaparser.diagnostics import Diagnostic
+from toscaparser.diagnostics import get_diagnostics
+from toscaparser.elements.definitions import get_definitions
+from toscaparser.tosca_template import ToscaTemplate
+from toscaparser.utils.gettextutils import _
+from toscaparser.utils.urlutils import UrlUtils
+from toscaparser.utils import yamlparser
+
+log = logging.getLogger('tosca')
+
+
+class BatchResult(object):
+    '''The result of the validation of one template of a batch.'''
+
+    def __init__(self, index, path, errors, elapsed):
+        # position of the template in the paths validated
+        self.index = index
+        self.path = path
+        # the Diagnostic of each error found
+        self.errors = errors
+        # seconds taken to parse the template
+        self.elapsed = elapsed
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    def to_dict(self):
+        '''Return the result as a dict of JSON types.'''
+        return {'index': self.index,
+                'path': self.path,
+                'valid': self.valid,
+                'errors': [error.to_dict() for error in self.errors],
+                'elapsed': round(self.elapsed, 6)}
+
+
+def validate_template(path, parsed_params=None, max_errors=None):
+    '''Validate the template or CSAR path, a file or a URL.
+
+    Return the Diagnostic of each error found, at most max_errors if set,
+    see ToscaTemplate.
+    '''
+    # parsed in a new context, to find the errors collected once raised
+    return contextvars.Context().run(_get_errors, path, parsed_params,
+                                     max_errors)
+
+
+def validate_templates(paths, parsed_params=None, workers=None,
+                       ordered=False, max_errors=None):
+    '''Validate the templates or CSARs paths, yield a BatchResult for each.
+
+    The templates are parsed by workers processes, one per CPU by default,
+    or in the current process if workers is 1. The results are yielded as
+    soon as they are available, in the order of paths if ordered is True.
+    With max_errors set, each template fails fast after max_errors errors.
+    '''
+    paths = list(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(paths))
+    # loaded before the workers are started, which may inherit them
+    _load_profiles()
+    if workers <= 1:
+        with _sharing_loads():
+            for index, path in enumerate(paths):
+                yield _validate(index, path, parsed_params, max_errors)
+        return
+
+    # the templates are sent to the workers by chunks, to share the cost
+    # of the communication with the workers, which are kept busy
+    size = max(1, min(16, len(paths) // (workers * 4)))
+    executor = futures.ProcessPoolExecutor(max_workers=workers,
+                                           initializer=_init_worker)
+    items = list(enumerate(paths))
+    tasks = []
+    try:
+        for start in range(0, len(items), size):
+            tasks.append(executor.submit(_validate_chunk,
+                                         items[start:start + size],
+                                         parsed_params, max_errors))
+        for task in tasks if ordered else futures.as_completed(tasks):
+            for result in task.result():
+                yield result
+    finally:
+        # the templates not parsed yet are dropped if the caller stops early
+        # (shutdown(cancel_futures=True) needs Python 3.9)
+        for task in tasks:
+            task.cancel()
+        executor.shutdown()
+
+
+def _init_worker():
+    if yamlparser.get_load_cache() is None:
+        yamlparser.set_load_cache(yamlparser.LoadCache())
+    _load_profiles()
+
+
+def _load_profiles():
+    for version in ToscaTemplate.VALID_TEMPLATE_VERSIONS:
+        get_definitions(version)
+
+
+@contextlib.contextmanager
+def _sharing_loads():
+    if yamlparser.get_load_cache() is not None:
+        yield
+        return
+    yamlparser.set_load_cache(yamlparser.LoadCache())
+    try:
+        yield
+    finally:
+        yamlparser.set_load_cache(None)
+
+
+def _validate(index, path, parsed_params, max_errors):
+    start = time.perf_counter()
+    errors = validate_template(path, parsed_params, max_errors)
+    return BatchResult(index, path, errors, time.perf_counter() - start)
+
+
+def _validate_chunk(chunk, parsed_params, max_errors):
+    return [_validate(index, path, parsed_params, max_errors)
+            for index, path in chunk]
+
+
+def _get_errors(path, parsed_params, max_errors):
+    if os.path.isfile(path):
+        a_file = True
+    elif UrlUtils.validate_url(path):
+        a_file = False
+    else:
+        return [Diagnostic.from_exception(
+            ValueError(_('"%(path)s" is not a valid file.')
+                       % {'path': path}), path)]
+    try:
+        ToscaTemplate(path, parsed_params, a_file, collect_traces=False,
+                      max_errors=max_errors)
+    except ValidationError as e:
+        return get_diagnostics(path=path) or \
+            [Diagnostic.from_exception(e, path)]
+    except Exception as e:
+        log.debug('Failed to parse "%s".', path, exc_info=True)
+        return [Diagnostic.from_exception(e, path)]
+    return []
@@ -13,6 +13,8 @@
 '''
 TOSCA exception classes
 '''
+import contextlib
+import contextvars
 import logging
 import sys
 import traceback
@@ -171,40 +173,247 @@ class InvalidGroupTargetException(TOSCAException):
     msg_fmt = _('"%(message)s"')
 
 
-class ExceptionCollector(object):
+class StopCollecting(BaseException):
+    '''Stop a fail-fast parse which collected its maximum of errors.
+
+    It is raised by ExceptionCollector and derives from BaseException, not
+    to be handled as one of the errors of the parse.
+    '''
+
+
+class _CollectorState(object):
+    '''Exceptions collected while parsing one template.'''
+
+    def __init__(self, collecting=False, previous=None, trace=True,
+                 listener=None, max_errors=None):
+        self.exceptions = []
+        # messages of the collected exceptions, to find duplicates
+        self.keys = set()
+        self.collecting = collecting
+        self.trace = trace
+        # called with each exception collected, when it is
+        self.listener = listener
+        # StopCollecting is raised once that many exceptions are collected
+        self.max_errors = max_errors
+        # the state of an enclosing parse, restored when this one stops
+        self.previous = previous
+
+    @property
+    def failing(self):
+        '''Whether the parse fails fast and already found an error.'''
+        return self.max_errors is not None and bool(self.exceptions)
+
+    def add(self, exception):
+        key = str(exception)
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        self.exceptions.append(exception)
+        if self.listener is not None:
+            self.listener(exception)
+        if self.max_errors is not None and \
+                len(self.exceptions) >= self.max_errors:
+            raise StopCollecting()
+        return True
+
+    def replace(self, exceptions):
+        '''Replace the exceptions collected, without their duplicates.'''
+        del self.exceptions[:]
+        self.keys.clear()
+        for exception in exceptions:
+            key = str(exception)
+            if key not in self.keys:
+                self.keys.add(key)
+                self.exceptions.append(exception)
+
+
+_collector_state = contextvars.ContextVar('tosca_exception_collector')
+
+# keys of the part of the template being parsed, from its root
+_location = contextvars.ContextVar('tosca_exception_location', default=())
+
+
+def _get_state():
+    state = _collector_state.get(None)
+    if state is None:
+        state = _CollectorState()
+        _collector_state.set(state)
+    return state
+
+
+class _Location(object):
+    '''Set the location of the errors collected in a block.'''
+
+    __slots__ = ('keys', 'token')
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __enter__(self):
+        self.token = _location.set(self.keys)
+
+    def __exit__(self, *exc_info):
+        _location.reset(self.token)
+
+
+class _ExceptionCollectorType(type):
+    '''Expose the state of the current context as class attributes.'''
+
+    @property
+    def exceptions(cls):
+        return _get_state().exceptions
+
+    @property
+    def collecting(cls):
+        return _get_state().collecting
 
-    exceptions = []
-    collecting = False
+
+class ExceptionCollector(object, metaclass=_ExceptionCollectorType):
+    '''Collect the exceptions raised while parsing a template.
+
+    The collected exceptions are kept per context (see contextvars), so
+    templates parsed in different threads or asyncio tasks do not see the
+    exceptions of each other. A parse started while another one is
+    collecting in the same context gets its own list of exceptions and
+    the enclosing one is restored when it stops.
+    '''
 
     @staticmethod
     def clear():
-        del ExceptionCollector.exceptions[:]
+        state = _get_state()
+        del state.exceptions[:]
+        state.keys.clear()
 
     @staticmethod
-    def start():
-        ExceptionCollector.clear()
-        ExceptionCollector.collecting = True
+    def start(trace=True, listener=None, max_errors=None):
+        '''Start collecting exceptions in the current context.
+
+        With trace set to False the stack is not recorded for the collected
+        exceptions, which makes collecting many errors much cheaper. Their
+        report then has no trace, even if a full report is requested.
+        listener is called with each exception as soon as it is collected.
+        With max_errors set, StopCollecting is raised by the collection of
+        the max_errors-th exception, to stop the parse early.
+        '''
+        state = _get_state()
+        previous = state if state.collecting else None
+        state = _CollectorState(True, previous, trace, listener, max_errors)
+        _collector_state.set(state)
+        return state
 
     @staticmethod
     def stop():
-        ExceptionCollector.collecting = False
+        state = _get_state()
+        state.collecting = False
+        if state.previous is not None:
+            _collector_state.set(state.previous)
+            state.previous = None
+        return state
+
+    @staticmethod
+    @contextlib.contextmanager
+    def capture():
+        '''Collect the exceptions of a block into a separate state.
+
+        The state is yielded, its exceptions can be added to the current
+        state later on with appendExceptions(), e.g. to report errors found
+        in worker threads in a deterministic order.
+        '''
+        captured = _CollectorState(True, None, _get_state().trace)
+        token = _collector_state.set(captured)
+        try:
+            yield captured
+        finally:
+            _collector_state.reset(token)
+
+    @staticmethod
+    def current():
+        '''Return the state of the current context, see resume().'''
+        return _get_state()
+
+    @staticmethod
+    @contextlib.contextmanager
+    def resume(state):
+        '''Collect the exceptions of a block into state.
+
+        state is one returned by start() or current(), possibly stopped
+        since, e.g. to collect the errors found in the parts of a lazy
+        template parsed after its construction.
+        '''
+        collecting = state.collecting
+        state.collecting = True
+        token = _collector_state.set(state)
+        try:
+            yield state
+        finally:
+            state.collecting = collecting
+            _collector_state.reset(token)
+
+    @staticmethod
+    def location(*keys):
+        '''Locate the exceptions collected in a block in the template.
+
+        keys are those of the part of the template parsed in the block,
+        from the root of the template, e.g. 'topology_template',
+        'node_templates' and the name of a node template. The location is
+        recorded in the location attribute of the exceptions.
+        '''
+        return _Location(keys)
+
+    @staticmethod
+    def sublocation(*keys):
+        '''Same as location(), keys being relative to the current one.'''
+        return _Location(_location.get() + keys)
+
+    @staticmethod
+    def failing():
+        '''Whether the current parse fails fast and found an error.
+
+        The parts of the template which are only validated, and are
+        expensive to, can then be skipped: the template is invalid anyway.
+        '''
+        return _get_state().failing
 
     @staticmethod
     def contains(exception):
-        for ex in ExceptionCollector.exceptions:
-            if str(ex) == str(exception):
-                return True
-        return False
+        return str(exception) in _get_state().keys
 
     @staticmethod
     def appendException(exception):
-        if ExceptionCollector.collecting:
-            if not ExceptionCollector.contains(exception):
-                exception.trace = traceback.extract_stack()[:-1]
-                ExceptionCollector.exceptions.append(exception)
+        state = _get_state()
+        if state.collecting:
+            if str(exception) not in state.keys:
+                exception.trace = ExceptionCollector._extract_stack() \
+                    if state.trace else None
+                exception.location = _location.get()
+                state.add(exception)
         else:
             raise exception
 
+    @staticmethod
+    def appendExceptions(exceptions):
+        '''Append exceptions collected elsewhere, keeping their traces.'''
+        state = _get_state()
+        for exception in exceptions:
+            if not state.collecting:
+                raise exception
+            state.add(exception)
+
+    @staticmethod
+    def _extract_stack():
+        # Same as traceback.extract_stack() without the frame of
+        # appendException, except that the source lines are only read
+        # when the trace is reported.
+        stack = []
+        frame = sys._getframe(2)
+        while frame is not None:
+            stack.append(traceback.FrameSummary(
+                frame.f_code.co_filename, frame.f_lineno,
+                frame.f_code.co_name, lookup_line=False))
+            frame = frame.f_back
+        stack.reverse()
+        return traceback.StackSummary(stack)
+
     @staticmethod
     def exceptionsCaught():
         return len(ExceptionCollector.exceptions) > 0
@@ -212,7 +421,7 @@ class ExceptionCollector(object):
     @staticmethod
     def getTraceString(traceList):
         traceString = ''
-        for entry in traceList:
+        for entry in traceList or ():
             f, l, m, c = entry[0], entry[1], entry[2], entry[3]
             traceString += (_('\t\tFile %(file)s, line %(line)s, in '
                               '%(method)s\n\t\t\t%(call)s\n')
@@ -222,7 +431,7 @@ class ExceptionCollector(object):
     @staticmethod
     def getExceptionReportEntry(exception, full=True):
         entry = exception.__class__.__name__ + ': ' + str(exception)
-        if full:
+        if full and getattr(exception, 'trace', None):
             entry += '\n' + ExceptionCollector.getTraceString(exception.trace)
         return entry
 
@@ -231,9 +440,11 @@ class ExceptionCollector(object):
         return ExceptionCollector.exceptions
 
     @staticmethod
-    def getExceptionsReport(full=True):
+    def getExceptionsReport(full=True, exceptions=None):
+        if exceptions is None:
+            exceptions = ExceptionCollector.exceptions
         report = []
-        for exception in ExceptionCollector.exceptions:
+        for exception in exceptions:
             report.append(
                 ExceptionCollector.getExceptionReportEntry(exception, full))
         return report
@@ -10,20 +10,182 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 from toscaparser.common.exception import ExceptionCollector
 from toscaparser.common.exception import MissingRequiredFieldError
 from toscaparser.common.exception import TypeMismatchError
 from toscaparser.common.exception import UnknownFieldError
 from toscaparser.elements.constraints import Schema
 from toscaparser.elements.datatype import DataType
+from toscaparser.elements.definitions import get_tosca_def
 from toscaparser.elements.portspectype import PortSpec
 from toscaparser.elements.scalarunit import ScalarUnit_Frequency
 from toscaparser.elements.scalarunit import ScalarUnit_Size
 from toscaparser.elements.scalarunit import ScalarUnit_Time
+from toscaparser.elements.type_registry import TypeRegistry
 from toscaparser.utils.gettextutils import _
+from toscaparser.utils import profiling
 from toscaparser.utils import validateutils
 
 
+def _validate_timestamp(value):
+    validateutils.validate_timestamp(value)
+    return value
+
+
+def _validate_version(value):
+    return validateutils.TOSCAVersionProperty(value).get_version()
+
+
+def _scalar_unit_validator(scalar_unit_class):
+    def validate(value):
+        return scalar_unit_class(value).validate_scalar_unit()
+    return validate
+
+
+# validators of the values of the types without entry or key schema, see
+# DataEntity.validate_datatype()
+_PRIMITIVE_VALIDATORS = {
+    Schema.STRING: validateutils.validate_string,
+    Schema.INTEGER: validateutils.validate_integer,
+    Schema.FLOAT: validateutils.validate_float,
+    Schema.NUMBER: validateutils.validate_numeric,
+    Schema.BOOLEAN: validateutils.validate_boolean,
+    Schema.RANGE: validateutils.validate_range,
+    Schema.TIMESTAMP: _validate_timestamp,
+    Schema.SCALAR_UNIT_SIZE: _scalar_unit_validator(ScalarUnit_Size),
+    Schema.SCALAR_UNIT_FREQUENCY: _scalar_unit_validator(ScalarUnit_Frequency),
+    Schema.SCALAR_UNIT_TIME: _scalar_unit_validator(ScalarUnit_Time),
+    Schema.VERSION: _validate_version,
+}
+
+# classes of the values known to be valid for the primitive types whose
+# lists and maps are validated in bulk, see DataEntity.validate_values()
+_BULK_TYPES = {
+    Schema.STRING: (str,),
+    Schema.INTEGER: (int,),
+    Schema.FLOAT: (float,),
+    Schema.NUMBER: (int, float),
+    Schema.BOOLEAN: (bool,),
+}
+
+
+class DataTypeValidator(object):
+    '''Validator of the values of a complex data type.
+
+    The properties of the type and of its parent types are looked up once,
+    when the validator is built: validating a value, and the values nested
+    in it, does not build any type object.
+    '''
+
+    def __init__(self, datatype, properties=None):
+        self.type = datatype.type
+        self.value_type = datatype.value_type
+        self.defs = datatype.defs
+        if properties is None:
+            properties = datatype.get_all_properties()
+        # schema definition of each property, and the required ones and
+        # default values, as DataEntity.validate() used to compute them
+        self.properties = {name: prop.schema
+                           for name, prop in properties.items()}
+        self.required = [name for name, prop in properties.items()
+                         if prop.required]
+        self.defaults = {name: prop.default
+                         for name, prop in properties.items()
+                         if prop.default}
+
+    @classmethod
+    def get(cls, datatypename, custom_def=None):
+        '''Return the validator of a data type, built once per type.
+
+        Validators are kept with the types resolved by the TypeRegistry of
+        the definitions. The validator of an invalid type is built each
+        time, which reports its errors again.
+        '''
+        resolved = TypeRegistry.get(get_tosca_def(custom_def),
+                                    custom_def).resolve(
+            datatypename, DataType.DATATYPE_NETWORK_PREFIX)
+        if resolved.defs is None:
+            return cls(DataType(datatypename, custom_def))
+        validator = resolved.memoized(cls)
+        if validator is not None:
+            return validator
+        if not ExceptionCollector.collecting:
+            # the first error found is raised
+            validator = cls(DataType(datatypename, custom_def))
+            return resolved.memoize(cls, lambda: validator)
+        try:
+            with ExceptionCollector.capture() as captured:
+                validator = cls(DataType(datatypename, custom_def))
+        finally:
+            ExceptionCollector.appendExceptions(captured.exceptions)
+        if captured.exceptions:
+            return validator
+        return resolved.memoize(cls, lambda: validator)
+
+    def validate(self, value, custom_def=None, prop_name=None):
+        '''Validate value, return it with the default values added.'''
+
+        # A datatype can not have both 'type' and 'properties' definitions.
+        # If the datatype has 'type' definition
+        if self.value_type:
+            value = DataEntity.validate_datatype(self.value_type, value, None,
+                                                 custom_def)
+            schema = Schema.get(prop_name, self.defs)
+            for constraint in schema.constraints:
+                constraint.validate(value)
+            return value
+
+        # If the datatype has 'properties' definition
+        if not isinstance(value, dict):
+            ExceptionCollector.appendException(
+                TypeMismatchError(what=value, type=self.type))
+
+        # check allowed field
+        for value_key in list(value.keys()):
+            if value_key not in self.properties:
+                ExceptionCollector.appendException(
+                    UnknownFieldError(what=(_('Data value of type "%s"')
+                                            % self.type),
+                                      field=value_key))
+
+        # check default field
+        for def_key, def_value in self.defaults.items():
+            if def_key not in value:
+                value[def_key] = def_value
+
+        # check missing field
+        missingprop = [req_key for req_key in self.required
+                       if req_key not in value]
+        if missingprop:
+            ExceptionCollector.appendException(
+                MissingRequiredFieldError(
+                    what=(_('Data value of type "%s"') % self.type),
+                    required=missingprop))
+
+        # check every field
+        for name, item in list(value.items()):
+            schema_dict = self.properties.get(name)
+            if not schema_dict:
+                continue
+            prop_schema = Schema.get(name, schema_dict)
+            # check if field value meets type defined
+            DataEntity.validate_datatype(prop_schema.type, item,
+                                         prop_schema.compiled_entry_schema,
+                                         custom_def, None,
+                                         prop_schema.compiled_key_schema)
+            # check if field value meets constraints defined
+            for constraint in prop_schema.constraints:
+                if isinstance(item, list):
+                    for val in item:
+                        constraint.validate(val)
+                else:
+                    constraint.validate(item)
+
+        return value
+
+
 class DataEntity(object):
     '''A complex data value entity.'''
 
@@ -37,78 +199,9 @@ class DataEntity(object):
 
     def validate(self):
         '''Validate the value by the definition of the datatype.'''
-
-        # A datatype can not have both 'type' and 'properties' definitions.
-        # If the datatype has 'type' definition
-        if self.datatype.value_type:
-            self.value = DataEntity.validate_datatype(self.datatype.value_type,
-                                                      self.value,
-                                                      None,
-                                                      self.custom_def)
-            schema = Schema(self.property_name, self.datatype.defs)
-            for constraint in schema.constraints:
-                constraint.validate(self.value)
-        # If the datatype has 'properties' definition
-        else:
-            if not isinstance(self.value, dict):
-                ExceptionCollector.appendException(
-                    TypeMismatchError(what=self.value,
-                                      type=self.datatype.type))
-            allowed_props = []
-            required_props = []
-            default_props = {}
-            if self.schema:
-                allowed_props = self.schema.keys()
-                for name, prop_def in self.schema.items():
-                    if prop_def.required:
-                        required_props.append(name)
-                    if prop_def.default:
-                        default_props[name] = prop_def.default
-
-            # check allowed field
-            for value_key in list(self.value.keys()):
-                if value_key not in allowed_props:
-                    ExceptionCollector.appendException(
-                        UnknownFieldError(what=(_('Data value of type "%s"')
-                                                % self.datatype.type),
-                                          field=value_key))
-
-            # check default field
-            for def_key, def_value in list(default_props.items()):
-                if def_key not in list(self.value.keys()):
-                    self.value[def_key] = def_value
-
-            # check missing field
-            missingprop = []
-            for req_key in required_props:
-                if req_key not in list(self.value.keys()):
-                    missingprop.append(req_key)
-            if missingprop:
-                ExceptionCollector.appendException(
-                    MissingRequiredFieldError(
-                        what=(_('Data value of type "%s"')
-                              % self.datatype.type), required=missingprop))
-
-            # check every field
-            for name, value in list(self.value.items()):
-                schema_name = self._find_schema(name)
-                if not schema_name:
-                    continue
-                prop_schema = Schema(name, schema_name)
-                # check if field value meets type defined
-                DataEntity.validate_datatype(prop_schema.type, value,
-                                             prop_schema.entry_schema,
-                                             self.custom_def, None,
-                                             prop_schema.key_schema)
-                # check if field value meets constraints defined
-                if prop_schema.constraints:
-                    for constraint in prop_schema.constraints:
-                        if isinstance(value, list):
-                            for val in value:
-                                constraint.validate(val)
-                        else:
-                            constraint.validate(value)
-
+        validator = DataTypeValidator(self.datatype, self.schema)
+        self.value = validator.validate(self.value, self.custom_def,
+                                        self.property_name)
         return self.value
 
     def _find_schema(self, name):
@@ -124,36 +217,17 @@ class DataEntity(object):
         If type is a user-defined complex datatype, custom_def is required.
         '''
         from toscaparser.functions import is_function
+        profiling.count('validate.datatype')
         if is_function(value):
             return value
-        if type == Schema.STRING:
-            return validateutils.validate_string(value)
-        elif type == Schema.INTEGER:
-            return validateutils.validate_integer(value)
-        elif type == Schema.FLOAT:
-            return validateutils.validate_float(value)
-        elif type == Schema.NUMBER:
-            return validateutils.validate_numeric(value)
-        elif type == Schema.BOOLEAN:
-            return validateutils.validate_boolean(value)
-        elif type == Schema.RANGE:
-            return validateutils.validate_range(value)
-        elif type == Schema.TIMESTAMP:
-            validateutils.validate_timestamp(value)
-            return value
+        validate = _PRIMITIVE_VALIDATORS.get(type)
+        if validate is not None:
+            return validate(value)
         elif type == Schema.LIST:
             validateutils.validate_list(value)
             if entry_schema:
                 DataEntity.validate_entry(value, entry_schema, custom_def)
             return value
-        elif type == Schema.SCALAR_UNIT_SIZE:
-            return ScalarUnit_Size(value).validate_scalar_unit()
-        elif type == Schema.SCALAR_UNIT_FREQUENCY:
-            return ScalarUnit_Frequency(value).validate_scalar_unit()
-        elif type == Schema.SCALAR_UNIT_TIME:
-            return ScalarUnit_Time(value).validate_scalar_unit()
-        elif type == Schema.VERSION:
-            return validateutils.TOSCAVersionProperty(value).get_version()
         elif type == Schema.MAP:
             validateutils.validate_map(value)
             if key_schema:
@@ -166,37 +240,88 @@ class DataEntity(object):
             # as complex types not just as integers
             PortSpec.validate_additional_req(value, prop_name, custom_def)
         else:
-            data = DataEntity(type, value, custom_def)
-            return data.validate()
+            return DataTypeValidator.get(type, custom_def).validate(
+                value, custom_def)
+
+    @staticmethod
+    def validate_values(schema, values):
+        '''Validate values of the primitive type of schema, in bulk.
+
+        The types of the values are checked, then each constraint is applied
+        to all of them at once. Only the values found invalid are validated
+        one by one, in order, so that their errors are reported as if all
+        the values were. Return False if the type of schema is not one of
+        those validated in bulk.
+        '''
+        from toscaparser.functions import is_function
+        classes = _BULK_TYPES.get(schema.type)
+        if classes is None:
+            return False
+        with ExceptionCollector.capture() as captured:
+            constraints = schema.constraints
+        if captured.exceptions:
+            # reported again where each value is validated
+            return False
+        profiling.count('validate.bulk_values', len(values))
+        # the constraints which may not be met by the value at each index,
+        # and the indexes of the values whose type may not be valid
+        invalid = collections.defaultdict(list)
+        mistyped = set()
+        for index, value in enumerate(values):
+            if not isinstance(value, classes):
+                mistyped.add(index)
+                invalid[index] = []
+        for constraint in constraints:
+            for index in constraint.invalid_indexes(values):
+                invalid[index].append(constraint)
+        validate = _PRIMITIVE_VALIDATORS[schema.type]
+        for index in sorted(invalid):
+            value = values[index]
+            if index in mistyped and not is_function(value):
+                validate(value)
+            for constraint in invalid[index]:
+                constraint.validate(value)
+        return True
 
     @staticmethod
     def validate_entry(value, entry_schema, custom_def=None):
-        '''Validate entries for map and list.'''
-        schema = Schema(None, entry_schema)
+        '''Validate entries for map and list.
+
+        entry_schema is a definition or its Schema.
+        '''
+        schema = entry_schema
+        if not isinstance(schema, Schema):
+            schema = Schema.get(None, entry_schema)
         valuelist = value
         if isinstance(value, dict):
             valuelist = list(value.values())
+        if DataEntity.validate_values(schema, valuelist):
+            return value
         for v in valuelist:
             DataEntity.validate_datatype(schema.type, v,
-                                         schema.entry_schema,
+                                         schema.compiled_entry_schema,
                                          custom_def, None,
-                                         schema.key_schema)
+                                         schema.compiled_key_schema)
             if schema.constraints:
                 for constraint in schema.constraints:
                     constraint.validate(v)
         return value
 
     def validate_key(value, key_schema, custom_def=None):
-        '''Validate keys for map'''
-        schema = Schema(None, key_schema)
+        '''Validate keys for map, key_schema as in validate_entry().'''
+        schema = key_schema
+        if not isinstance(schema, Schema):
+            schema = Schema.get(None, key_schema)
         valuelist = value
         if isinstance(value, dict):
             valuelist = list(value.keys())
+        if DataEntity.validate_values(schema, valuelist):
+            return value
         for v in valuelist:
             DataEntity.validate_datatype(schema.type, v,
-                                         schema.entry_schema,
+                                         schema.compiled_entry_schema,
                                          custom_def, None,
-                                         schema.key_schema)
+                                         schema.compiled_key_schema)
             if schema.constraints:
                 for constraint in schema.constraints:
                     constraint.validate(v)
@@ -0,0 +1,152 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+'''Errors found validating a template, as structured data.
+
+Instead of the report of the ValidationError raised by ToscaTemplate, the
+errors can be processed one by one, as soon as they are found, e.g.:
+
+    from toscaparser import diagnostics
+    for diagnostic in diagnostics.iter_diagnostics(path):
+        print(diagnostic.node, diagnostic.property, diagnostic.message)
+'''
+
+import queue
+import threading
+
+from toscaparser.common.exception import ExceptionCollector
+from toscaparser.common.exception import StopCollecting
+from toscaparser.common.exception import ValidationError
+from toscaparser.topology_template import NODE_TEMPLATES
+from toscaparser.topology_template import TOPOLOGY_TEMPLATE
+from toscaparser.tosca_template import ToscaTemplate
+
+PROPERTIES = 'properties'
+
+# diagnostics found and not yet yielded by iter_diagnostics(), the parse
+# waits for them to be consumed beyond that
+MAX_PENDING = 64
+
+
+class Diagnostic(object):
+    '''An error found validating a template.'''
+
+    def __init__(self, type, message, path=None, location=(), trace=None):
+        # name of the class of the exception
+        self.type = type
+        self.message = message
+        # path or URL of the template validated
+        self.path = path
+        # keys of the part of the template where the error was found, from
+        # the root of the template, empty if unknown
+        self.location = tuple(location)
+        # names of the node template and of the property of the error
+        self.node = None
+        if self.location[:2] == (TOPOLOGY_TEMPLATE, NODE_TEMPLATES) and \
+                len(self.location) > 2:
+            self.node = self.location[2]
+        self.property = None
+        for index in range(len(self.location) - 2, -1, -1):
+            if self.location[index] == PROPERTIES:
+                self.property = self.location[index + 1]
+                break
+        # (file, line, function) of the frames of the stack where the error
+        # was found, if recorded
+        self.trace = trace
+
+    @classmethod
+    def from_exception(cls, exception, path=None):
+        '''Return the diagnostic of an exception collected, or raised.'''
+        trace = getattr(exception, 'trace', None)
+        if trace:
+            trace = [(frame.filename, frame.lineno, frame.name)
+                     for frame in trace]
+        return cls(type(exception).__name__, str(exception), path,
+                   getattr(exception, 'location', None) or (), trace or None)
+
+    def __str__(self):
+        return self.type + ': ' + self.message
+
+    def to_dict(self):
+        '''Return the diagnostic as a dict of JSON types.'''
+        return {'type': self.type,
+                'message': self.message,
+                'path': self.path,
+                'location': list(self.location),
+                'node': self.node,
+                'property': self.property,
+                'trace': [{'file': file, 'line': line, 'function': function}
+                          for file, line, function in self.trace]
+                if self.trace else None}
+
+
+def iter_diagnostics(path=None, parsed_params=None, a_file=True,
+                     yaml_dict_tpl=None, local_defs=None,
+                     collect_traces=False, max_errors=None):
+    '''Validate a template, yield a Diagnostic for each error found.
+
+    The arguments are those of ToscaTemplate. The template is parsed in
+    another thread and the errors are yielded as soon as they are found,
+    in the order of the report of the template. Nothing is yielded if the
+    template is valid. The parse stops at the next error found once the
+    generator is closed, e.g. when the caller stops iterating.
+    '''
+    found = queue.Queue(MAX_PENDING)
+    stopped = threading.Event()
+    done = object()
+
+    def parse():
+        reported = False
+
+        def listener(exception):
+            nonlocal reported
+            if stopped.is_set():
+                raise StopCollecting()
+            reported = True
+            found.put(Diagnostic.from_exception(exception, path))
+        try:
+            ToscaTemplate(path, parsed_params, a_file, yaml_dict_tpl,
+                          local_defs, collect_traces,
+                          error_listener=listener, max_errors=max_errors)
+        except ValidationError as e:
+            if not reported:
+                found.put(Diagnostic.from_exception(e, path))
+        except Exception as e:
+            # an error the parser failed to collect
+            found.put(Diagnostic.from_exception(e, path))
+        finally:
+            found.put(done)
+
+    threading.Thread(target=parse, daemon=True).start()
+    try:
+        while True:
+            diagnostic = found.get()
+            if diagnostic is done:
+                return
+            yield diagnostic
+    finally:
+        stopped.set()
+        # the parse may be waiting for room in the queue, once stopped it
+        # only adds a few more items
+        while True:
+            try:
+                found.get_nowait()
+            except queue.Empty:
+                break
+
+
+def get_diagnostics(exceptions=None, path=None):
+    '''Return the diagnostics of exceptions, those collected by default.'''
+    if exceptions is None:
+        exceptions = ExceptionCollector.getExceptions()
+    return [Diagnostic.from_exception(exception, path)
+            for exception in exceptions]
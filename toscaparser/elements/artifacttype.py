@@ -27,13 +27,7 @@ class ArtifactTypeDef(StatefulEntityType):
         self.parent_artifacts = self._get_parent_artifacts()
 
     def _get_parent_artifacts(self):
-        artifacts = {}
-        parent_artif = self.parent_type.type if self.parent_type else None
-        if parent_artif:
-            while parent_artif != 'tosca.artifacts.Root':
-                artifacts[parent_artif] = self.TOSCA_DEF[parent_artif]
-                parent_artif = artifacts[parent_artif]['derived_from']
-        return artifacts
+        return self.get_parent_types('tosca.artifacts.Root')
 
     @property
     def parent_type(self):
@@ -61,17 +61,7 @@ class CapabilityTypeDef(StatefulEntityType):
             return props_def[name].value
 
     def _get_parent_capabilities(self, custom_def=None):
-        capabilities = {}
-        parent_cap = self.parent_type
-        if parent_cap:
-            parent_cap = parent_cap.type
-            while parent_cap != self.TOSCA_TYPEURI_CAPABILITY_ROOT:
-                if custom_def and parent_cap in custom_def.keys():
-                    capabilities[parent_cap] = custom_def[parent_cap]
-                elif parent_cap in self.TOSCA_DEF.keys():
-                    capabilities[parent_cap] = self.TOSCA_DEF[parent_cap]
-                parent_cap = capabilities[parent_cap]['derived_from']
-        return capabilities
+        return self.get_parent_types(self.TOSCA_TYPEURI_CAPABILITY_ROOT)
 
     @property
     def parent_type(self):
@@ -91,6 +81,9 @@ class CapabilityTypeDef(StatefulEntityType):
         '''
         if self.type in type_names:
             return True
+        resolved = self._get_resolved()
+        if resolved:
+            return not resolved.ancestors.isdisjoint(type_names)
         elif self.parent_type:
             return self.parent_type.inherits_from(type_names)
         else:
@@ -10,9 +10,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import collections.abc
+import copy
 import datetime
 import re
+import threading
 
 import toscaparser
 from toscaparser.common.exception import ExceptionCollector
@@ -20,7 +23,10 @@ from toscaparser.common.exception import InvalidSchemaError
 from toscaparser.common.exception import ValidationError
 from toscaparser.elements.portspectype import PortSpec
 from toscaparser.elements import scalarunit
+from toscaparser.elements.type_registry import TypeRegistry
 from toscaparser.utils.gettextutils import _
+from toscaparser.utils.lazy import LazyAttribute
+from toscaparser.utils import profiling
 
 
 class Schema(collections.abc.Mapping):
@@ -51,6 +57,13 @@ class Schema(collections.abc.Mapping):
                              'GIB': 1073741824, 'TB': 1000000000000,
                              'TIB': 1099511627776}
 
+    # schemas shared by the templates, see get()
+    MAX_SCHEMAS = 4096
+
+    _schemas = collections.OrderedDict()
+    _version = None
+    _lock = threading.Lock()
+
     def __init__(self, name, schema_dict):
         self.name = name
         if not isinstance(schema_dict, collections.abc.Mapping):
@@ -67,7 +80,50 @@ class Schema(collections.abc.Mapping):
 
         self.schema = schema_dict
         self._len = None
-        self.constraints_list = []
+        self.constraints_list = None
+        self._compiled = {}
+
+    @classmethod
+    def get(cls, name, schema_dict):
+        '''Return the Schema of the definition schema_dict, built once.
+
+        Schemas are kept by name and by identity of schema_dict, e.g. the
+        definition of a property in its type: the properties of every
+        template of the type share the same Schema, whose constraints and
+        entry and key schemas are built once. The Schema is built from a
+        read-only copy of schema_dict, the schemas are dropped when the
+        definitions may have changed, see TypeRegistry.clear(). Invalid
+        definitions get a new Schema each time, which reports their errors
+        again.
+        '''
+        if not _is_valid_schema(schema_dict):
+            return cls(name, schema_dict)
+        key = (name, id(schema_dict))
+        with cls._lock:
+            if cls._version != TypeRegistry.version:
+                cls._schemas.clear()
+                cls._version = TypeRegistry.version
+            schema, definition = cls._schemas.get(key, (None, None))
+            # schema_dict is kept with its schema, its id can not be reused
+            if definition is schema_dict:
+                cls._schemas.move_to_end(key)
+                return schema
+            version = cls._version
+        schema = cls(name, _freeze(schema_dict))
+        with cls._lock:
+            if version != TypeRegistry.version:
+                # the definitions changed while it was built
+                return schema
+            cls._schemas[key] = (schema, schema_dict)
+            while len(cls._schemas) > cls.MAX_SCHEMAS:
+                cls._schemas.popitem(last=False)
+        return schema
+
+    @classmethod
+    def clear(cls):
+        '''Drop the schemas kept by get().'''
+        with cls._lock:
+            cls._schemas.clear()
 
     @property
     def type(self):
@@ -91,14 +147,26 @@ class Schema(collections.abc.Mapping):
 
     @property
     def constraints(self):
-        if not self.constraints_list:
-            constraint_schemata = self.schema.get(self.CONSTRAINTS)
-            if constraint_schemata:
-                self.constraints_list = [Constraint(self.name,
-                                                    self.type,
-                                                    cschema)
-                                         for cschema in constraint_schemata]
-        return self.constraints_list
+        if self.constraints_list is not None:
+            return self.constraints_list
+        if not ExceptionCollector.collecting:
+            # the first invalid constraint raises its error
+            self.constraints_list = self._build_constraints()
+            return self.constraints_list
+        try:
+            with ExceptionCollector.capture() as captured:
+                constraints = self._build_constraints()
+        finally:
+            ExceptionCollector.appendExceptions(captured.exceptions)
+        # invalid constraints are built again, to report their errors
+        # wherever the schema is used
+        if not captured.exceptions:
+            self.constraints_list = constraints
+        return constraints
+
+    def _build_constraints(self):
+        return [Constraint(self.name, self.type, cschema)
+                for cschema in self.schema.get(self.CONSTRAINTS) or ()]
 
     @property
     def key_schema(self):
@@ -108,6 +176,28 @@ class Schema(collections.abc.Mapping):
     def entry_schema(self):
         return self.schema.get(self.ENTRYSCHEMA)
 
+    @property
+    def compiled_key_schema(self):
+        '''The Schema of key_schema, built once.'''
+        return self._compile(self.KEYSCHEMA)
+
+    @property
+    def compiled_entry_schema(self):
+        '''The Schema of entry_schema, built once.'''
+        return self._compile(self.ENTRYSCHEMA)
+
+    def _compile(self, key):
+        try:
+            return self._compiled[key]
+        except KeyError:
+            pass
+        schema_dict = self.schema.get(key)
+        if not _is_valid_schema(schema_dict):
+            # its errors are reported where it is used
+            return schema_dict
+        schema = self._compiled[key] = Schema(None, schema_dict)
+        return schema
+
     def __getitem__(self, key):
         return self.schema[key]
 
@@ -126,6 +216,36 @@ class Schema(collections.abc.Mapping):
         return self._len
 
 
+def _is_valid_schema(schema_dict):
+    return isinstance(schema_dict, collections.abc.Mapping) and \
+        Schema.TYPE in schema_dict
+
+
+class _ReadOnlyDict(dict):
+    '''A dict which can not be changed, e.g. the definition of a Schema.'''
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(_('The schema definition can not be changed.'))
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+def _freeze(schema_dict):
+    # read-only copy of a schema definition and of its entry and key schemas
+    frozen = {}
+    for key, value in schema_dict.items():
+        if key in (Schema.KEYSCHEMA, Schema.ENTRYSCHEMA) and \
+                _is_valid_schema(value):
+            frozen[key] = _freeze(value)
+        else:
+            frozen[key] = copy.deepcopy(value)
+    return _ReadOnlyDict(frozen)
+
+
 class Constraint(object):
     '''Parent class for constraints for a Property or Input.'''
 
@@ -136,6 +256,21 @@ class Constraint(object):
                    'less_or_equal', 'in_range', 'valid_values', 'length',
                    'min_length', 'max_length', 'pattern')
 
+    # numbers of values from which numpy, if installed, is used to compare
+    # them to the bounds of a range, see invalid_indexes()
+    BULK_SIZE = 64
+    # floats represent exactly the integers of magnitude less than this
+    EXACT_FLOAT = 2 ** 53
+
+    @LazyAttribute
+    def numpy(cls):
+        '''The numpy module, None if it is not installed.'''
+        try:
+            import numpy
+        except ImportError:
+            return None
+        return numpy
+
     def __new__(cls, property_name=None, property_type=None, constraint=None):
         if cls is not Constraint:
             return super(Constraint, cls).__new__(cls)
@@ -170,28 +305,81 @@ class Constraint(object):
             ExceptionCollector.appendException(InvalidSchemaError(message=msg))
 
     def _get_scalarunit_constraint_value(self):
-        if self.property_type in scalarunit.ScalarUnit.SCALAR_UNIT_TYPES:
-            ScalarUnit_Class = (scalarunit.
-                                get_scalarunit_class(self.property_type))
         if isinstance(self.constraint_value, list):
-            return [ScalarUnit_Class(v).get_num_from_scalar_unit()
+            return [scalarunit.get_scalarunit_value(self.property_type, v)
                     for v in self.constraint_value]
         else:
-            return (ScalarUnit_Class(self.constraint_value).
-                    get_num_from_scalar_unit())
+            return scalarunit.get_scalarunit_value(self.property_type,
+                                                   self.constraint_value)
 
-    def _err_msg(self, value):
+    def _err_msg(self, value, value_msg):
         return _('Property "%s" could not be validated.') % self.property_name
 
     def validate(self, value):
-        self.value_msg = value
+        profiling.count('validate.constraints')
+        # constraints are shared by the templates, see Schema.get(), the
+        # value validated is not kept
+        value_msg = value
         if self.property_type in scalarunit.ScalarUnit.SCALAR_UNIT_TYPES:
             value = scalarunit.get_scalarunit_value(self.property_type, value)
         if not self._is_valid(value):
-            err_msg = self._err_msg(value)
+            err_msg = self._err_msg(value, value_msg)
             ExceptionCollector.appendException(
                 ValidationError(message=err_msg))
 
+    def invalid_indexes(self, values):
+        '''Return the indexes of the values which are not valid, in order.
+
+        The values are checked together, which is faster than one by one
+        for some constraints: validate() then only needs to be called on
+        the values at these indexes, to report their errors.
+        '''
+        if self.property_type in scalarunit.ScalarUnit.SCALAR_UNIT_TYPES:
+            # converting the values may report errors, left to validate()
+            return list(range(len(values)))
+        return self._invalid_indexes(values)
+
+    def _invalid_indexes(self, values):
+        indexes = []
+        for index, value in enumerate(values):
+            try:
+                valid = self._is_valid(value)
+            except Exception:
+                # raised again by validate()
+                valid = False
+            if not valid:
+                indexes.append(index)
+        return indexes
+
+    def _bulk_array(self, values, *bounds):
+        '''Return the values as a numpy array of floats, or None.
+
+        None is returned if numpy is not installed, if there are too few
+        values for numpy to be worth it, or if the values and the bounds
+        they are compared to are not all numbers converted exactly.
+        '''
+        numpy = Constraint.numpy
+        if numpy is None or len(values) < self.BULK_SIZE:
+            return None
+        numbers = list(values) + list(bounds)
+        if any(type(number) not in (int, float) for number in numbers):
+            return None
+        array = numpy.array(numbers, dtype=float)
+        if not (numpy.abs(array) < self.EXACT_FLOAT).all():
+            return None
+        return array[:len(values)]
+
+    def _bulk_indexes(self, values, invalid):
+        '''Return the indexes of the values of which invalid() is true.
+
+        invalid() is given the values as the array of _bulk_array(), the
+        values are checked one by one if it is None.
+        '''
+        array = self._bulk_array(values, self.constraint_value)
+        if array is None:
+            return Constraint._invalid_indexes(self, values)
+        return invalid(array).nonzero()[0].tolist()
+
 
 class Equal(Constraint):
     """Constraint class for "equal"
@@ -210,11 +398,11 @@ class Equal(Constraint):
 
         return False
 
-    def _err_msg(self, value):
+    def _err_msg(self, value, value_msg):
         return (_('The value "%(pvalue)s" of property "%(pname)s" is not '
                   'equal to "%(cvalue)s".') %
                 dict(pname=self.property_name,
-                     pvalue=self.value_msg,
+                     pvalue=value_msg,
                      cvalue=self.constraint_value_msg))
 
 
@@ -248,11 +436,15 @@ class GreaterThan(Constraint):
 
         return False
 
-    def _err_msg(self, value):
+    def _invalid_indexes(self, values):
+        return self._bulk_indexes(
+            values, lambda array: array <= self.constraint_value)
+
+    def _err_msg(self, value, value_msg):
         return (_('The value "%(pvalue)s" of property "%(pname)s" must be '
                   'greater than "%(cvalue)s".') %
                 dict(pname=self.property_name,
-                     pvalue=self.value_msg,
+                     pvalue=value_msg,
                      cvalue=self.constraint_value_msg))
 
 
@@ -287,11 +479,15 @@ class GreaterOrEqual(Constraint):
             return True
         return False
 
-    def _err_msg(self, value):
+    def _invalid_indexes(self, values):
+        return self._bulk_indexes(
+            values, lambda array: array < self.constraint_value)
+
+    def _err_msg(self, value, value_msg):
         return (_('The value "%(pvalue)s" of property "%(pname)s" must be '
                   'greater than or equal to "%(cvalue)s".') %
                 dict(pname=self.property_name,
-                     pvalue=self.value_msg,
+                     pvalue=value_msg,
                      cvalue=self.constraint_value_msg))
 
 
@@ -325,11 +521,15 @@ class LessThan(Constraint):
 
         return False
 
-    def _err_msg(self, value):
+    def _invalid_indexes(self, values):
+        return self._bulk_indexes(
+            values, lambda array: array >= self.constraint_value)
+
+    def _err_msg(self, value, value_msg):
         return (_('The value "%(pvalue)s" of property "%(pname)s" must be '
                   'less than "%(cvalue)s".') %
                 dict(pname=self.property_name,
-                     pvalue=self.value_msg,
+                     pvalue=value_msg,
                      cvalue=self.constraint_value_msg))
 
 
@@ -363,11 +563,15 @@ class LessOrEqual(Constraint):
 
         return False
 
-    def _err_msg(self, value):
+    def _invalid_indexes(self, values):
+        return self._bulk_indexes(
+            values, lambda array: array > self.constraint_value)
+
+    def _err_msg(self, value, value_msg):
         return (_('The value "%(pvalue)s" of property "%(pname)s" must be '
                   'less than or equal to "%(cvalue)s".') %
                 dict(pname=self.property_name,
-                     pvalue=self.value_msg,
+                     pvalue=value_msg,
                      cvalue=self.constraint_value_msg))
 
 
@@ -423,11 +627,24 @@ class InRange(Constraint):
             return False
         return True
 
-    def _err_msg(self, value):
+    def _invalid_indexes(self, values):
+        bounds = [bound for bound in (self.min, self.max)
+                  if bound != self.UNBOUNDED]
+        array = self._bulk_array(values, *bounds)
+        if array is None:
+            return super(InRange, self)._invalid_indexes(values)
+        invalid = Constraint.numpy.zeros(len(values), dtype=bool)
+        if self.min != self.UNBOUNDED:
+            invalid |= array < self.min
+        if self.max != self.UNBOUNDED:
+            invalid |= array > self.max
+        return invalid.nonzero()[0].tolist()
+
+    def _err_msg(self, value, value_msg):
         return (_('The value "%(pvalue)s" of property "%(pname)s" is out of '
                   'range "(min:%(vmin)s, max:%(vmax)s)".') %
                 dict(pname=self.property_name,
-                     pvalue=self.value_msg,
+                     pvalue=value_msg,
                      vmin=self.constraint_value_msg[0],
                      vmax=self.constraint_value_msg[1]))
 
@@ -449,13 +666,34 @@ class ValidValues(Constraint):
             ExceptionCollector.appendException(
                 InvalidSchemaError(message=_('The property "valid_values" '
                                              'expects a list.')))
+        # the values looked up in bulk, if they can all be hashed
+        self.valid_set = None
+        if isinstance(self.constraint_value, list):
+            try:
+                self.valid_set = frozenset(self.constraint_value)
+            except TypeError:
+                pass
 
     def _is_valid(self, value):
         if isinstance(value, list):
             return all(v in self.constraint_value for v in value)
         return value in self.constraint_value
 
-    def _err_msg(self, value):
+    def _invalid_indexes(self, values):
+        if self.valid_set is None:
+            return super(ValidValues, self)._invalid_indexes(values)
+        indexes = []
+        for index, value in enumerate(values):
+            try:
+                valid = value in self.valid_set
+            except TypeError:
+                # lists, which are valid if all their values are
+                valid = self._is_valid(value)
+            if not valid:
+                indexes.append(index)
+        return indexes
+
+    def _err_msg(self, value, value_msg):
         allowed = '[%s]' % ', '.join(str(a) for a in self.constraint_value)
         return (_('The value "%(pvalue)s" of property "%(pname)s" is not '
                   'valid. Expected a value from "%(cvalue)s".') %
@@ -489,7 +727,7 @@ class Length(Constraint):
 
         return False
 
-    def _err_msg(self, value):
+    def _err_msg(self, value, value_msg):
         return (_('Length of value "%(pvalue)s" of property "%(pname)s" '
                   'must be equal to "%(cvalue)s".') %
                 dict(pname=self.property_name,
@@ -524,7 +762,7 @@ class MinLength(Constraint):
 
         return False
 
-    def _err_msg(self, value):
+    def _err_msg(self, value, value_msg):
         return (_('Length of value "%(pvalue)s" of property "%(pname)s" '
                   'must be at least "%(cvalue)s".') %
                 dict(pname=self.property_name,
@@ -559,7 +797,7 @@ class MaxLength(Constraint):
 
         return False
 
-    def _err_msg(self, value):
+    def _err_msg(self, value, value_msg):
         return (_('Length of value "%(pvalue)s" of property "%(pname)s" '
                   'must be no greater than "%(cvalue)s".') %
                 dict(pname=self.property_name,
@@ -592,7 +830,7 @@ class Pattern(Constraint):
         match = self.match(value)
         return match is not None and match.end() == len(value)
 
-    def _err_msg(self, value):
+    def _err_msg(self, value, value_msg):
         return (_('The value "%(pvalue)s" of property "%(pname)s" does not '
                   'match pattern "%(cvalue)s".') %
                 dict(pname=self.property_name,
@@ -0,0 +1,137 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from collections.abc import Mapping
+import copy
+import os
+import threading
+
+from toscaparser.extensions.exttools import ExtTools
+import toscaparser.utils.yamlparser
+
+'''TOSCA definition file.'''
+TOSCA_DEF_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "TOSCA_definition.yaml")
+
+TOSCA_DEF_SECTIONS = ['node_types', 'data_types', 'artifact_types',
+                      'group_types', 'relationship_types',
+                      'capability_types', 'interface_types',
+                      'policy_types']
+
+_lock = threading.RLock()
+_loaded = {}
+_versions = {}
+
+
+def load_definitions_file(defs_file):
+    '''Return the content of a definition file, loaded once per process.'''
+    with _lock:
+        if defs_file not in _loaded:
+            loader = toscaparser.utils.yamlparser.load_yaml
+            _loaded[defs_file] = loader(defs_file)
+        return _loaded[defs_file]
+
+
+def flatten_definitions(defs):
+    '''Return a map of type name to definition of all type sections.'''
+    types = {}
+    for section in TOSCA_DEF_SECTIONS:
+        if section in defs.keys():
+            value = defs[section]
+            for key in value.keys():
+                types[key] = value[key]
+    return types
+
+
+def get_definitions(version=None):
+    '''Return the type definitions of a TOSCA definitions version.
+
+    The normative types are always included. For the version of an
+    extension profile, e.g. NFV, the types of the profile are layered on
+    top of them. The result is cached and shared by every template of the
+    same version so it must not be modified.
+    '''
+    from toscaparser.elements.entity_type import EntityType
+    with _lock:
+        if version not in _versions:
+            defs_file = ExtTools().get_defs_file(version) if version else None
+            if defs_file:
+                profile = flatten_definitions(
+                    load_definitions_file(defs_file))
+                _versions[version] = DefinitionsView(profile,
+                                                     EntityType.TOSCA_DEF)
+            else:
+                _versions[version] = EntityType.TOSCA_DEF
+        return _versions[version]
+
+
+def get_tosca_def(custom_def=None):
+    '''Return the type definitions custom_def was resolved against.'''
+    tosca_def = getattr(custom_def, 'tosca_def', None)
+    if tosca_def is None:
+        from toscaparser.elements.entity_type import EntityType
+        tosca_def = EntityType.TOSCA_DEF
+    return tosca_def
+
+
+class DefinitionsView(Mapping):
+    '''Read-only view of type definitions layered over other definitions.
+
+    Types of the upper layer override the types with the same name in the
+    lower one. Iteration follows the order of the lower layer first, the
+    same order a dict updated with the upper layer would have.
+    '''
+
+    def __init__(self, upper, lower):
+        self._upper = upper
+        self._lower = lower
+
+    def __getitem__(self, key):
+        if key in self._upper:
+            return self._upper[key]
+        return self._lower[key]
+
+    def __contains__(self, key):
+        return key in self._upper or key in self._lower
+
+    def __iter__(self):
+        for key in self._lower:
+            yield key
+        for key in self._upper:
+            if key not in self._lower:
+                yield key
+
+    def __len__(self):
+        return len(self._lower) + sum(1 for key in self._upper
+                                      if key not in self._lower)
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class CustomDefinitions(dict):
+    '''Custom type definitions of a template.
+
+    Besides the custom types themselves, it carries the normative (and
+    profile) definitions the custom types were written against so entity
+    types built from it resolve against the right definitions.
+    '''
+
+    def __init__(self, custom_defs=None, tosca_def=None):
+        super(CustomDefinitions, self).__init__(custom_defs or {})
+        self.tosca_def = tosca_def
+
+    def __deepcopy__(self, memo):
+        # the definitions are shared, only the custom types are copied
+        return CustomDefinitions(copy.deepcopy(dict(self), memo),
+                                 self.tosca_def)
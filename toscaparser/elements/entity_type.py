@@ -12,10 +12,13 @@
 
 import copy
 import logging
-import os
 from toscaparser.common.exception import ExceptionCollector
 from toscaparser.common.exception import ValidationError
+from toscaparser.elements import definitions
+from toscaparser.elements import type_registry
+from toscaparser.elements.type_registry import TypeRegistry
 from toscaparser.extensions.exttools import ExtTools
+from toscaparser.utils.lazy import LazyAttribute
 import toscaparser.utils.yamlparser
 
 log = logging.getLogger('tosca')
@@ -29,27 +32,22 @@ class EntityType(object):
                ('derived_from', 'properties', 'attributes', 'requirements',
                 'interfaces', 'capabilities', 'type', 'artifacts')
 
-    TOSCA_DEF_SECTIONS = ['node_types', 'data_types', 'artifact_types',
-                          'group_types', 'relationship_types',
-                          'capability_types', 'interface_types',
-                          'policy_types']
+    TOSCA_DEF_SECTIONS = definitions.TOSCA_DEF_SECTIONS
 
     '''TOSCA definition file.'''
-    TOSCA_DEF_FILE = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)),
-        "TOSCA_definition.yaml")
+    TOSCA_DEF_FILE = definitions.TOSCA_DEF_FILE
 
     loader = toscaparser.utils.yamlparser.load_yaml
 
-    TOSCA_DEF_LOAD_AS_IS = loader(TOSCA_DEF_FILE)
+    # the definitions are loaded when first needed, not on import
+    @LazyAttribute
+    def TOSCA_DEF_LOAD_AS_IS(cls):
+        return definitions.load_definitions_file(cls.TOSCA_DEF_FILE)
 
     # Map of definition with pre-loaded values of TOSCA_DEF_FILE_SECTIONS
-    TOSCA_DEF = {}
-    for section in TOSCA_DEF_SECTIONS:
-        if section in TOSCA_DEF_LOAD_AS_IS.keys():
-            value = TOSCA_DEF_LOAD_AS_IS[section]
-            for key in value.keys():
-                TOSCA_DEF[key] = value[key]
+    @LazyAttribute
+    def TOSCA_DEF(cls):
+        return definitions.flatten_definitions(cls.TOSCA_DEF_LOAD_AS_IS)
 
     RELATIONSHIP_TYPE = (DEPENDSON, HOSTEDON, CONNECTSTO, ATTACHESTO,
                          LINKSTO, BINDSTO) = \
@@ -87,11 +85,21 @@ class EntityType(object):
             return False
         elif self.type == type_str:
             return True
+        resolved = self._get_resolved()
+        if resolved:
+            resolved.report()
+            return type_str in resolved.ancestors
         elif self.parent_type:
             return self.parent_type.is_derived_from(type_str)
         else:
             return False
 
+    def _get_resolved(self):
+        '''Return the registry entry of this type if it is up to date.'''
+        resolved = getattr(self, '_resolved', None)
+        if resolved is not None and resolved.defs is self.defs:
+            return resolved
+
     def entity_value(self, defs, key):
         if defs and key in defs:
             return defs[key]
@@ -107,6 +115,15 @@ class EntityType(object):
             # item definitions
             value = copy.copy(defs[ndtype])
         if parent:
+            resolved = self._get_resolved()
+            if resolved:
+                resolved.report()
+                inherited = resolved.value(ndtype)
+                if inherited is None:
+                    return value
+                if not value:
+                    return copy.copy(inherited)
+                return type_registry.merge_value(value, inherited)
             p = self
             if p:
                 while p:
@@ -135,6 +152,10 @@ class EntityType(object):
                 ValidationError(message="defs is " + str(defs)))
         else:
             defs = self.defs
+        resolved = self._get_resolved()
+        if resolved:
+            resolved.report()
+            return resolved.definition(ndtype)
         if defs is not None and ndtype in defs:
             value = defs[ndtype]
         p = self.parent_type
@@ -151,14 +172,13 @@ class EntityType(object):
 
 
 def update_definitions(version):
-    exttools = ExtTools()
-    extension_defs_file = exttools.get_defs_file(version)
-    loader = toscaparser.utils.yamlparser.load_yaml
-    nfv_def_file = loader(extension_defs_file)
-    nfv_def = {}
-    for section in EntityType.TOSCA_DEF_SECTIONS:
-        if section in nfv_def_file.keys():
-            value = nfv_def_file[section]
-            for key in value.keys():
-                nfv_def[key] = value[key]
+    '''Add the types of an extension profile to the normative types.
+
+    This changes the definitions shared by every template. Templates
+    resolve their types against get_definitions(version) instead.
+    '''
+    extension_defs_file = ExtTools().get_defs_file(version)
+    nfv_def = definitions.flatten_definitions(
+        definitions.load_definitions_file(extension_defs_file))
     EntityType.TOSCA_DEF.update(nfv_def)
+    TypeRegistry.clear()
@@ -12,6 +12,7 @@
 
 from toscaparser.common.exception import ExceptionCollector
 from toscaparser.common.exception import UnknownFieldError
+from toscaparser.elements.definitions import get_tosca_def
 from toscaparser.elements.statefulentitytype import StatefulEntityType
 
 SECTIONS = (LIFECYCLE, CONFIGURE, LIFECYCLE_SHORTNAME,
@@ -42,6 +43,8 @@ class InterfacesDef(StatefulEntityType):
         self.inputs = None
         self.outputs = None
         self.defs = {}
+        self.TOSCA_DEF = get_tosca_def(
+            node_template.custom_def if node_template else None)
         if interfacename == LIFECYCLE_SHORTNAME:
             self.interfacetype = LIFECYCLE
         elif interfacename == CONFIGURE_SHORTNAME:
@@ -60,17 +60,7 @@ class PolicyType(StatefulEntityType):
             self.reservation = self.defs[self.RESERVATION]
 
     def _get_parent_policies(self):
-        policies = {}
-        parent_policy = self.parent_type.type if self.parent_type else None
-        if parent_policy:
-            while parent_policy != 'tosca.policies.Root':
-                if parent_policy in self.TOSCA_DEF:
-                    policies[parent_policy] = self.TOSCA_DEF[parent_policy]
-                    parent_policy = policies[parent_policy]['derived_from']
-                elif self.custom_def and parent_policy in self.custom_def:
-                    policies[parent_policy] = self.custom_def[parent_policy]
-                    parent_policy = policies[parent_policy]['derived_from']
-        return policies
+        return self.get_parent_types('tosca.policies.Root')
 
     @property
     def parent_type(self):
@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import functools
 import logging
 import re
 
@@ -19,6 +21,38 @@ from toscaparser.utils import validateutils
 
 log = logging.getLogger('tosca')
 
+# the number and the unit of a scalar-unit, e.g. "2.5 GHz"
+SCALAR_UNIT_RE = re.compile(r'([0-9.]+)\s*(\w+)')
+
+# number of scalar-units whose parsing is kept, see _split()
+MAX_SCALAR_UNITS = 4096
+
+
+@functools.lru_cache(maxsize=MAX_SCALAR_UNITS)
+def _split(text):
+    '''Return the number of a scalar-unit, as written and converted, and
+    its unit as written.
+
+    The same values are found in many templates, and checked against
+    several constraints: they are parsed once. An exception is raised if
+    text is not a scalar-unit.
+    '''
+    number, unit = SCALAR_UNIT_RE.match(text).groups()
+    return number, validateutils.str_to_num(number), unit
+
+
+class ScalarUnitValue(collections.namedtuple('ScalarUnitValue',
+                                             ['number', 'unit', 'base'])):
+    '''A valid scalar-unit, parsed.
+
+    number is the number as written, unit the standard unit and base the
+    magnitude in the base unit of the type, the unit of factor 1, e.g. the
+    number of bytes of "2 KiB" is 2048.0.
+    '''
+
+    def __str__(self):
+        return self.number + ' ' + self.unit
+
 
 class ScalarUnit(object):
     '''Parent class for scalar-unit type.'''
@@ -29,6 +63,14 @@ class ScalarUnit(object):
         'scalar-unit.size', 'scalar-unit.frequency', 'scalar-unit.time'
     )
 
+    def __init_subclass__(cls, **kwargs):
+        super(ScalarUnit, cls).__init_subclass__(**kwargs)
+        # the standard units by their upper case, the first one if several
+        # only differ by their case
+        cls.SCALAR_UNIT_UPPER = {}
+        for unit in cls.SCALAR_UNIT_DICT:
+            cls.SCALAR_UNIT_UPPER.setdefault(unit.upper(), unit)
+
     def __init__(self, value):
         self.value = value
 
@@ -38,54 +80,64 @@ class ScalarUnit(object):
         If unit is not following specified standard, convert it to standard
         unit after displaying a warning message.
         """
-        if input_unit in self.SCALAR_UNIT_DICT.keys():
+        if input_unit in self.SCALAR_UNIT_DICT:
             return input_unit
-        else:
-            for key in self.SCALAR_UNIT_DICT.keys():
-                if key.upper() == input_unit.upper():
-                    log.warning('The unit "%(unit)s" does not follow '
-                                'scalar unit standards; using "%(key)s" '
-                                'instead.' % {'unit': input_unit,
-                                              'key': key})
-                    return key
-            msg = (_('The unit "%(unit)s" is not valid. Valid units are '
-                     '"%(valid_units)s".') %
-                   {'unit': input_unit,
-                    'valid_units': sorted(self.SCALAR_UNIT_DICT.keys())})
-            ExceptionCollector.appendException(ValueError(msg))
-
-    def validate_scalar_unit(self):
-        regex = re.compile(r'([0-9.]+)\s*(\w+)')
+        key = self.SCALAR_UNIT_UPPER.get(input_unit.upper())
+        if key is not None:
+            log.warning('The unit "%(unit)s" does not follow '
+                        'scalar unit standards; using "%(key)s" '
+                        'instead.' % {'unit': input_unit,
+                                      'key': key})
+            return key
+        msg = (_('The unit "%(unit)s" is not valid. Valid units are '
+                 '"%(valid_units)s".') %
+               {'unit': input_unit,
+                'valid_units': sorted(self.SCALAR_UNIT_DICT.keys())})
+        ExceptionCollector.appendException(ValueError(msg))
+
+    def parse(self):
+        '''Return the value as a ScalarUnitValue, None if it is not valid.
+
+        The errors of a value not valid are reported.
+        '''
         try:
-            result = regex.match(str(self.value)).groups()
-            validateutils.str_to_num(result[0])
-            scalar_unit = self._check_unit_in_scalar_standard_units(result[1])
-            self.value = ' '.join([result[0], scalar_unit])
-            return self.value
-
+            number, num, unit = _split(str(self.value))
+            unit = self._check_unit_in_scalar_standard_units(unit)
+            factor = self.SCALAR_UNIT_DICT[unit]
         except Exception:
             ExceptionCollector.appendException(
                 ValueError(_('"%s" is not a valid scalar-unit.')
                            % self.value))
+            return None
+        return ScalarUnitValue(number, unit, float(num) * factor)
+
+    def validate_scalar_unit(self):
+        value = self.parse()
+        if value is not None:
+            self.value = str(value)
+            return self.value
 
     def get_num_from_scalar_unit(self, unit=None):
         if unit:
             unit = self._check_unit_in_scalar_standard_units(unit)
         else:
             unit = self.SCALAR_UNIT_DEFAULT
-        self.validate_scalar_unit()
-
-        regex = re.compile(r'([0-9.]+)\s*(\w+)')
-        if regex.match(str(self.value)):
-            result = regex.match(str(self.value)).groups()
-            converted = (float(validateutils.str_to_num(result[0]))
-                         * self.SCALAR_UNIT_DICT[result[1]]
-                         / self.SCALAR_UNIT_DICT[unit])
-            if converted - int(converted) < 0.0000000000001:
-                converted = int(converted)
-            return converted
-        else:
-            return None
+        value = self.parse()
+        if value is None:
+            match = SCALAR_UNIT_RE.match(str(self.value))
+            if not match:
+                return None
+            # converted as before, which raises the error of the number or
+            # of the unit which is not valid
+            number, value_unit = match.groups()
+            return (float(validateutils.str_to_num(number))
+                    * self.SCALAR_UNIT_DICT[value_unit]
+                    / self.SCALAR_UNIT_DICT[unit])
+        self.value = str(value)
+        converted = value.base / self.SCALAR_UNIT_DICT[unit]
+        if converted - int(converted) < 0.0000000000001:
+            converted = int(converted)
+        return converted
 
 
 class ScalarUnit_Size(ScalarUnit):
@@ -13,8 +13,10 @@
 from toscaparser.common.exception import ExceptionCollector
 from toscaparser.common.exception import InvalidTypeError
 from toscaparser.elements.attribute_definition import AttributeDef
+from toscaparser.elements.definitions import get_tosca_def
 from toscaparser.elements.entity_type import EntityType
 from toscaparser.elements.property_definition import PropertyDef
+from toscaparser.elements.type_registry import TypeRegistry
 from toscaparser.unsupportedtype import UnsupportedType
 
 
@@ -31,26 +33,38 @@ class StatefulEntityType(EntityType):
                                                     'remove_target']
 
     def __init__(self, entitytype, prefix, custom_def=None):
-        entire_entitytype = entitytype
-        if UnsupportedType.validate_type(entire_entitytype):
+        tosca_def = get_tosca_def(custom_def)
+        if tosca_def is not self.TOSCA_DEF:
+            self.TOSCA_DEF = tosca_def
+        self._resolved = None
+        if UnsupportedType.validate_type(entitytype):
             self.defs = None
         else:
-            if entitytype.startswith(self.TOSCA + ":"):
-                entitytype = entitytype[(len(self.TOSCA) + 1):]
-                entire_entitytype = prefix + entitytype
-            if not entitytype.startswith(self.TOSCA):
-                entire_entitytype = prefix + entitytype
-            if custom_def and entitytype in list(custom_def.keys()):
-                self.defs = custom_def[entitytype]
-            elif entire_entitytype in list(self.TOSCA_DEF.keys()):
-                self.defs = self.TOSCA_DEF[entire_entitytype]
-                entitytype = entire_entitytype
-            else:
-                self.defs = None
+            resolved = TypeRegistry.get(self.TOSCA_DEF, custom_def).resolve(
+                entitytype, prefix)
+            self.defs = resolved.defs
+            entitytype = resolved.type
+            if self.defs is None:
                 ExceptionCollector.appendException(
                     InvalidTypeError(what=entitytype))
+            else:
+                self._resolved = resolved
         self.type = entitytype
 
+    def get_parent_types(self, root=None):
+        '''Return the definitions of the parent types up to root.
+
+        The result maps the name of every parent type to its definition,
+        nearest parent first. The root type itself is not included.
+        '''
+        parents = {}
+        resolved = self._get_resolved()
+        parent = resolved.parent if resolved else None
+        while parent and parent.defs is not None and parent.type != root:
+            parents[parent.type] = parent.defs
+            parent = parent.parent
+        return parents
+
     def get_properties_def_objects(self):
         '''Return a list of property definition objects.'''
         properties = []
@@ -14,6 +14,7 @@ from toscaparser.common.exception import ExceptionCollector
 from toscaparser.common.exception import InvalidTemplateVersion
 from toscaparser.common.exception import UnknownFieldError
 from toscaparser.extensions.exttools import ExtTools
+from toscaparser.utils.lazy import LazyAttribute
 
 
 class TypeValidation(object):
@@ -30,11 +31,16 @@ class TypeValidation(object):
          'relationship_types', 'capability_types',
          'interface_types', 'policy_types', 'topology_template',
          'metadata')
-    VALID_TEMPLATE_VERSIONS = ['tosca_simple_yaml_1_0',
-                               'tosca_simple_yaml_1_2',
-                               'tosca_simple_yaml_1_3']
-    exttools = ExtTools()
-    VALID_TEMPLATE_VERSIONS.extend(exttools.get_versions())
+
+    @LazyAttribute
+    def exttools(cls):
+        return ExtTools()
+
+    @LazyAttribute
+    def VALID_TEMPLATE_VERSIONS(cls):
+        return ['tosca_simple_yaml_1_0',
+                'tosca_simple_yaml_1_2',
+                'tosca_simple_yaml_1_3'] + cls.exttools.get_versions()
 
     def __init__(self, custom_types, import_def):
         self.import_def = import_def
@@ -0,0 +1,251 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import copy
+import threading
+
+from toscaparser.common.exception import ExceptionCollector
+from toscaparser.common.exception import InvalidTypeError
+from toscaparser.unsupportedtype import UnsupportedType
+from toscaparser.utils import profiling
+
+TOSCA = 'tosca'
+
+
+class ResolvedType(object):
+    '''A type definition together with its flattened inheritance chain.
+
+    The merged value of each section is computed the first time it is
+    requested and kept for the lifetime of the registry, so walking the
+    derived_from chain happens once per type instead of once per call.
+    '''
+
+    def __init__(self, name, type, defs, parent=None, missing_parent=None):
+        self.type = type
+        self.defs = defs
+        self.parent = parent
+        # names of the parent types that are referenced but not defined
+        self.missing = ((missing_parent,) if missing_parent else ()) + \
+            (parent.missing if parent else ())
+        # a type is also known by the name it was referenced with
+        self.ancestors = frozenset([name, type]) | \
+            (parent.ancestors if parent else frozenset())
+        self._values = {}
+        self._definitions = {}
+        self._memo = {}
+
+    def __deepcopy__(self, memo):
+        # shared by every type of the registry, it is never modified
+        return self
+
+    def chain(self):
+        '''Return this type followed by all of its parent types.'''
+        resolved = self
+        while resolved:
+            yield resolved
+            resolved = resolved.parent
+
+    def report(self):
+        '''Report the parent types of the chain that could not be found.'''
+        for name in self.missing:
+            ExceptionCollector.appendException(InvalidTypeError(what=name))
+
+    def value(self, section):
+        '''Return the section merged along the chain, nearest type first.
+
+        This mirrors EntityType.get_value(..., parent=True): dictionaries
+        gain the keys they are missing and lists gain the items they are
+        missing from every parent type.
+        '''
+        try:
+            return self._values[section]
+        except KeyError:
+            pass
+        value = None
+        for resolved in self.chain():
+            if resolved.defs and section in resolved.defs:
+                value = merge_value(value, resolved.defs[section])
+        self._values[section] = value
+        return value
+
+    def definition(self, section):
+        '''Return the section with the definitions inherited from parents.
+
+        This mirrors EntityType.get_definition(): keys defined by the type
+        itself come first and override the ones of its parent types.
+        '''
+        try:
+            return self._definitions[section]
+        except KeyError:
+            pass
+        value = None
+        if self.defs is not None and section in self.defs:
+            value = self.defs[section]
+        inherited = self.parent.definition(section) if self.parent else None
+        if inherited:
+            if not value:
+                value = dict(inherited)
+            else:
+                value = dict(value)
+                for key, item in inherited.items():
+                    if key not in value:
+                        value[key] = item
+        self._definitions[section] = value
+        return value
+
+    def memoize(self, key, compute):
+        '''Return the cached result of compute() stored under key.'''
+        try:
+            return self._memo[key]
+        except KeyError:
+            result = self._memo[key] = compute()
+            return result
+
+    def memoized(self, key):
+        '''Return the result stored under key by memoize(), None if none.'''
+        return self._memo.get(key)
+
+
+def merge_value(value, parent_value):
+    '''Merge a parent section into value the way get_value() does.'''
+    if value:
+        if isinstance(value, dict):
+            for k, v in parent_value.items():
+                if k not in value:
+                    value[k] = v
+        if isinstance(value, list):
+            for p_value in parent_value:
+                if p_value not in value:
+                    value.append(p_value)
+    else:
+        value = copy.copy(parent_value)
+    return value
+
+
+class TypeRegistry(object):
+    '''Flattened view of the type definitions visible to a template.
+
+    A registry is shared by every entity type built from the same
+    normative definitions and the same custom definitions. Each type is
+    resolved once, including its parents and its set of ancestors.
+
+    Definitions changed in place, e.g. a property added to a custom type,
+    are not detected: clear() must be called after changing them.
+    '''
+
+    MAX_REGISTRIES = 32
+
+    # bumped by clear(), for the caches built from the resolved types
+    version = 0
+
+    _registries = collections.OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, tosca_def, custom_def=None):
+        self.tosca_def = tosca_def
+        self.custom_def = custom_def or {}
+        self._types = {}
+        self._sizes = self._definition_sizes()
+
+    def _definition_sizes(self):
+        return len(self.tosca_def), len(self.custom_def)
+
+    def _refresh(self):
+        # The definitions of a template may still grow while it is being
+        # parsed, e.g. when nested templates are added. Other changes go
+        # through clear().
+        sizes = self._definition_sizes()
+        if sizes != self._sizes:
+            self._types = {}
+            self._sizes = sizes
+
+    @classmethod
+    def get(cls, tosca_def, custom_def=None):
+        '''Return the registry for the given definitions.'''
+        if not custom_def:
+            custom_def = None
+        key = (id(tosca_def), id(custom_def))
+        with cls._lock:
+            registry = cls._registries.get(key)
+            if (registry is not None and
+                    registry.tosca_def is tosca_def and
+                    (registry.custom_def or None) is custom_def):
+                cls._registries.move_to_end(key)
+                registry._refresh()
+                return registry
+            registry = cls(tosca_def, custom_def)
+            cls._registries[key] = registry
+            while len(cls._registries) > cls.MAX_REGISTRIES:
+                cls._registries.popitem(last=False)
+            return registry
+
+    @classmethod
+    def clear(cls):
+        '''Drop every registry, e.g. after the definitions were changed.
+
+        Everything computed from the resolved types is dropped with them,
+        the caches kept elsewhere check version.
+        '''
+        with cls._lock:
+            cls._registries.clear()
+            cls.version += 1
+
+    def resolve(self, entitytype, prefix):
+        '''Return the ResolvedType of a type name.
+
+        Type names are looked up the same way StatefulEntityType does: a
+        custom definition wins over a normative one, and short names are
+        expanded with the prefix of the kind of type being looked up.
+        '''
+        key = (prefix, entitytype)
+        resolved = self._types.get(key)
+        if resolved is None:
+            resolved = self._resolve(entitytype, prefix, set())
+        return resolved
+
+    def _resolve(self, entitytype, prefix, resolving):
+        key = (prefix, entitytype)
+        resolved = self._types.get(key)
+        if resolved is not None:
+            return resolved
+        profiling.count('types.resolved')
+        type_name, defs = self._lookup(entitytype, prefix)
+        parent = None
+        missing_parent = None
+        parent_name = defs.get('derived_from') \
+            if isinstance(defs, dict) else None
+        if parent_name and key not in resolving:
+            resolving.add(key)
+            parent = self._resolve(parent_name, prefix, resolving)
+            if parent.defs is None and \
+                    parent_name not in UnsupportedType.un_supported_types:
+                missing_parent = parent.type
+        resolved = ResolvedType(entitytype, type_name, defs, parent,
+                                missing_parent)
+        self._types[key] = resolved
+        return resolved
+
+    def _lookup(self, entitytype, prefix):
+        if entitytype in UnsupportedType.un_supported_types:
+            return entitytype, None
+        entire_entitytype = entitytype
+        if entitytype.startswith(TOSCA + ":"):
+            entitytype = entitytype[(len(TOSCA) + 1):]
+            entire_entitytype = prefix + entitytype
+        if not entitytype.startswith(TOSCA):
+            entire_entitytype = prefix + entitytype
+        if entitytype in self.custom_def:
+            return entitytype, self.custom_def[entitytype]
+        if entire_entitytype in self.tosca_def:
+            return entire_entitytype, self.tosca_def[entire_entitytype]
+        return entitytype, None
@@ -149,8 +149,8 @@ class EntityTemplate(object):
             return False
         elif self.type == type_str:
             return True
-        elif self.parent_type:
-            return self.parent_type.is_derived_from(type_str)
+        elif self.type_definition:
+            return self.type_definition.is_derived_from(type_str)
         else:
             return False
 
@@ -204,7 +204,10 @@ class EntityTemplate(object):
 
             # validating capability properties values
             for prop in self.get_capability(cap).get_properties_objects():
-                prop.validate()
+                with ExceptionCollector.sublocation(self.CAPABILITIES, cap,
+                                                    self.PROPERTIES,
+                                                    prop.name):
+                    prop.validate()
 
                 # TODO(srinivas_tadepalli): temporary work around to validate
                 # default_instances until standardized in specification
@@ -15,8 +15,7 @@ import collections
 import importlib
 import logging
 import os
-
-from stevedore import extension
+import threading
 
 from toscaparser.common.exception import ToscaExtAttributeError
 from toscaparser.common.exception import ToscaExtImportError
@@ -27,25 +26,48 @@ REQUIRED_ATTRIBUTES = ['VERSION', 'DEFS_FILE']
 
 
 class ExtTools(object):
-    def __init__(self):
-        self.EXTENSION_INFO = self._load_extensions()
+    # The installed extensions are discovered once per process.
+    _extension_info = None
+    _lock = threading.Lock()
 
-    def _load_extensions(self):
+    def __init__(self):
+        self.EXTENSION_INFO = self._get_extensions()
+
+    @classmethod
+    def _get_extensions(cls):
+        with cls._lock:
+            if cls._extension_info is None:
+                cls._extension_info = cls._load_extensions()
+            return cls._extension_info
+
+    @classmethod
+    def clear(cls):
+        '''Forget the extensions found so they are discovered again.'''
+        with cls._lock:
+            cls._extension_info = None
+
+    @staticmethod
+    def _load_extensions():
         '''Dynamically load all the extensions .'''
+        # imported here, scanning the entry points is only needed when the
+        # extensions are
+        from stevedore import extension
+
         extensions = collections.OrderedDict()
 
         extns = extension.ExtensionManager(namespace='toscaparser.extensions',
-                                           invoke_on_load=True).extensions
+                                           invoke_on_load=False).extensions
 
         for e in extns:
             try:
                 extinfo = importlib.import_module(e.plugin.__module__)
                 base_path = os.path.dirname(extinfo.__file__)
-                version = e.plugin().VERSION
-                defs_file = base_path + '/' + e.plugin().DEFS_FILE
+                plugin = e.plugin()
+                version = plugin.VERSION
+                defs_file = base_path + '/' + plugin.DEFS_FILE
 
                 # Sections is an optional attribute
-                sections = getattr(e.plugin(), 'SECTIONS', ())
+                sections = getattr(plugin, 'SECTIONS', ())
 
                 extensions[version] = {'sections': sections,
                                        'defs_file': defs_file}
@@ -294,9 +294,9 @@ class GetAttribute(Function):
             if node_template_name == SELF and \
             not isinstance(self.context, list) \
             else node_template_name
-        for node_template in self.tosca_tpl.nodetemplates:
-            if node_template.name == name:
-                return node_template
+        node_template = _get_node_template(self.tosca_tpl, name)
+        if node_template is not None:
+            return node_template
         ExceptionCollector.appendException(
             KeyError(_(
                 'Node template "{0}" was not found.'
@@ -529,11 +529,13 @@ class GetProperty(Function):
                                ' to "Relationships" source node')))
                 return
             return self.context.source
-        if not hasattr(self.tosca_tpl, 'nodetemplates'):
+        if not hasattr(self.tosca_tpl, 'get_node_template') and \
+                not hasattr(self.tosca_tpl, 'nodetemplates'):
             return
-        for node_template in self.tosca_tpl.nodetemplates:
-            if node_template.name == node_template_name:
-                return node_template
+        node_template = _get_node_template(self.tosca_tpl,
+                                           node_template_name)
+        if node_template is not None:
+            return node_template
         ExceptionCollector.appendException(
             KeyError(_(
                 'Node template "{0}" was not found.'
@@ -762,11 +764,12 @@ class GetOperationOutput(Function):
             if node_template_name == SELF and \
             not isinstance(self.context, list) \
             else node_template_name
-        for node_template in self.tosca_tpl.nodetemplates:
-            if node_template.name == name:
-                return node_template
+        return _get_node_template(self.tosca_tpl, name)
 
     def _find_relationship_template(self, relationship_template_name):
+        if hasattr(self.tosca_tpl, 'get_relationship_template'):
+            return self.tosca_tpl.get_relationship_template(
+                relationship_template_name)
         for rel_template in self.tosca_tpl.relationship_templates:
             if rel_template.name == relationship_template_name:
                 return rel_template
@@ -860,6 +863,15 @@ function_mappings = {
 }
 
 
+def _get_node_template(tosca_tpl, name):
+    """Return the node template called name of tosca_tpl, None if missing."""
+    if hasattr(tosca_tpl, 'get_node_template'):
+        return tosca_tpl.get_node_template(name)
+    for node_template in tosca_tpl.nodetemplates:
+        if node_template.name == name:
+            return node_template
+
+
 def is_function(function):
     """Returns True if the provided function is a Tosca intrinsic function.
 
@@ -878,6 +890,17 @@ def is_function(function):
     return isinstance(function, Function)
 
 
+def get_raw_function(function):
+    """Return the raw function of a Function instance, other values as is.
+
+    The functions of a template section already parsed are replaced with
+    their raw form to parse the section again, see get_function().
+    """
+    if isinstance(function, Function):
+        return {function.name: function.args}
+    return function
+
+
 def get_function(tosca_tpl, node_template, raw_function):
     """Gets a Function instance representing the provided template function.
 
@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from concurrent import futures
+import contextvars
 import logging
 import os
 
@@ -20,6 +22,8 @@ from toscaparser.common.exception import UnknownFieldError
 from toscaparser.common.exception import ValidationError
 from toscaparser.elements.tosca_type_validation import TypeValidation
 from toscaparser.utils.gettextutils import _
+from toscaparser.utils import profiling
+from toscaparser.utils import zipfs
 import toscaparser.utils.urlutils
 import toscaparser.utils.yamlparser
 
@@ -33,9 +37,18 @@ class ImportsLoader(object):
                       ('file', 'repository', 'namespace_uri',
                        'namespace_prefix')
 
+    # Number of imported templates loaded at the same time. With 1 or less
+    # the imports are loaded one after the other.
+    MAX_WORKERS = 8
+
     def __init__(self, importslist, path, type_definition_list=None,
-                 tpl=None, local_defs=None):
+                 tpl=None, local_defs=None, max_workers=None, loaded=None):
         self.importslist = importslist
+        # full name to content of the templates already loaded, it can be
+        # shared by the loaders of the same template to load files once
+        self.loaded = {} if loaded is None else loaded
+        self.max_workers = self.MAX_WORKERS if max_workers is None \
+            else max_workers
         self.custom_defs = {}
         self.nested_tosca_tpls = []
         self.nested_imports = {}
@@ -65,6 +78,7 @@ class ImportsLoader(object):
     def get_nested_imports(self):
         return self.nested_imports
 
+    @profiling.timed('imports')
     def _validate_and_load_imports(self):
         imports_names = set()
 
@@ -75,6 +89,14 @@ class ImportsLoader(object):
             ExceptionCollector.appendException(ValidationError(message=msg))
             return
 
+        imports = []
+        for import_def in self.importslist:
+            if isinstance(import_def, dict):
+                imports.extend(import_def.items())
+            else:  # old style of imports
+                imports.append((None, import_def))
+        loaded = self._load_import_templates(imports)
+
         for import_def in self.importslist:
             if isinstance(import_def, dict):
                 for import_name, import_uri in import_def.items():
@@ -86,8 +108,7 @@ class ImportsLoader(object):
                             ValidationError(message=msg))
                     imports_names.add(import_name)
 
-                    full_file_name, custom_type = self._load_import_template(
-                        import_name, import_uri)
+                    full_file_name, custom_type = next(loaded)
                     namespace_prefix = None
                     if isinstance(import_uri, dict):
                         namespace_prefix = import_uri.get(
@@ -96,8 +117,7 @@ class ImportsLoader(object):
                         TypeValidation(custom_type, import_def)
                         self._update_custom_def(custom_type, namespace_prefix)
             else:  # old style of imports
-                full_file_name, custom_type = self._load_import_template(
-                    None, import_def)
+                full_file_name, custom_type = next(loaded)
                 if custom_type:
                     TypeValidation(
                         custom_type, import_def)
@@ -108,12 +128,60 @@ class ImportsLoader(object):
                     {full_file_name: custom_type['imports']})
             self._update_nested_tosca_tpls(full_file_name, custom_type)
 
+    def _load_import_templates(self, imports):
+        """Load the imported templates, in parallel if possible.
+
+        Yield the full file name and the content of each of the imports,
+        given as (import name, import definition) pairs, in their order.
+        The errors found loading a template are reported when it is
+        yielded, as if the templates were loaded one after the other.
+        """
+        if (self.max_workers <= 1 or len(imports) <= 1 or
+                not ExceptionCollector.collecting):
+            for import_name, import_uri in imports:
+                yield self._load_import_template(import_name, import_uri)
+            return
+
+        resolved = []
+        for import_name, import_uri in imports:
+            with ExceptionCollector.capture() as errors:
+                template = self._resolve_import_template(import_name,
+                                                         import_uri)
+            resolved.append((template, errors.exceptions))
+
+        workers = min(self.max_workers, len(imports))
+        with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            tasks = [executor.submit(contextvars.copy_context().run,
+                                     self._load_yaml, *template)
+                     if template[0] and template[0] not in self.loaded
+                     else None
+                     for template, errors in resolved]
+
+        for (template, errors), task in zip(resolved, tasks):
+            ExceptionCollector.appendExceptions(errors)
+            if task is None:
+                yield template[0], self.loaded.get(template[0])
+                continue
+            custom_type, errors = task.result()
+            ExceptionCollector.appendExceptions(errors)
+            if custom_type is not None:
+                self.loaded[template[0]] = custom_type
+            yield template[0], custom_type
+
+    @staticmethod
+    def _load_yaml(file_name, a_file):
+        with ExceptionCollector.capture() as errors:
+            custom_type = YAML_LOADER(file_name, a_file)
+        return custom_type, errors.exceptions
+
     def _update_custom_def(self, custom_type, namespace_prefix):
         outer_custom_types = {}
         for type_def in self.type_definition_list:
             outer_custom_types = custom_type.get(type_def)
             if outer_custom_types:
                 if type_def == "imports":
+                    # the loaded template itself must not be modified
+                    outer_custom_types = list(outer_custom_types)
                     for i in self.custom_defs.get('imports', []):
                         if i not in outer_custom_types:
                             outer_custom_types.append(i)
@@ -154,12 +222,29 @@ class ImportsLoader(object):
                         field=key))
 
     def _load_import_template(self, import_name, import_uri_def):
+        """Load an imported template.
+
+        Return the full name of the imported template file and its content.
+        """
+        file_name, a_file = self._resolve_import_template(import_name,
+                                                          import_uri_def)
+        if not file_name:
+            return None, None
+        if file_name not in self.loaded:
+            custom_type = YAML_LOADER(file_name, a_file)
+            if custom_type is None:
+                return file_name, None
+            self.loaded[file_name] = custom_type
+        return file_name, self.loaded[file_name]
+
+    def _resolve_import_template(self, import_name, import_uri_def):
         """Handle custom types defined in imported template files
 
         This method loads the custom type definitions referenced in "imports"
         section of the TOSCA YAML template by determining whether each import
         is specified via a file reference (by relative or absolute path) or a
-        URL reference.
+        URL reference. It returns the full name of the imported template and
+        whether it is a local file.
 
         Possibilities:
         +----------+--------+------------------------------+
@@ -205,7 +290,7 @@ class ImportsLoader(object):
                         file_name = self.local_defs[k]
                         has_file = True
 
-            return file_name, YAML_LOADER(file_name, a_file=has_file)
+            return file_name, has_file
         elif not repository:
             import_template = None
             if self.path:
@@ -223,16 +308,16 @@ class ImportsLoader(object):
                     a_file = False
                 else:
                     a_file = True
-                    main_a_file = os.path.isfile(self.path)
+                    main_a_file = zipfs.isfile(self.path)
 
                     if main_a_file:
-                        if os.path.isfile(file_name):
+                        if zipfs.isfile(file_name):
                             import_template = file_name
                         else:
                             full_path = os.path.join(
                                 os.path.dirname(os.path.abspath(self.path)),
                                 file_name)
-                            if os.path.isfile(full_path):
+                            if zipfs.isfile(full_path):
                                 import_template = full_path
                             else:
                                 file_path = file_name.rpartition("/")
@@ -242,7 +327,7 @@ class ImportsLoader(object):
                                         file_path[0]):
                                     import_template = dir_path + "/" +\
                                         file_path[2]
-                                    if not os.path.isfile(import_template):
+                                    if not zipfs.isfile(import_template):
                                         msg = (_('"%(import_template)s" is '
                                                  'not a valid file')
                                                % {'import_template':
@@ -251,7 +336,7 @@ class ImportsLoader(object):
                                         ExceptionCollector.appendException
                                         (ValueError(msg))
             else:  # template is pre-parsed
-                if os.path.isabs(file_name) and os.path.isfile(file_name):
+                if os.path.isabs(file_name) and zipfs.isfile(file_name):
                     a_file = True
                     import_template = file_name
                 else:
@@ -269,7 +354,7 @@ class ImportsLoader(object):
                     ImportError(_('Import "%s" is not valid.') %
                                 import_uri_def))
                 return None, None
-            return import_template, YAML_LOADER(import_template, a_file)
+            return import_template, a_file
 
         if short_import_notation:
             log.error('Import "%(name)s" is not valid.' % import_uri_def)
@@ -296,10 +381,11 @@ class ImportsLoader(object):
                 return None, None
 
         if toscaparser.utils.urlutils.UrlUtils.validate_url(full_url):
-            return full_url, YAML_LOADER(full_url, False)
+            return full_url, False
         else:
             msg = (_('repository url "%(n_uri)s" is not valid in import '
                      'definition "%(tpl)s".')
                    % {'n_uri': repo_url, 'tpl': import_name})
             log.error(msg)
             ExceptionCollector.appendException(ImportError(msg))
+            return None, None
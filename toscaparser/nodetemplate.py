@@ -37,7 +37,8 @@ log = logging.getLogger('tosca')
 class NodeTemplate(EntityTemplate):
     '''Node template from a Tosca profile.'''
     def __init__(self, name, node_templates, custom_def=None,
-                 available_rel_tpls=None, available_rel_types=None):
+                 available_rel_tpls=None, available_rel_types=None,
+                 available_node_tpls=None):
         super(NodeTemplate, self).__init__(name, node_templates[name],
                                            'node_type',
                                            custom_def)
@@ -48,6 +49,9 @@ class NodeTemplate(EntityTemplate):
         self.relationship_tpl = []
         self.available_rel_tpls = available_rel_tpls
         self.available_rel_types = available_rel_types
+        # node templates of the topology by name, requirement targets
+        # resolve to them instead of to copies of their definition
+        self.available_node_tpls = available_node_tpls
         self._relationships = {}
         self.sub_mapping_tosca_template = None
 
@@ -56,14 +60,22 @@ class NodeTemplate(EntityTemplate):
         if not self._relationships:
             requires = self.requirements
             if requires and isinstance(requires, list):
-                for r in requires:
-                    for r1, value in r.items():
-                        explicit = self._get_explicit_relationship(r, value)
-                        if explicit:
-                            for key, value in explicit.items():
-                                self._relationships[key] = value
+                # located here, the requirements may be resolved from
+                # another node template
+                with ExceptionCollector.location('topology_template',
+                                                 'node_templates', self.name,
+                                                 self.REQUIREMENTS):
+                    self._create_relationships(requires)
         return self._relationships
 
+    def _create_relationships(self, requires):
+        for r in requires:
+            for r1, value in r.items():
+                explicit = self._get_explicit_relationship(r, value)
+                if explicit:
+                    for key, value in explicit.items():
+                        self._relationships[key] = value
+
     def _get_explicit_relationship(self, req, value):
         """Handle explicit relationship
 
@@ -94,7 +106,7 @@ class NodeTemplate(EntityTemplate):
                              % {'node': node, 'name': self.name}))
                 return
 
-            related_tpl = NodeTemplate(node, self.templates, self.custom_def)
+            related_tpl = self._get_node_template(node)
             relationship = value.get('relationship') \
                 if isinstance(value, dict) else None
             # check if it's type has relationship defined
@@ -163,6 +175,15 @@ class NodeTemplate(EntityTemplate):
                                                 req, relationship, self)
         return explicit_relation
 
+    def _get_node_template(self, name):
+        if self.available_node_tpls is not None:
+            try:
+                # parses the node template first in a lazy topology
+                return self.available_node_tpls[name]
+            except KeyError:
+                pass
+        return NodeTemplate(name, self.templates, self.custom_def)
+
     def _add_relationship_template(self, requirement, rtype, source):
         req = requirement.copy()
         req['type'] = rtype
@@ -190,7 +211,8 @@ class NodeTemplate(EntityTemplate):
         self._validate_properties(self.entity_tpl, self.type_definition)
         self._validate_interfaces()
         for prop in self.get_properties_objects():
-            prop.validate()
+            with ExceptionCollector.sublocation(self.PROPERTIES, prop.name):
+                prop.validate()
 
     def _validate_requirements(self):
         type_requires = self.type_definition.get_all_requirements()
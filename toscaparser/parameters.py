@@ -35,7 +35,7 @@ class Input(object):
 
     def __init__(self, name, schema_dict):
         self.name = name
-        self.schema = Schema(name, schema_dict)
+        self.schema = Schema.get(name, schema_dict)
 
         self._validate_field()
         self.validate_type(self.type)
@@ -93,4 +93,5 @@ class Policy(EntityTemplate):
     def validate(self):
         self._validate_properties(self.entity_tpl, self.type_definition)
         for prop in self.get_properties_objects():
-            prop.validate()
+            with ExceptionCollector.sublocation(self.PROPERTIES, prop.name):
+                prop.validate()
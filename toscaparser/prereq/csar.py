@@ -10,22 +10,26 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from collections.abc import Hashable
 import os.path
 import requests
-import shutil
 import tempfile
+import urllib.error
 import yaml
 import zipfile
 
-from io import BytesIO
-
 from toscaparser.common.exception import ExceptionCollector
 from toscaparser.common.exception import URLException
 from toscaparser.common.exception import ValidationError
 from toscaparser.imports import ImportsLoader
+from toscaparser.utils import fetchcache
 from toscaparser.utils.gettextutils import _
+from toscaparser.utils import httpfile
+from toscaparser.utils import profiling
+from toscaparser.utils.urlchecker import URLChecker
 from toscaparser.utils.urlutils import UrlUtils
 from toscaparser.utils import yamlparser
+from toscaparser.utils import zipfs
 
 
 TOSCA_META = 'TOSCA-Metadata/TOSCA.meta'
@@ -33,9 +37,56 @@ TOSCA_META = 'TOSCA-Metadata/TOSCA.meta'
 YAML_LOADER = yamlparser.load_yaml
 
 
+class ArtifactIndex(object):
+    '''Artifacts and operation implementations of node templates.
+
+    artifacts maps each artifact name to the names of the node templates
+    defining it, implementations maps each implementation to the (node
+    template, interface, operation) names using it. artifact_implementations
+    are the implementations naming an artifact defined by the same node
+    template or a node template before it.
+    '''
+
+    def __init__(self, node_templates):
+        self.artifacts = {}
+        self.implementations = {}
+        self.artifact_implementations = set()
+        for node_name, node_template in node_templates.items():
+            for artifact_name in node_template.get('artifacts') or {}:
+                self.artifacts.setdefault(artifact_name, []).append(
+                    node_name)
+            interfaces = node_template.get('interfaces') or {}
+            for interface_name, interface in interfaces.items():
+                for operation_name in interface:
+                    implementation = self._get_implementation(
+                        interface[operation_name])
+                    if not isinstance(implementation, Hashable):
+                        continue
+                    self.implementations.setdefault(
+                        implementation, []).append(
+                            (node_name, interface_name, operation_name))
+                    if implementation in self.artifacts:
+                        self.artifact_implementations.add(implementation)
+
+    @staticmethod
+    def _get_implementation(operation):
+        if isinstance(operation, dict):
+            implementation = operation.get('implementation')
+            if isinstance(implementation, dict):
+                if 'primary' in implementation:
+                    return implementation['primary']
+                return implementation.get('dependencies')
+            return implementation
+        return operation
+
+    def implements_artifacts(self):
+        '''Return True if an implementation refers to an artifact.'''
+        return bool(self.artifact_implementations)
+
+
 class CSAR(object):
 
-    def __init__(self, csar_file, a_file=True):
+    def __init__(self, csar_file, a_file=True, url_checker=None):
         self.path = csar_file
         self.a_file = a_file
         self.is_validated = False
@@ -44,7 +95,18 @@ class CSAR(object):
         self.is_tosca_metadata = False
         self.main_template_file_name = None
         self.zfile = None
-
+        # the files of the archive, read in place
+        self.filesystem = None
+        # checks the URLs the templates refer to, concurrently
+        self.url_checker = url_checker or URLChecker()
+        # ArtifactIndex of the templates validated, by file name
+        self.artifact_indexes = {}
+
+    def __deepcopy__(self, memo):
+        # the archive is only read, it is shared by the copies
+        return self
+
+    @profiling.timed('csar.validate')
     def validate(self):
         """Validate the provided CSAR file."""
 
@@ -64,10 +126,36 @@ class CSAR(object):
                 ExceptionCollector.appendException(
                     ValidationError(message=missing_err_msg))
                 return False
+            elif fetchcache.is_cached_url(self.path):
+                try:
+                    self.csar = fetchcache.get_fetch_cache().fetch(
+                        self.path).path
+                except urllib.error.URLError as e:
+                    self._append_url_error(e.reason)
+                    return False
             else:
-                response = requests.get(self.path)
-                self.csar = BytesIO(response.content)
+                # only the parts of the archive read are fetched
+                try:
+                    self.csar = httpfile.open_url(self.path)
+                except (requests.RequestException, IOError) as e:
+                    self._append_url_error(e)
+                    return False
+        try:
+            return self._validate_archive()
+        except (requests.RequestException, IOError) as e:
+            if self.a_file:
+                raise
+            # the parts of a remote archive are fetched as they are read
+            self._append_url_error(e)
+            return False
 
+    def _append_url_error(self, reason):
+        msg = (_('Failed to reach server "%(path)s". Reason is: '
+                 '%(reason)s.')
+               % {'path': self.path, 'reason': str(reason).rstrip('.')})
+        ExceptionCollector.appendException(URLException(what=msg))
+
+    def _validate_archive(self):
         # validate that it is a valid zip file
         if not zipfile.is_zipfile(self.csar):
             err_msg = (_('"%s" is not a valid zip file.') % self.path)
@@ -77,6 +165,7 @@ class CSAR(object):
 
         # validate that it contains the metadata file in the correct location
         self.zfile = zipfile.ZipFile(self.csar, 'r')
+        self.filesystem = zipfs.ZipFileSystem(self.zfile)
         filelist = self.zfile.namelist()
         if TOSCA_META in filelist:
             self.is_tosca_metadata = True
@@ -156,12 +245,43 @@ class CSAR(object):
             self.get_main_template_yaml().get('description')
         return self.metadata['Description']
 
+    def get_artifact_indexes(self):
+        '''Return the ArtifactIndex of each template of the archive.
+
+        The indexes are keyed by the file name of the template, for the
+        main template and the templates it imports.
+        '''
+        if not self.is_validated:
+            self.validate()
+        return dict(self.artifact_indexes)
+
+    def get_main_template_path(self):
+        '''Return the path of the main template in the file system.
+
+        The files of the archive are read in place under this path while
+        the file system is mounted, see zipfs. It only exists on disk once
+        the archive is decompressed.
+        '''
+        main_template = self.get_main_template()
+        if main_template and self.filesystem:
+            return os.path.join(self.filesystem.root, main_template)
+
+    @profiling.timed('csar.decompress')
     def decompress(self):
+        '''Extract the archive, for the callers needing the files on disk.
+
+        The files are extracted to temp_dir, the root of the file system of
+        the archive, which the caller is responsible for removing.
+        '''
         if not self.is_validated:
             self.validate()
-        self.temp_dir = tempfile.NamedTemporaryFile().name
-        with zipfile.ZipFile(self.csar, "r") as zf:
-            zf.extractall(self.temp_dir)
+        if self.filesystem is None:
+            # not a valid CSAR, extract whatever can be
+            self.temp_dir = tempfile.NamedTemporaryFile().name
+            with zipfile.ZipFile(self.csar, "r") as zf:
+                zf.extractall(self.temp_dir)
+            return
+        self.temp_dir = self.filesystem.extract()
 
     def _validate_external_artifact_imports(self, main_tpl, tpl_filename):
         """validate the imports and artifacts"""
@@ -172,7 +292,7 @@ class CSAR(object):
             if 'imports' in main_tpl:
                 custom_service = ImportsLoader(
                     main_tpl['imports'],
-                    os.path.join(self.temp_dir, tpl_filename))
+                    os.path.join(self.filesystem.root, tpl_filename))
 
                 # Get list of nested templates
                 nested_tosca_tpls = custom_service.get_nested_tosca_tpls()
@@ -193,110 +313,113 @@ class CSAR(object):
         * interface implementations
         * artifacts
         """
-        try:
-            self.decompress()
+        with self.filesystem.mounted():
             self._validate_external_artifact_imports(
                 main_tpl,
                 self.main_template_file_name)
-        finally:
-            if self.temp_dir:
-                shutil.rmtree(self.temp_dir)
 
     def _validate_template(self, template_data, template):
         if 'topology_template' in template_data:
             topology_template = template_data['topology_template']
             if 'node_templates' in topology_template:
                 node_templates = topology_template['node_templates']
+                index = ArtifactIndex(node_templates)
+                # nested templates are named by their path in the archive
+                name = self.filesystem.member(template) or template
+                self.artifact_indexes[name] = index
 
+                references = []
                 for node_template_key in node_templates:
                     node_template = node_templates[node_template_key]
                     if 'artifacts' in node_template:
-                        self._validate_artifacts(
-                            node_template, node_templates, template)
+                        self._validate_artifacts(node_template, references)
 
                     if 'interfaces' in node_template:
-                        self._validate_interfaces(
-                            node_template, node_templates, template)
+                        self._validate_interfaces(node_template, references)
 
-    def _validate_artifacts(self, node_template, node_templates, template):
+                if ExceptionCollector.failing():
+                    # the template is invalid anyway
+                    return
+                # the URLs are checked all at once, the results are then
+                # reported in the order of the references
+                urls = [resource_file for resource_file in references
+                        if UrlUtils.validate_url(resource_file)]
+                accessible = dict(zip(urls, self.url_checker.check(urls)))
+                for resource_file in references:
+                    self._validate_external_reference(
+                        node_templates, template, resource_file,
+                        accessible.get(resource_file), index)
+
+    def _validate_artifacts(self, node_template, references):
         artifacts = node_template['artifacts']
         for artifact_key in artifacts:
             artifact = artifacts[artifact_key]
             if isinstance(artifact, str):
-                self._validate_external_reference(
-                    node_templates, template, artifact)
+                references.append(artifact)
             elif isinstance(artifact, dict):
                 if 'file' in artifact:
-                    self._validate_external_reference(
-                        node_templates, template, artifact['file'])
+                    references.append(artifact['file'])
             else:
                 ExceptionCollector.appendException(
                     ValueError(_('Unexpected artifact definition for "%s".')
                                % artifact_key))
 
-    def _validate_interfaces(self, node_template, node_templates, template):
+    def _validate_interfaces(self, node_template, references):
         interfaces = node_template['interfaces']
         for interface_key in interfaces:
             interface = interfaces[interface_key]
             for operation_key in interface:
                 operation = interface[operation_key]
                 if isinstance(operation, str):
-                    self._validate_external_reference(
-                        node_templates, template, operation, False)
+                    references.append(operation)
                 elif isinstance(operation, dict):
                     if 'implementation' in operation:
                         if isinstance(operation['implementation'], dict):
                             implement = operation['implementation']
                             if 'primary' in implement:
-                                self._validate_external_reference(
-                                    node_templates, template,
-                                    implement['primary'], False)
+                                references.append(implement['primary'])
                             elif 'dependencies' in implement:
-                                self._validate_external_reference(
-                                    node_templates, template,
-                                    implement['dependencies'], False)
+                                references.append(
+                                    implement['dependencies'])
                         else:
-                            self._validate_external_reference(
-                                node_templates, template,
-                                operation['implementation'], False)
+                            references.append(operation['implementation'])
 
     def _validate_external_reference(self, node_templates, tpl_file,
-                                     resource_file, raise_exc=True):
+                                     resource_file, accessible=None,
+                                     artifact_index=None):
         """Verify that the external resource exists
 
         If resource_file is a URL verify that the URL is valid.
         If resource_file is a relative path verify that the path is valid
-        considering base folder (self.temp_dir) and tpl_file.
+        considering the root of the archive and tpl_file.
         If resource_file is not a path verify that it is a valid
         implementation name by matching the artifact name.
         Note that in a CSAR resource_file cannot be an absolute path.
+        accessible is whether the URL resource_file was found accessible,
+        it is checked if not given. artifact_index is the ArtifactIndex of
+        node_templates, built if not given.
         """
         if UrlUtils.validate_url(resource_file):
+            if accessible is None:
+                accessible = self.url_checker.is_accessible(resource_file)
+            if accessible:
+                return
             msg = (_('The resource at "%s" cannot be accessed.') %
                    resource_file)
-            try:
-                if UrlUtils.url_accessible(resource_file):
-                    return
-                else:
-                    ExceptionCollector.appendException(
-                        URLException(what=msg))
-            except Exception:
-                ExceptionCollector.appendException(
-                    URLException(what=msg))
+            ExceptionCollector.appendException(URLException(what=msg))
 
-        if os.path.isfile(os.path.join(self.temp_dir,
-                                       os.path.dirname(tpl_file),
-                                       resource_file)):
+        if self.filesystem.isfile(os.path.join(self.filesystem.root,
+                                               os.path.dirname(tpl_file),
+                                               resource_file)):
             return
-        elif self._validate_artifact_name(node_templates):
+        if artifact_index is None:
+            artifact_index = ArtifactIndex(node_templates)
+        if artifact_index.implements_artifacts():
             return
-        else:
-            raise_exc = True
 
-        if raise_exc:
-            ExceptionCollector.appendException(
-                ValueError(_('The resource "%s" does not exist.')
-                           % resource_file))
+        ExceptionCollector.appendException(
+            ValueError(_('The resource "%s" does not exist.')
+                       % resource_file))
 
     def _read_template_yaml(self, template):
         data = self.zfile.read(template)
@@ -378,38 +501,4 @@ class CSAR(object):
         return True
 
     def _validate_artifact_name(self, node_templates):
-        artifact_name = []
-        for node_template_key in node_templates:
-            node_template = node_templates[node_template_key]
-            if 'artifacts' in node_template:
-                artifacts = node_template['artifacts']
-                for artifact_key in artifacts:
-                    artifact_name.append(artifact_key)
-
-            if 'interfaces' in node_template:
-                interfaces = node_template['interfaces']
-                for interface_key in interfaces:
-                    interface = interfaces[interface_key]
-                    for operation_key in interface:
-                        operation = interface[operation_key]
-                        if isinstance(operation, str):
-                            if operation in artifact_name:
-                                return True
-                        elif isinstance(operation, dict):
-                            if 'implementation' in operation:
-                                if isinstance(operation['implementation'],
-                                              dict):
-                                    implement = operation['implementation']
-                                    if 'primary' in implement:
-                                        if (implement['primary'] in
-                                                artifact_name):
-                                            return True
-                                    elif 'dependencies' in implement:
-                                        if (implement['dependencies'] in
-                                                artifact_name):
-                                            return True
-                                else:
-                                    if (operation['implementation'] in
-                                            artifact_name):
-                                        return True
-        return False
+        return ArtifactIndex(node_templates).implements_artifacts()
@@ -13,6 +13,7 @@
 from toscaparser.dataentity import DataEntity
 from toscaparser.elements.constraints import Schema
 from toscaparser.functions import is_function
+from toscaparser.utils import profiling
 
 
 class Property(object):
@@ -34,7 +35,7 @@ class Property(object):
         self.name = property_name
         self.value = value
         self.custom_def = custom_def
-        self.schema = Schema(property_name, schema_dict)
+        self.schema = Schema.get(property_name, schema_dict)
 
     @property
     def type(self):
@@ -66,14 +67,13 @@ class Property(object):
 
     def validate(self):
         '''Validate if not a reference property.'''
+        profiling.count('validate.properties')
         if not is_function(self.value):
             if self.type == Schema.STRING:
                 self.value = str(self.value)
-            self.value = DataEntity.validate_datatype(self.type, self.value,
-                                                      self.entry_schema,
-                                                      self.custom_def,
-                                                      self.name,
-                                                      self.key_schema)
+            self.value = DataEntity.validate_datatype(
+                self.type, self.value, self.schema.compiled_entry_schema,
+                self.custom_def, self.name, self.schema.compiled_key_schema)
             self._validate_constraints()
 
     def _validate_constraints(self):
@@ -12,11 +12,15 @@
 
 
 import argparse
+import json
 import os
 import sys
 
+from toscaparser import batch
+from toscaparser import diagnostics
 from toscaparser.tosca_template import ToscaTemplate
 from toscaparser.utils.gettextutils import _
+from toscaparser.utils import profiling
 import toscaparser.utils.urlutils
 
 """
@@ -30,12 +34,22 @@ It can be used as,
 #tosca-parser --template-file=<path to the YAML template>
 #tosca-parser --template-file=<path to the CSAR zip file>
 #tosca-parser --template-file=<URL to the template or CSAR>
+#tosca-parser --template-file=<path to the YAML template> --profile
+#tosca-parser --template-file=<path to the YAML template> --json
+#tosca-parser batch [--workers=<number>] [--max-errors=<number>] <path>
+ [<path> ...]
 
 e.g.
 #tosca-parser
  --template-file=toscaparser/tests/data/tosca_helloworld.yaml
 #tosca-parser
  --template-file=toscaparser/tests/data/CSAR/csar_hello_world.zip
+#tosca-parser batch toscaparser/tests/data/*.yaml
+
+With --json the errors found are printed as lines of JSON as soon as they
+are found, instead of raising a ValidationError with all of them. The batch
+command validates many templates, printing the result of each one as a
+line of JSON as soon as it is available.
 """
 
 
@@ -49,19 +63,88 @@ class ParserShell(object):
                             required=True,
                             help=_('YAML template or CSAR file to parse.'))
 
+        parser.add_argument('--profile',
+                            action='store_true',
+                            help=_('Print the time and memory taken by each '
+                                   'parsing phase.'))
+
+        parser.add_argument('--json',
+                            action='store_true',
+                            help=_('Print each error found as a line of JSON, '
+                                   'as soon as it is found.'))
+
+        return parser
+
+    def get_batch_parser(self):
+        parser = argparse.ArgumentParser(prog="tosca-parser batch")
+
+        parser.add_argument('template_files',
+                            metavar='<filename>',
+                            nargs='+',
+                            help=_('YAML templates or CSAR files to '
+                                   'validate.'))
+
+        parser.add_argument('--workers',
+                            metavar='<number>',
+                            type=int,
+                            help=_('Number of processes validating the '
+                                   'templates, one per CPU by default.'))
+
+        parser.add_argument('--ordered',
+                            action='store_true',
+                            help=_('Print the results in the order of the '
+                                   'templates given.'))
+
+        parser.add_argument('--max-errors',
+                            metavar='<number>',
+                            type=int,
+                            help=_('Stop validating a template once that '
+                                   'many errors are found in it.'))
+
         return parser
 
     def main(self, argv):
+        if argv and argv[0] == 'batch':
+            return self.batch(argv[1:])
         parser = self.get_parser(argv)
         (args, extra_args) = parser.parse_known_args(argv)
         path = args.template_file
         if os.path.isfile(path):
-            self.parse(path)
+            a_file = True
         elif toscaparser.utils.urlutils.UrlUtils.validate_url(path):
-            self.parse(path, False)
+            a_file = False
         else:
             raise ValueError(_('"%(path)s" is not a valid file.')
                              % {'path': path})
+        run = self.diagnose if args.json else self.parse
+        if not args.profile:
+            return run(path, a_file)
+        profiler = profiling.Profiler(trace_allocations=True)
+        try:
+            with profiling.profile(profiler):
+                return run(path, a_file)
+        finally:
+            print("\nprofile:")
+            print(profiler.report())
+
+    def batch(self, argv):
+        args = self.get_batch_parser().parse_args(argv)
+        status = 0
+        for result in batch.validate_templates(args.template_files,
+                                               workers=args.workers,
+                                               ordered=args.ordered,
+                                               max_errors=args.max_errors):
+            if not result.valid:
+                status = 1
+            print(json.dumps(result.to_dict()), flush=True)
+        return status
+
+    def diagnose(self, path, a_file=True):
+        status = 0
+        for diagnostic in diagnostics.iter_diagnostics(path, a_file=a_file):
+            status = 1
+            print(json.dumps(diagnostic.to_dict()), flush=True)
+        return status
 
     def parse(self, path, a_file=True):
         output = None
@@ -113,8 +196,8 @@ class ParserShell(object):
 def main(args=None):
     if args is None:
         args = sys.argv[1:]
-    ParserShell().main(args)
+    return ParserShell().main(args)
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
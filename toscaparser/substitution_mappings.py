@@ -47,7 +47,7 @@ class SubstitutionMappings(object):
         self.inputs = inputs or []
         self.outputs = outputs or []
         self.sub_mapped_node_template = sub_mapped_node_template
-        self.custom_defs = custom_defs or {}
+        self.custom_defs = custom_defs if custom_defs is not None else {}
         self._validate()
 
         self._capabilities = None
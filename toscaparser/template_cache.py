@@ -0,0 +1,174 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from toscaparser.tosca_template import ToscaTemplate
+from toscaparser.utils import yamlparser
+
+log = logging.getLogger("tosca.model")
+
+
+def _digest(value):
+    '''Return a digest of a value made of YAML/JSON types.'''
+    data = json.dumps(value, sort_keys=True, default=repr)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _file_digest(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _file_stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _Dependency(object):
+    '''A file a parsed template was built from.'''
+
+    def __init__(self, path, a_file, digest):
+        self.path = path
+        self.a_file = a_file
+        self.digest = digest
+        self.stat = _file_stat(path) if a_file else None
+
+    def is_current(self):
+        '''Return True if the file still has the content it was parsed with.
+
+        Remote files are assumed not to change, use the invalidation
+        methods of the cache when they do.
+        '''
+        if not self.a_file:
+            return True
+        stat = _file_stat(self.path)
+        if stat is None:
+            return False
+        if stat == self.stat:
+            return True
+        try:
+            if _file_digest(self.path) != self.digest:
+                return False
+        except OSError:
+            return False
+        self.stat = stat
+        return True
+
+
+class _CacheEntry(object):
+
+    def __init__(self, template, dependencies):
+        self.template = template
+        self.dependencies = dependencies
+
+    def is_current(self):
+        return all(dep.is_current() for dep in self.dependencies)
+
+    def depends_on(self, path):
+        return any(dep.path == path for dep in self.dependencies)
+
+
+class TemplateCache(object):
+    '''Cache of parsed and validated TOSCA templates.
+
+    A template is parsed again only if the main template, one of the files
+    it imports, the parsed parameters or the local definitions changed
+    since it was cached. The files are compared by the digest of their
+    content. At most max_size templates are kept, the least recently used
+    ones are dropped first.
+
+    Templates failing validation are not cached, so their errors are
+    reported every time.
+    '''
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_template(self, path=None, parsed_params=None, a_file=True,
+                     yaml_dict_tpl=None, local_defs=None):
+        '''Return the ToscaTemplate for the given ToscaTemplate arguments.
+
+        The same ToscaTemplate object is returned for the same input, it is
+        shared by the callers and must not be modified. Callers changing it
+        parse the template themselves instead.
+        '''
+        key = self._get_key(path, parsed_params, a_file, yaml_dict_tpl,
+                            local_defs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and entry.is_current():
+            self.hits += 1
+            template = entry.template
+        else:
+            self.misses += 1
+            template, dependencies = self._parse(
+                path, parsed_params, a_file, yaml_dict_tpl, local_defs)
+            with self._lock:
+                self._entries[key] = _CacheEntry(template, dependencies)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return template
+
+    def invalidate(self, path):
+        '''Drop the templates built from the file or URL path.'''
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if key[0] == path or entry.depends_on(path):
+                    del self._entries[key]
+
+    def clear(self):
+        '''Drop all the cached templates.'''
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get_key(self, path, parsed_params, a_file, yaml_dict_tpl,
+                 local_defs):
+        tpl_digest = None
+        if not path and yaml_dict_tpl:
+            tpl_digest = _digest(yaml_dict_tpl)
+        return (path, a_file, tpl_digest, _digest(parsed_params),
+                _digest(local_defs))
+
+    def _parse(self, path, parsed_params, a_file, yaml_dict_tpl,
+               local_defs):
+        with yamlparser.record_loads() as loads:
+            template = ToscaTemplate(path, parsed_params, a_file,
+                                     yaml_dict_tpl, local_defs)
+        if path and path.lower().endswith(('.zip', '.csar')):
+            # the files of a CSAR are read from the archive, its content is
+            # what they depend on
+            if not a_file:
+                return template, [_Dependency(path, False, None)]
+            return template, [_Dependency(path, True, _file_digest(path))]
+        return template, [_Dependency(*load) for load in loads]
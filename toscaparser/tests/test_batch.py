@@ -0,0 +1,111 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+
+from toscaparser import batch
+from toscaparser.tests.base import TestCase
+from toscaparser.tests import utils
+from toscaparser.utils.gettextutils import _
+from toscaparser.utils import yamlparser
+
+
+class BatchTest(TestCase):
+
+    paths = [utils.get_sample_test_path('data/tosca_helloworld.yaml'),
+             utils.get_sample_test_path(
+                 'data/test_multiple_validation_errors.yaml'),
+             utils.get_sample_test_path('data/CSAR/csar_hello_world.zip'),
+             'template.txt']
+
+    def _check_results(self, results):
+        self.assertEqual([0, 1, 2, 3], [result.index for result in results])
+        self.assertEqual(self.paths, [result.path for result in results])
+        self.assertEqual([True, False, True, False],
+                         [result.valid for result in results])
+        self.assertIn(_('InvalidTypeError: Type "tosca.nodes.XYZ" is not a '
+                        'valid type.'),
+                      [str(error) for error in results[1].errors])
+        self.assertEqual([_('ValueError: "template.txt" is not a valid '
+                            'file.')],
+                         [str(error) for error in results[3].errors])
+
+    def test_validate_templates(self):
+        results = list(batch.validate_templates(self.paths, workers=1))
+        self._check_results(results)
+        self.assertIsNone(yamlparser.get_load_cache())
+        self.assertEqual(
+            {'index': 3, 'path': 'template.txt', 'valid': False,
+             'errors': [{'type': 'ValueError',
+                         'message': _('"template.txt" is not a valid '
+                                      'file.'),
+                         'path': 'template.txt', 'location': [],
+                         'node': None, 'property': None, 'trace': None}]},
+            {key: value for key, value in results[3].to_dict().items()
+             if key != 'elapsed'})
+
+    def test_validate_templates_workers(self):
+        results = list(batch.validate_templates(self.paths, workers=2))
+        results.sort(key=lambda result: result.index)
+        self._check_results(results)
+        ordered = list(batch.validate_templates(self.paths, workers=2,
+                                                ordered=True))
+        self.assertEqual([[error.to_dict() for error in result.errors]
+                          for result in results],
+                         [[error.to_dict() for error in result.errors]
+                          for result in ordered])
+
+    def test_validate_templates_stopped(self):
+        # the templates left are dropped
+        results = batch.validate_templates(self.paths * 8, workers=2)
+        self.assertIn(next(results).path, self.paths)
+        results.close()
+
+    def test_validate_template(self):
+        self.assertEqual([], batch.validate_template(self.paths[0]))
+
+
+class LoadCacheTest(TestCase):
+
+    def setUp(self):
+        super(LoadCacheTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'types.yaml')
+        with open(self.path, 'w') as f:
+            f.write('node_types:\n'
+                    '  my.Node: {derived_from: tosca.nodes.Root}\n')
+        self.cache = yamlparser.LoadCache(max_size=1)
+        yamlparser.set_load_cache(self.cache)
+        self.addCleanup(yamlparser.set_load_cache, None)
+
+    def test_load(self):
+        with yamlparser.record_loads() as loads:
+            tpl = yamlparser.load_yaml(self.path)
+            tpl['node_types'].clear()
+            again = yamlparser.load_yaml(self.path)
+        self.assertEqual({'my.Node': {'derived_from': 'tosca.nodes.Root'}},
+                         again['node_types'])
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        self.assertEqual(2, len(loads))
+        self.assertEqual(loads[0], loads[1])
+
+    def test_changed_file(self):
+        yamlparser.load_yaml(self.path)
+        with open(self.path, 'a') as f:
+            f.write('description: changed\n')
+        tpl = yamlparser.load_yaml(self.path)
+        self.assertEqual('changed', tpl['description'])
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+        self.assertEqual(1, len(self.cache))
@@ -16,6 +16,7 @@ import yaml
 from toscaparser.common import exception
 from toscaparser.elements.constraints import Constraint
 from toscaparser.elements.constraints import Schema
+from toscaparser.elements.type_registry import TypeRegistry
 from toscaparser.tests.base import TestCase
 from toscaparser.utils.gettextutils import _
 from toscaparser.utils import yamlparser
@@ -387,3 +388,82 @@ class ConstraintTest(TestCase):
             constraint.validate(["1", "2"])
         except Exception as ex:
             self.fail(ex)
+
+    def test_schema_get(self):
+        schema_dict = {'type': 'integer',
+                       'constraints': [{'greater_than': 1}]}
+        schema = Schema.get('cpus', schema_dict)
+        self.assertIs(schema, Schema.get('cpus', schema_dict))
+        self.assertIsNot(schema, Schema.get('cpus', dict(schema_dict)))
+        self.assertIsNot(schema, Schema.get('mem', schema_dict))
+        self.assertIs(schema.constraints, schema.constraints)
+        error = self.assertRaises(exception.ValidationError,
+                                  schema.constraints[0].validate, 1)
+        self.assertEqual(_('The value "1" of property "cpus" must be greater '
+                           'than "1".'), str(error))
+        # the schema is built from its own read-only copy of schema_dict
+        schema_dict['constraints'][0]['greater_than'] = 0
+        self.assertIs(schema, Schema.get('cpus', schema_dict))
+        self.assertRaises(exception.ValidationError,
+                          schema.constraints[0].validate, 1)
+        self.assertRaises(TypeError, schema.schema.update, {})
+        # and built again once the definitions may have changed
+        TypeRegistry.clear()
+        changed = Schema.get('cpus', schema_dict)
+        self.assertIsNot(schema, changed)
+        changed.constraints[0].validate(1)
+
+    def test_schema_compiled_entry_schema(self):
+        schema = Schema.get('ports', {'type': 'map',
+                                      'key_schema': {'type': 'string'},
+                                      'entry_schema': {'type': 'integer'}})
+        entry_schema = schema.compiled_entry_schema
+        self.assertIsInstance(entry_schema, Schema)
+        self.assertIs(entry_schema, schema.compiled_entry_schema)
+        self.assertEqual({'type': 'integer'}, schema.entry_schema)
+        self.assertEqual('integer', entry_schema.type)
+        self.assertEqual('string', schema.compiled_key_schema.type)
+        # invalid ones are reported where they are used
+        schema = Schema.get('ports', {'type': 'list', 'entry_schema': {}})
+        self.assertEqual({}, schema.compiled_entry_schema)
+        self.assertIsNone(schema.compiled_key_schema)
+
+    def test_schema_get_invalid_constraints(self):
+        # the errors of invalid schemas are reported each time
+        schema_dict = {'type': 'integer', 'constraints': [{'length': 1}]}
+        schema = Schema.get('cpus', schema_dict)
+        collector = exception.ExceptionCollector
+        for i in range(2):
+            collector.start()
+            try:
+                schema.constraints
+                self.assertEqual(
+                    [_('InvalidSchemaError: Property "length" is not valid '
+                       'for data type "integer".')],
+                    collector.getExceptionsReport(False))
+            finally:
+                collector.stop()
+
+    def test_invalid_indexes(self):
+        values = list(range(100)) + [-1, 7]
+        for numpy in (None, Constraint.numpy):
+            self.patch(Constraint, 'numpy', numpy)
+            constraint = Constraint('cpus', Schema.INTEGER,
+                                    {'in_range': [0, 'UNBOUNDED']})
+            self.assertEqual([100], constraint.invalid_indexes(values))
+            constraint = Constraint('cpus', Schema.INTEGER,
+                                    {'greater_than': 97})
+            self.assertEqual(list(range(98)) + [100, 101],
+                             constraint.invalid_indexes(values))
+            # not all numbers, checked one by one
+            constraint = Constraint('cpus', Schema.INTEGER,
+                                    {'less_or_equal': 2})
+            self.assertEqual([3, 5], constraint.invalid_indexes(
+                [1, 2, True, '3', -5, None]))
+
+    def test_valid_values_invalid_indexes(self):
+        constraint = Constraint('ports', Schema.STRING,
+                                {'valid_values': ['http', 'https']})
+        self.assertEqual(frozenset(['http', 'https']), constraint.valid_set)
+        self.assertEqual([1, 3], constraint.invalid_indexes(
+            ['https', 'ftp', ['http'], ['ssh']]))
@@ -13,6 +13,7 @@
 from testtools.testcase import skip
 from toscaparser.common import exception
 from toscaparser.dataentity import DataEntity
+from toscaparser.dataentity import DataTypeValidator
 from toscaparser.elements.datatype import DataType
 from toscaparser.parameters import Input
 from toscaparser.tests.base import TestCase
@@ -510,3 +511,68 @@ class DataTypeTest(TestCase):
         data = DataEntity('tosca.datatypes.Credential',
                           value.get('admin_credential'))
         self.assertIsNotNone(data.validate())
+
+    def test_datatype_validator(self):
+        validator = DataTypeValidator.get('tosca.my.datatypes.People',
+                                          self.custom_type_def)
+        self.assertIs(validator,
+                      DataTypeValidator.get('tosca.my.datatypes.People',
+                                            self.custom_type_def))
+        self.assertEqual({'name', 'gender', 'addresses', 'contacts'},
+                         set(validator.properties))
+        self.assertEqual(['name', 'gender'], validator.required)
+        self.assertEqual({'gender': 'unknown'}, validator.defaults)
+
+        value = {'name': 'Mike',
+                 'contacts': [{'contact_name': 'Tom',
+                               'contact_email': 'tom@example.com',
+                               'contact_phone': '123'},
+                              {'contact_name': 'T',
+                               'contact_email': 't@example.com',
+                               'contact_phone': '456'}]}
+        err = self.assertRaises(exception.ValidationError,
+                                DataEntity.validate_datatype,
+                                'tosca.my.datatypes.People', value, None,
+                                self.custom_type_def)
+        self.assertEqual(_('Length of value "T" of property "contact_name" '
+                           'must be at least "2".'), str(err))
+        self.assertEqual('unknown', value['gender'])
+
+    def test_validate_entry_bulk(self):
+        # the errors of the values validated in bulk are reported in the
+        # order of the values, as if they were validated one by one
+        entry_schema = {'type': 'string',
+                        'constraints': [{'min_length': 2},
+                                        {'valid_values': ['ab', 'abc']}]}
+        value = ['ab', 'abc'] * 50 + ['x', {'get_input': 'name'}, 5]
+        collector = exception.ExceptionCollector
+        collector.start()
+        try:
+            DataEntity.validate_entry(value, entry_schema)
+            self.assertEqual(
+                [_('ValidationError: Length of value "x" of property "None" '
+                   'must be at least "2".'),
+                 _('ValidationError: The value "x" of property "None" is '
+                   'not valid. Expected a value from "[ab, abc]".'),
+                 _('ValidationError: Length of value "{\'get_input\': '
+                   '\'name\'}" of property "None" must be at least "2".'),
+                 _('ValidationError: The value "{\'get_input\': \'name\'}" '
+                   'of property "None" is not valid. Expected a value from '
+                   '"[ab, abc]".'),
+                 _('ValueError: "5" is not a string.'),
+                 _('ValidationError: Length of value "5" of property "None" '
+                   'must be at least "2".'),
+                 _('ValidationError: The value "5" of property "None" is '
+                   'not valid. Expected a value from "[ab, abc]".')],
+                collector.getExceptionsReport(False))
+        finally:
+            collector.stop()
+
+    def test_datatype_validator_invalid_type(self):
+        custom_def = {'tosca.my.datatypes.Invalid':
+                      {'derived_from': 'tosca.my.datatypes.Missing'}}
+        for i in range(2):
+            self.assertRaises(exception.InvalidTypeError,
+                              DataEntity.validate_datatype,
+                              'tosca.my.datatypes.Invalid', {}, None,
+                              custom_def)
@@ -0,0 +1,96 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+from unittest import mock
+
+from toscaparser.common.exception import ExceptionCollector
+from toscaparser.common.exception import StopCollecting
+from toscaparser.common.exception import ValidationError
+from toscaparser import diagnostics
+from toscaparser.tests.base import TestCase
+from toscaparser.tests import utils
+from toscaparser.tosca_template import ToscaTemplate
+from toscaparser.utils.gettextutils import _
+
+
+class DiagnosticsTest(TestCase):
+
+    errornous_template = utils.get_sample_test_path(
+        'data/test_multiple_validation_errors.yaml')
+
+    def test_iter_diagnostics(self):
+        found = list(diagnostics.iter_diagnostics(self.errornous_template))
+        self.assertIn(_('InvalidTypeError: Type "tosca.nodes.XYZ" is not a '
+                        'valid type.'), [str(d) for d in found])
+        error = [d for d in found if d.type == 'InvalidTypeError'][0]
+        self.assertEqual(('topology_template', 'node_templates', 'xyz'),
+                         error.location)
+        self.assertEqual('xyz', error.node)
+        self.assertIsNone(error.property)
+        self.assertEqual(self.errornous_template, error.path)
+
+    def test_iter_diagnostics_property(self):
+        path = utils.get_sample_test_path(
+            'data/datatypes/test_custom_datatypes_value_error.yaml')
+        found = list(diagnostics.iter_diagnostics(path))
+        self.assertEqual(['people'], [d.property for d in found])
+        self.assertEqual(['error in field value'], [d.node for d in found])
+
+    def test_iter_diagnostics_valid(self):
+        path = utils.get_sample_test_path('data/tosca_helloworld.yaml')
+        self.assertEqual([], list(diagnostics.iter_diagnostics(path)))
+
+    def test_iter_diagnostics_invalid_path(self):
+        found = list(diagnostics.iter_diagnostics('template.txt'))
+        self.assertEqual([_('ValueError: "template.txt" is not a valid '
+                            'file.')], [str(d) for d in found])
+
+    def test_error_listener(self):
+        listened = []
+        self.assertRaises(ValidationError, ToscaTemplate,
+                          self.errornous_template,
+                          error_listener=listened.append)
+        self.assertEqual(ExceptionCollector.getExceptions(), listened)
+        self.assertEqual(
+            [d.to_dict() for d in diagnostics.get_diagnostics()],
+            [diagnostics.Diagnostic.from_exception(e).to_dict()
+             for e in listened])
+
+    def test_iter_diagnostics_stopped(self):
+        # the parse stops once the caller stops iterating
+        reported = []
+        stopped = threading.Event()
+
+        def parse(*args, **kwargs):
+            try:
+                while True:
+                    error = ValueError(str(len(reported)))
+                    reported.append(error)
+                    kwargs['error_listener'](error)
+            except StopCollecting:
+                stopped.set()
+
+        with mock.patch.object(diagnostics, 'ToscaTemplate',
+                               side_effect=parse):
+            found = diagnostics.iter_diagnostics('template.yaml')
+            self.assertEqual('ValueError: 0', str(next(found)))
+            found.close()
+            self.assertTrue(stopped.wait(10))
+        self.assertLessEqual(len(reported), diagnostics.MAX_PENDING + 3)
+
+    def test_diagnostic_trace(self):
+        found = list(diagnostics.iter_diagnostics(self.errornous_template,
+                                                  collect_traces=True))
+        trace = found[0].to_dict()['trace']
+        self.assertTrue(trace)
+        self.assertEqual({'file', 'line', 'function'}, set(trace[-1]))
@@ -40,3 +40,65 @@ class ExceptionTest(TestCase):
     def _formate_exception(self):
         exception.UnknownFieldError.set_fatal_format_exception(True)
         raise exception.UnknownFieldError(what='Template')
+
+    def test_nested_collectors(self):
+        collector = exception.ExceptionCollector
+        outer = collector.start()
+        collector.appendException(
+            exception.UnknownFieldError(what='outer', field='a'))
+        inner = collector.start()
+        self.assertFalse(collector.exceptionsCaught())
+        collector.appendException(
+            exception.UnknownFieldError(what='inner', field='a'))
+        collector.stop()
+        self.assertEqual(1, len(inner.exceptions))
+        self.assertIs(outer.exceptions, collector.getExceptions())
+        self.assertTrue(collector.collecting)
+        collector.stop()
+        self.assertEqual(1, len(outer.exceptions))
+        self.assertFalse(collector.collecting)
+        self.assertRaises(exception.UnknownFieldError,
+                          collector.appendException,
+                          exception.UnknownFieldError(what='Template'))
+
+    def test_collector_max_errors(self):
+        collector = exception.ExceptionCollector
+        collector.start(max_errors=2)
+        self.addCleanup(collector.stop)
+        self.assertFalse(collector.failing())
+        collector.appendException(
+            exception.UnknownFieldError(what='Template', field='a'))
+        self.assertTrue(collector.failing())
+        collector.appendException(
+            exception.UnknownFieldError(what='Template', field='a'))
+        self.assertRaises(exception.StopCollecting,
+                          collector.appendException,
+                          exception.UnknownFieldError(what='Template',
+                                                      field='b'))
+        self.assertEqual(2, len(collector.getExceptions()))
+
+    def test_collector_duplicates_and_traces(self):
+        collector = exception.ExceptionCollector
+        collector.start()
+        for i in range(3):
+            collector.appendException(
+                exception.UnknownFieldError(what='Template', field='a'))
+        self.assertTrue(collector.contains(
+            exception.UnknownFieldError(what='Template', field='a')))
+        self.assertEqual(1, len(collector.getExceptions()))
+        trace = collector.getExceptions()[0].trace
+        self.assertEqual('test_collector_duplicates_and_traces',
+                         trace[-1][2])
+        self.assertIn('collector.appendException', trace[-1][3])
+        collector.stop()
+
+        collector.start(trace=False)
+        collector.appendException(
+            exception.UnknownFieldError(what='Template', field='a'))
+        self.assertIsNone(collector.getExceptions()[0].trace)
+        self.assertEqual(collector.getExceptionsReport(False),
+                         collector.getExceptionsReport(True))
+        collector.clear()
+        self.assertFalse(collector.contains(
+            exception.UnknownFieldError(what='Template', field='a')))
+        collector.stop()
@@ -0,0 +1,156 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+import http.server
+import os
+import shutil
+import tempfile
+import threading
+import urllib.error
+
+from toscaparser.common.exception import ExceptionCollector
+from toscaparser.prereq.csar import CSAR
+from toscaparser.tests.base import TestCase
+from toscaparser.tests import utils
+from toscaparser.utils import fetchcache
+import toscaparser.utils.yamlparser
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        content = self.server.files.get(self.path)
+        self.server.requests.append(self.path)
+        if self.server.error:
+            self.send_error(self.server.error)
+            return
+        if content is None:
+            self.send_error(404)
+            return
+        etag = '"%s"' % hashlib.sha256(content).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.server.revalidated.append(self.path)
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class FetchCacheTest(TestCase):
+
+    def setUp(self):
+        super(FetchCacheTest, self).setUp()
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.files = {}
+        self.server.requests = []
+        self.server.revalidated = []
+        self.server.error = None
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = 'http://127.0.0.1:%d' % self.server.server_port
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(fetchcache.set_fetch_cache, None)
+        ExceptionCollector.clear()
+        ExceptionCollector.stop()
+
+    def _publish(self, name, content):
+        self.server.files['/' + name] = content
+        return self.base_url + '/' + name
+
+    def test_fetch_and_revalidate(self):
+        url = self._publish('types.yaml', b'node_types: {}\n')
+        cache = fetchcache.DirectoryCache(self.directory)
+        entry = cache.fetch(url)
+        self.assertEqual(b'node_types: {}\n', entry.read())
+        self.assertEqual(entry.path, cache.fetch(url).path)
+        self.assertEqual(['/types.yaml'], self.server.revalidated)
+
+        self._publish('types.yaml', b'data_types: {}\n')
+        self.assertEqual(b'data_types: {}\n', cache.fetch(url).read())
+        self.assertEqual(3, len(self.server.requests))
+
+    def test_offline(self):
+        url = self._publish('types.yaml', b'node_types: {}\n')
+        cache = fetchcache.DirectoryCache(self.directory)
+        cache.fetch(url)
+        offline = fetchcache.DirectoryCache(self.directory, offline=True)
+        self.assertEqual(b'node_types: {}\n', offline.fetch(url).read())
+        self.assertEqual(1, len(self.server.requests))
+        self.assertRaises(urllib.error.URLError, offline.fetch,
+                          self.base_url + '/other.yaml')
+
+        offline.invalidate(url)
+        self.assertIsNone(offline.lookup(url))
+        self.assertEqual([], os.listdir(os.path.join(self.directory,
+                                                     'blobs')))
+
+    def test_server_error(self):
+        url = self._publish('types.yaml', b'node_types: {}\n')
+        cache = fetchcache.DirectoryCache(self.directory)
+        path = cache.fetch(url).path
+        # the cached copy is used while the server fails
+        self.server.error = 503
+        with self.assertLogs('tosca', 'WARNING') as logs:
+            self.assertEqual(path, cache.fetch(url).path)
+        self.assertIn('HTTP Error 503', logs.output[0])
+        # but not when the file is gone
+        self.server.error = 404
+        error = self.assertRaises(urllib.error.HTTPError, cache.fetch, url)
+        self.assertEqual(404, error.code)
+
+    def test_lru_eviction(self):
+        cache = fetchcache.DirectoryCache(self.directory, max_size=25)
+        urls = [self._publish('%d.yaml' % i, b'%d' % i * 10)
+                for i in range(3)]
+        cache.fetch(urls[0])
+        cache.fetch(urls[1])
+        # a revalidated entry is used again, so it is recent
+        cache.fetch(urls[0])
+        os.utime(cache._url_file(urls[1]), (0, 0))
+        cache.fetch(urls[2])
+        self.assertIsNotNone(cache.lookup(urls[0]))
+        self.assertIsNone(cache.lookup(urls[1]))
+        self.assertIsNotNone(cache.lookup(urls[2]))
+
+    def test_yaml_and_csar_use_cache(self):
+        fetchcache.set_fetch_cache(
+            fetchcache.DirectoryCache(self.directory))
+        url = self._publish('types.yaml', b'node_types: {}\n')
+        self.assertEqual({'node_types': {}},
+                         toscaparser.utils.yamlparser.load_yaml(url, False))
+        self.assertEqual(
+            {'node_types': {}},
+            toscaparser.utils.yamlparser.load_yaml(url, False))
+        self.assertEqual(['/types.yaml'], self.server.revalidated)
+
+        path = utils.get_sample_test_path(
+            'data/CSAR/csar_hello_world.zip')
+        with open(path, 'rb') as f:
+            csar_url = self._publish('hello.zip', f.read())
+        csar = CSAR(csar_url, False)
+        self.assertTrue(csar.validate())
+        self.assertEqual(fetchcache.get_fetch_cache().lookup(csar_url).path,
+                         csar.csar)
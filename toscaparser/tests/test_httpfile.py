@@ -0,0 +1,165 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import http.server
+import io
+import os
+import re
+import threading
+import zipfile
+
+from toscaparser.common import exception
+from toscaparser.common.exception import ExceptionCollector
+from toscaparser.prereq.csar import CSAR
+from toscaparser.tests.base import TestCase
+from toscaparser.tosca_template import ToscaTemplate
+from toscaparser.utils.gettextutils import _
+from toscaparser.utils import httpfile
+
+TOSCA_META = b'''TOSCA-Meta-File-Version: 1.0
+CSAR-Version: 1.1
+Created-By: OASIS TOSCA TC
+Entry-Definitions: definitions/main.yaml
+'''
+
+MAIN_TEMPLATE = b'''tosca_definitions_version: tosca_simple_yaml_1_0
+
+topology_template:
+  node_templates:
+    my_server:
+      type: tosca.nodes.Compute
+      artifacts:
+        image:
+          file: ../images/disk.img
+          type: tosca.artifacts.Deployment.Image
+'''
+
+IMAGE_SIZE = 4 * 1024 * 1024
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        content = self.server.content
+        if self.server.error:
+            self.send_error(self.server.error)
+            return
+        match = re.match(r'bytes=(\d*)-(\d*)$',
+                         self.headers.get('Range') or '')
+        if match and match.group(1) and self.server.range_error:
+            self.send_error(self.server.range_error)
+            return
+        if not match or not self.server.ranges:
+            self._send(200, content)
+            return
+        start, end = match.groups()
+        if not start:
+            start = max(0, len(content) - int(end))
+            end = len(content) - 1
+        start = int(start)
+        end = min(int(end), len(content) - 1) if end else len(content) - 1
+        self._send(206, content[start:end + 1],
+                   'bytes %d-%d/%d' % (start, end, len(content)))
+
+    def _send(self, status, body, content_range=None):
+        self.server.sent += len(body)
+        self.send_response(status)
+        if content_range:
+            self.send_header('Content-Range', content_range)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPFileTest(TestCase):
+
+    def setUp(self):
+        super(HTTPFileTest, self).setUp()
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('TOSCA-Metadata/TOSCA.meta', TOSCA_META)
+            zf.writestr('definitions/main.yaml', MAIN_TEMPLATE)
+            zf.writestr('images/disk.img', os.urandom(IMAGE_SIZE))
+
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.content = archive.getvalue()
+        self.server.ranges = True
+        self.server.sent = 0
+        self.server.error = None
+        self.server.range_error = None
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = 'http://127.0.0.1:%d/app.csar' % self.server.server_port
+        ExceptionCollector.clear()
+        ExceptionCollector.stop()
+
+    def test_range_file(self):
+        content = self.server.content
+        f = httpfile.open_url(self.url)
+        self.assertIsInstance(f, httpfile.HTTPRangeFile)
+        self.assertEqual(len(content), f.seek(0, io.SEEK_END))
+        f.seek(100000)
+        self.assertEqual(content[100000:300000], f.read(200000))
+        self.assertEqual(300000, f.tell())
+        f.seek(-10, io.SEEK_END)
+        self.assertEqual(content[-10:], f.read())
+        self.assertEqual(b'', f.read(10))
+
+    def test_csar_reads_only_the_templates(self):
+        csar = CSAR(self.url, a_file=False)
+        self.assertTrue(csar.validate())
+        self.assertEqual('definitions/main.yaml', csar.get_main_template())
+        # the image is never downloaded
+        self.assertTrue(self.server.sent < IMAGE_SIZE / 8)
+
+        tosca = ToscaTemplate(self.url, a_file=False)
+        self.assertEqual(['my_server'],
+                         [node.name for node in tosca.nodetemplates])
+        self.assertTrue(self.server.sent < IMAGE_SIZE / 4)
+
+    def test_server_without_ranges(self):
+        self.server.ranges = False
+        with httpfile.open_url(self.url) as f:
+            self.assertNotIsInstance(f, httpfile.HTTPRangeFile)
+            self.assertEqual(self.server.content, f.read())
+
+        csar = CSAR(self.url, a_file=False)
+        self.assertTrue(csar.validate())
+
+    def test_http_error(self):
+        for status in (404, 500):
+            self.server.error = status
+            err = self.assertRaises(exception.ValidationError, ToscaTemplate,
+                                    self.url, a_file=False)
+            self.assertIn(_('URLException: Failed to reach server "%s". '
+                            'Reason is: %d') % (self.url, status), str(err))
+
+    def test_range_error(self):
+        # the end of the archive is read, not the templates
+        self.server.range_error = 500
+        ExceptionCollector.start()
+        try:
+            self.assertFalse(CSAR(self.url, a_file=False).validate())
+            self.assertIn(_('URLException: Failed to reach server "%s". '
+                            'Reason is: The server of "%s" did not return '
+                            'the range requested, status 500.')
+                          % (self.url, self.url),
+                          ExceptionCollector.getExceptionsReport(False))
+        finally:
+            ExceptionCollector.stop()
@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import io
 import os
 import requests
 import shutil
@@ -25,6 +26,7 @@ from toscaparser.tests.base import MockTestClass
 from toscaparser.tests.base import TestCase
 from toscaparser.tests import utils
 import toscaparser.utils
+import toscaparser.utils.zipfs
 from toscaparser.utils.gettextutils import _
 from toscaparser.utils.urlutils import UrlUtils
 
@@ -56,14 +58,13 @@ class CSARPrereqTest(TestCase):
     def test_url_is_zip(self, mock_requests_get):
         path = "https://example.com/csar_not_zip.zip"
 
-        class TestResponse:
-            content: bytes
-
-        response = TestResponse()
+        # a server not supporting range requests
+        response = requests.models.Response()
+        response.status_code = 200
         file_path = utils.get_sample_test_path("data/CSAR/csar_not_zip.zip")
 
         with open(file_path, 'br') as f:
-            response.content = f.read()
+            response.raw = io.BytesIO(f.read())
 
         mock_requests_get.return_value = response
         csar = CSAR(path, False)
@@ -254,6 +255,42 @@ class CSARPrereqTest(TestCase):
         self.assertTrue(csar.temp_dir is None or
                         not os.path.exists(csar.temp_dir))
 
+    def test_filesystem(self):
+        path = os.path.join(self.base_path, "data/CSAR/csar_hello_world.zip")
+        csar = CSAR(path)
+        self.assertTrue(csar.validate())
+        fs = csar.filesystem
+        main_template = csar.get_main_template_path()
+        self.assertEqual(os.path.join(fs.root, 'tosca_helloworld.yaml'),
+                         main_template)
+        self.assertTrue(fs.isfile(main_template))
+        self.assertTrue(fs.isdir(os.path.join(fs.root, 'TOSCA-Metadata')))
+        self.assertFalse(fs.isfile(os.path.join(fs.root, 'missing.yaml')))
+        self.assertIsNone(fs.member('/elsewhere/tosca_helloworld.yaml'))
+
+        self.assertFalse(toscaparser.utils.zipfs.isfile(main_template))
+        with fs.mounted():
+            self.assertTrue(toscaparser.utils.zipfs.isfile(main_template))
+            tpl = toscaparser.utils.yamlparser.load_yaml(main_template)
+            self.assertEqual('tosca_simple_yaml_1_0',
+                             tpl['tosca_definitions_version'])
+        self.assertFalse(os.path.exists(fs.root))
+
+    def test_artifact_index(self):
+        path = os.path.join(self.base_path, "data/CSAR/"
+                            "csar_wordpress_valid_artifact_multi.zip")
+        csar = CSAR(path)
+        self.assertTrue(csar.validate())
+        indexes = csar.get_artifact_indexes()
+        self.assertEqual(['Definitions/tosca_single_instance_wordpress.yaml'],
+                         list(indexes))
+        index = indexes['Definitions/tosca_single_instance_wordpress.yaml']
+        self.assertEqual(['wordpress'], index.artifacts['dummy-wordpress'])
+        self.assertEqual([('wordpress', 'Standard', 'configure')],
+                         index.implementations['dummy-wordpress'])
+        self.assertEqual({'dummy-wordpress'}, index.artifact_implementations)
+        self.assertTrue(index.implements_artifacts())
+
     def test_alternate_csar_extension(self):
         path = os.path.join(self.base_path, "data/CSAR/csar_elk.csar")
         csar = CSAR(path)
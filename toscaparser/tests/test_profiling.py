@@ -0,0 +1,89 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+import io
+
+import toscaparser.shell as shell
+from toscaparser.tests.base import TestCase
+from toscaparser.tests import utils
+from toscaparser.tosca_template import ToscaTemplate
+from toscaparser.utils import profiling
+
+
+class RecordingHook(profiling.ProfilingHook):
+
+    def __init__(self):
+        self.events = []
+        self.stopped = []
+
+    def timer_started(self, name):
+        self.events.append(('start', name))
+        return name
+
+    def timer_stopped(self, name, elapsed, state):
+        self.events.append(('stop', name))
+        self.stopped.append((state, name, elapsed >= 0))
+
+    def counted(self, name, value):
+        self.events.append(('count', name))
+
+
+class ProfilingTest(TestCase):
+
+    tosca_elk_tpl = utils.get_sample_test_path("data/tosca_elk.yaml")
+
+    def test_no_hook(self):
+        self.assertIsNone(profiling.get_hook())
+        with profiling.timer('phase'):
+            profiling.count('counter')
+
+    def test_hook(self):
+        hook = RecordingHook()
+        with profiling.profile(hook):
+            self.assertIs(hook, profiling.get_hook())
+            ToscaTemplate(self.tosca_elk_tpl)
+        self.assertIsNone(profiling.get_hook())
+        for state, name, positive in hook.stopped:
+            self.assertEqual(name, state)
+            self.assertTrue(positive)
+        self.assertEqual(('start', 'template'), hook.events[0])
+        self.assertEqual(('stop', 'template'), hook.events[-1])
+        for event in [('start', 'imports'), ('stop', 'imports'),
+                      ('start', 'topology.intrinsic_functions'),
+                      ('count', 'validate.properties')]:
+            self.assertIn(event, hook.events)
+
+    def test_profiler(self):
+        profiler = profiling.Profiler(trace_allocations=True)
+        with profiling.profile(profiler):
+            ToscaTemplate(self.tosca_elk_tpl)
+        self.assertEqual(1, profiler.timers['template'].calls)
+        self.assertTrue(profiler.timers['yaml.load'].calls > 1)
+        self.assertIsNotNone(profiler.timers['template'].allocated)
+        self.assertTrue(profiler.counters['types.resolved'])
+        self.assertTrue(profiler.peak_memory)
+        report = profiler.report()
+        self.assertIn('topology.node_templates', report)
+        self.assertIn('validate.datatype', report)
+
+    def test_import_time(self):
+        self.assertGreater(profiling.import_time('toscaparser', runs=1), 0)
+
+    def test_shell_profile(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            shell.main(['--template-file=' + self.tosca_elk_tpl,
+                        '--profile'])
+        report = output.getvalue().split('\nprofile:\n')[1]
+        self.assertIn('template', report)
+        self.assertIn('peak memory', report)
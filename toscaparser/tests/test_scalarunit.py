@@ -14,6 +14,7 @@ from toscaparser.common import exception
 from toscaparser.elements.scalarunit import ScalarUnit_Frequency
 from toscaparser.elements.scalarunit import ScalarUnit_Size
 from toscaparser.elements.scalarunit import ScalarUnit_Time
+from toscaparser.elements.scalarunit import ScalarUnitValue
 from toscaparser.nodetemplate import NodeTemplate
 from toscaparser.tests.base import TestCase
 from toscaparser.utils.gettextutils import _
@@ -353,3 +354,23 @@ class ScalarUnitNegativeTest(TestCase):
             self.assertEqual(_('The value "1 MB" of property "mem_size" is '
                                'out of range "(min:1 MiB, max:1 GiB)".'),
                              error.__str__())
+
+
+class ScalarUnitValueTest(TestCase):
+
+    def test_parse(self):
+        value = ScalarUnit_Size('2   kib').parse()
+        self.assertEqual(ScalarUnitValue('2', 'KiB', 2048.0), value)
+        self.assertEqual('2 KiB', str(value))
+        self.assertEqual(ScalarUnitValue('0.5', 'm', 30.0),
+                         ScalarUnit_Time('0.5m').parse())
+        self.assertEqual({'HZ': 'Hz', 'KHZ': 'kHz', 'MHZ': 'MHz',
+                          'GHZ': 'GHz'},
+                         ScalarUnit_Frequency.SCALAR_UNIT_UPPER)
+
+    def test_parse_invalid(self):
+        for value in ('1.2.3 GB', '1 QB', 'MB', 12):
+            error = self.assertRaises(ValueError,
+                                      ScalarUnit_Size(value).parse)
+            self.assertEqual(_('"%s" is not a valid scalar-unit.') % value,
+                             str(error))
@@ -10,6 +10,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import io
+import json
+from unittest import mock
+
 from toscaparser.common import exception
 import toscaparser.shell as shell
 from toscaparser.tests.base import TestCase
@@ -45,3 +49,33 @@ class ShellTest(TestCase):
             shell.main([arg])
         except Exception:
             self.fail(_('The program raised an exception unexpectedly.'))
+
+    def test_batch(self):
+        argv = ['batch', '--workers=1', '--ordered', self.tosca_helloworld,
+                self.errornous_template]
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertEqual(1, shell.main(argv))
+        results = [json.loads(line) for line in stdout.getvalue().split('\n')
+                   if line.startswith('{')]
+        self.assertEqual([self.tosca_helloworld, self.errornous_template],
+                         [result['path'] for result in results])
+        self.assertEqual([True, False],
+                         [result['valid'] for result in results])
+
+    def test_json(self):
+        argv = ['--template-file=' + self.errornous_template, '--json']
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertEqual(1, shell.main(argv))
+        errors = [json.loads(line) for line in stdout.getvalue().split('\n')
+                  if line.startswith('{')]
+        self.assertIn({'type': 'InvalidTypeError',
+                       'message': _('Type "tosca.nodes.XYZ" is not a valid '
+                                    'type.'),
+                       'path': self.errornous_template,
+                       'location': ['topology_template', 'node_templates',
+                                    'xyz'],
+                       'node': 'xyz', 'property': None, 'trace': None},
+                      errors)
+
+    def test_batch_missing_arg(self):
+        self.assertRaises(SystemExit, shell.main, ['batch'])
@@ -0,0 +1,77 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+
+from toscaparser.common import exception
+from toscaparser.template_cache import TemplateCache
+from toscaparser.tests.base import TestCase
+from toscaparser.tests import utils
+
+
+class TemplateCacheTest(TestCase):
+
+    params = {'my_cpus': 2}
+
+    def setUp(self):
+        super(TemplateCacheTest, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        # nested imports of the sample types are relative to a data dir
+        self.directory = os.path.join(self.tmp_dir, 'data')
+        os.mkdir(self.directory)
+        data = utils.get_sample_test_path('data')
+        shutil.copy(os.path.join(data, 'tosca_elk.yaml'), self.directory)
+        shutil.copytree(os.path.join(data, 'custom_types'),
+                        os.path.join(self.directory, 'custom_types'))
+        self.path = os.path.join(self.directory, 'tosca_elk.yaml')
+        self.cache = TemplateCache(max_size=2)
+
+    def test_cache_hit(self):
+        tosca = self.cache.get_template(self.path, self.params)
+        self.assertIs(tosca, self.cache.get_template(self.path, self.params))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+        other = self.cache.get_template(self.path, {'my_cpus': 4})
+        self.assertIsNot(tosca, other)
+        self.assertEqual(2, self.cache.misses)
+
+    def test_changed_import(self):
+        tosca = self.cache.get_template(self.path, self.params)
+        imported = os.path.join(self.directory, 'custom_types/kibana.yaml')
+        with open(imported, 'a') as f:
+            f.write('\n# changed\n')
+        self.assertIsNot(tosca, self.cache.get_template(self.path,
+                                                        self.params))
+
+        tosca = self.cache.get_template(self.path, self.params)
+        self.cache.invalidate(imported)
+        self.assertEqual(0, len(self.cache))
+        self.assertIsNot(tosca, self.cache.get_template(self.path,
+                                                        self.params))
+
+    def test_bounded_size(self):
+        for cpus in range(3):
+            self.cache.get_template(self.path, {'my_cpus': cpus + 1})
+        self.assertEqual(2, len(self.cache))
+        self.cache.get_template(self.path, {'my_cpus': 1})
+        self.assertEqual((0, 4), (self.cache.hits, self.cache.misses))
+
+    def test_invalid_template_not_cached(self):
+        path = utils.get_sample_test_path(
+            'data/test_invalid_section_names.yaml')
+        for i in range(2):
+            self.assertRaises(exception.ValidationError,
+                              self.cache.get_template, path)
+        self.assertEqual(0, len(self.cache))
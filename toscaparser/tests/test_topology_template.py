@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import operator
 import os
 
 from toscaparser.common import exception
@@ -153,6 +154,27 @@ class TopologyTemplateTest(TestCase):
                 self.assertEqual('Linux', os_props['type'].value)
                 self.assertEqual('Linux', os_type_prop)
 
+    def test_get_node_template(self):
+        for tpl in self.topo.nodetemplates:
+            self.assertIs(tpl, self.topo.get_node_template(tpl.name))
+        self.assertIsNone(self.topo.get_node_template('unknown'))
+
+        # the index follows changes made to the list of node templates
+        server = self.topo.get_node_template('server')
+        index = self.topo.nodetemplates.index(server)
+        client = self.topo.nodetemplates[index - 1]
+        self.topo.nodetemplates[index] = client
+        self.assertIsNone(self.topo.get_node_template('server'))
+        self.topo.nodetemplates[index] = server
+        self.assertIs(server, self.topo.get_node_template('server'))
+        server.name = 'host'
+        self.assertIsNone(self.topo.get_node_template('server'))
+        self.assertIs(server, self.topo.get_node_template('host'))
+        self.topo.nodetemplates.remove(server)
+        self.assertIsNone(self.topo.get_node_template('host'))
+        self.assertIs(client, self.topo.get_node_template(client.name))
+        self.assertIsNone(self.topo.get_relationship_template('unknown'))
+
     def test_outputs(self):
         self.assertEqual(
             sorted(['receiver_ip', 'receiver_port']),
@@ -179,6 +201,24 @@ class TopologyTemplateTest(TestCase):
                 nested_tosca_templates_with_topology), 4)
         self.assertTrue(system_tosca_template.has_nested_templates())
 
+    def test_system_template_loads_each_file_once(self):
+        tpl_path = utils.get_sample_test_path(
+            "data/topology_template/system.yaml")
+        with toscaparser.utils.yamlparser.record_loads() as loads:
+            system_tosca_template = ToscaTemplate(tpl_path)
+        paths = [path for path, a_file, digest in loads]
+        # the system template, the three subsystems and their definitions
+        self.assertEqual(5, len(paths))
+        self.assertEqual(sorted(set(paths)), sorted(paths))
+
+        custom_defs = system_tosca_template.custom_defs
+        self.assertIn('example.QueuingSubsystem', custom_defs)
+        self.assertRaises(TypeError, operator.setitem, custom_defs, 'a', {})
+        for nested in system_tosca_template.\
+                nested_tosca_templates_with_topology:
+            self.assertIs(system_tosca_template.topology_template.custom_defs,
+                          nested.custom_defs)
+
     def test_invalid_keyname(self):
         tpl_snippet = '''
         substitution_mappings:
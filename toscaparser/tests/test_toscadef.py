@@ -10,13 +10,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import subprocess
+import sys
+
 from toscaparser.common import exception
+from toscaparser.dataentity import DataTypeValidator
 from toscaparser.elements.artifacttype import ArtifactTypeDef
+from toscaparser.elements import definitions
 from toscaparser.elements.entity_type import EntityType
 from toscaparser.elements.grouptype import GroupType
 import toscaparser.elements.interfaces as ifaces
 from toscaparser.elements.nodetype import NodeType
 from toscaparser.elements.policytype import PolicyType
+from toscaparser.elements.type_registry import TypeRegistry
 from toscaparser.tests.base import TestCase
 
 compute_type = NodeType('tosca.nodes.Compute')
@@ -406,3 +412,85 @@ class ToscaDefTest(TestCase):
             sorted(['protocol', 'target', 'target_range', 'source',
                     'source_range']),
             sorted(properties.keys()))
+
+    def test_is_derived_from(self):
+        self.assertTrue(webserver_type.is_derived_from('tosca.nodes.Root'))
+        self.assertTrue(webserver_type.is_derived_from(
+            'tosca.nodes.SoftwareComponent'))
+        self.assertFalse(webserver_type.is_derived_from('tosca.nodes.Compute'))
+        self.assertTrue(artif_bash_type.is_derived_from(
+            'tosca.artifacts.Implementation'))
+
+    def test_type_registry_shared(self):
+        custom_def = {'tosca.nodes.MyWebServer':
+                      {'derived_from': 'tosca.nodes.WebServer'}}
+        registry = TypeRegistry.get(EntityType.TOSCA_DEF, custom_def)
+        self.assertIs(registry,
+                      TypeRegistry.get(EntityType.TOSCA_DEF, custom_def))
+        node_type = NodeType('tosca.nodes.MyWebServer', custom_def)
+        self.assertIs(registry.resolve('tosca.nodes.MyWebServer',
+                                       EntityType.NODE_PREFIX),
+                      node_type._resolved)
+        self.assertTrue(node_type.is_derived_from('tosca.nodes.WebServer'))
+        self.assertEqual(webserver_type.requirements, node_type.requirements)
+        self.assertIsNot(node_type.requirements, node_type.requirements)
+
+    def test_type_registry_changed_in_place(self):
+        custom_def = {'tosca.nodes.MyServer':
+                      {'derived_from': 'tosca.nodes.WebServer'},
+                      'tosca.datatypes.MyData':
+                      {'derived_from': 'tosca.datatypes.Root',
+                       'properties': {'name': {'type': 'string'}}}}
+        node_type = NodeType('tosca.nodes.MyServer', custom_def)
+        validator = DataTypeValidator.get('tosca.datatypes.MyData',
+                                          custom_def)
+        self.assertIs(validator, DataTypeValidator.get(
+            'tosca.datatypes.MyData', custom_def))
+        version = TypeRegistry.version
+        custom_def['tosca.nodes.MyServer']['derived_from'] = \
+            'tosca.nodes.Compute'
+        custom_def['tosca.datatypes.MyData']['properties']['size'] = \
+            {'type': 'integer'}
+        TypeRegistry.clear()
+        self.assertEqual(version + 1, TypeRegistry.version)
+        self.assertTrue(node_type.is_derived_from('tosca.nodes.WebServer'))
+        node_type = NodeType('tosca.nodes.MyServer', custom_def)
+        self.assertTrue(node_type.is_derived_from('tosca.nodes.Compute'))
+        self.assertFalse(node_type.is_derived_from('tosca.nodes.WebServer'))
+        validator = DataTypeValidator.get('tosca.datatypes.MyData',
+                                          custom_def)
+        self.assertEqual(['name', 'size'], sorted(validator.properties))
+
+    def test_type_registry_invalid_parent(self):
+        custom_def = {'tosca.nodes.MyServer':
+                      {'derived_from': 'tosca.nodes.Missing'}}
+        node_type = NodeType('tosca.nodes.MyServer', custom_def)
+        self.assertRaises(exception.InvalidTypeError,
+                          node_type.is_derived_from, 'tosca.nodes.Root')
+
+    def test_definitions_per_version(self):
+        nfv_version = 'tosca_simple_profile_for_nfv_1_0_0'
+        nfv_def = definitions.get_definitions(nfv_version)
+        self.assertIs(nfv_def, definitions.get_definitions(nfv_version))
+        self.assertIs(EntityType.TOSCA_DEF, definitions.get_definitions())
+        self.assertIn('tosca.nodes.nfv.VNF', nfv_def)
+        self.assertIn('tosca.nodes.Compute', nfv_def)
+        self.assertNotIn('tosca.nodes.nfv.VNF', EntityType.TOSCA_DEF)
+        self.assertEqual(len(list(nfv_def)), len(nfv_def))
+
+        custom_def = definitions.CustomDefinitions({}, nfv_def)
+        self.assertEqual('tosca.nodes.nfv.VNF',
+                         NodeType('tosca.nodes.nfv.VNF', custom_def).type)
+        self.assertRaises(exception.InvalidTypeError, NodeType,
+                          'tosca.nodes.nfv.VNF')
+
+    def test_lazy_definitions(self):
+        # nothing is loaded nor discovered by the import of the parser
+        code = ('import sys; import toscaparser.tosca_template; '
+                'from toscaparser.elements import definitions; '
+                'print("stevedore" in sys.modules, len(definitions._loaded))')
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(b'False 0', output.strip())
+        self.assertIn('tosca.nodes.Compute', EntityType.TOSCA_DEF)
+        self.assertIs(EntityType.TOSCA_DEF, NodeType.TOSCA_DEF)
+        self.assertIs(EntityType.__dict__['TOSCA_DEF'], EntityType.TOSCA_DEF)
@@ -10,6 +10,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from concurrent import futures
+import copy
+import io
 import os
 import requests
 from unittest import mock
@@ -29,6 +32,7 @@ from toscaparser.tosca_template import ToscaTemplate
 from toscaparser.utils.gettextutils import _
 from toscaparser.utils.urlutils import UrlUtils
 import toscaparser.utils.yamlparser
+from toscaparser.utils import zipfs
 
 
 class ToscaTemplateTest(TestCase):
@@ -251,6 +255,293 @@ class ToscaTemplateTest(TestCase):
         tosca_tpl = self._load_template('custom_types/wordpress.yml')
         self.assertIsNotNone(tosca_tpl)
 
+    def test_relationship_targets_are_topology_nodes(self):
+        template = ToscaTemplate(self.tosca_elk_tpl)
+        nodes = {node_tpl.name: node_tpl
+                 for node_tpl in template.nodetemplates}
+        targets = 0
+        for node_tpl in template.nodetemplates:
+            for trgt in node_tpl.relationships.values():
+                self.assertIs(nodes[trgt.name], trgt)
+                targets += 1
+        self.assertTrue(targets)
+
+    def test_lazy_template(self):
+        template = ToscaTemplate(self.tosca_elk_tpl, lazy=True)
+        topology = template.topology_template
+        self.assertNotIn('nodetemplates', vars(template))
+        self.assertEqual(['my_cpus', 'github_url'],
+                         [input.name for input in template.inputs])
+        self.assertNotIn('nodetemplates', vars(topology))
+
+        # only the node template looked up and its targets are parsed
+        logstash = topology.get_node_template('logstash')
+        self.assertEqual('tosca.nodes.SoftwareComponent.Logstash',
+                         logstash.type)
+        self.assertNotIn('nodetemplates', vars(topology))
+        self.assertIsNone(topology.get_node_template('missing'))
+
+        template.validate()
+        nodes = {node_tpl.name: node_tpl
+                 for node_tpl in template.nodetemplates}
+        self.assertIs(logstash, nodes['logstash'])
+        eager = ToscaTemplate(self.tosca_elk_tpl)
+        self.assertEqual([node_tpl.name for node_tpl in eager.nodetemplates],
+                         list(nodes))
+        for node_tpl in template.nodetemplates:
+            for trgt in node_tpl.relationships.values():
+                self.assertIs(nodes[trgt.name], trgt)
+
+    def test_lazy_template_validate(self):
+        tpl_snippet = '''
+        tosca_definitions_version: tosca_simple_yaml_1_0
+        topology_template:
+          inputs:
+            cpus:
+              type: integer
+          node_templates:
+            server:
+              type: tosca.nodes.Compute
+              capabilities:
+                host:
+                  properties:
+                    num_cpus: { get_input: cpus }
+            client:
+              type: tosca.nodes.Compute
+              properties:
+                unknown: 1
+        '''
+        tpl = toscaparser.utils.yamlparser.simple_parse(tpl_snippet)
+        template = ToscaTemplate(parsed_params={'cpus': 2},
+                                 yaml_dict_tpl=tpl, lazy=True)
+        self.assertEqual(['cpus'], [input.name for input in template.inputs])
+        # the errors of the node templates are found when they are parsed
+        server = template.topology_template.get_node_template('server')
+        self.assertEqual('tosca.nodes.Compute', server.type)
+        err = self.assertRaises(exception.ValidationError, template.validate)
+        self.assertIn(_('UnknownFieldError: "properties" of template '
+                        '"client" contains unknown field "unknown".'),
+                      str(err))
+
+    def _get_errors(self, tpl, parsed_params=None):
+        try:
+            ToscaTemplate(yaml_dict_tpl=copy.deepcopy(tpl),
+                          parsed_params=parsed_params, collect_traces=False)
+        except exception.ValidationError as err:
+            return set(str(err).split('\n\t')[1:])
+        return set()
+
+    def test_update_node_template(self):
+        tpl_snippet = '''
+        tosca_definitions_version: tosca_simple_yaml_1_0
+        topology_template:
+          inputs:
+            cpus:
+              type: integer
+          node_templates:
+            server:
+              type: tosca.nodes.Compute
+              capabilities:
+                host:
+                  properties:
+                    num_cpus: { get_input: cpus }
+            client:
+              type: tosca.nodes.SoftwareComponent
+              requirements:
+                - host: server
+            other:
+              type: tosca.nodes.Compute
+        '''
+        tpl = toscaparser.utils.yamlparser.simple_parse(tpl_snippet)
+        template = ToscaTemplate(parsed_params={'cpus': 2},
+                                 yaml_dict_tpl=copy.deepcopy(tpl),
+                                 collect_traces=False)
+        topology = template.topology_template
+
+        # the errors are the same as when the template is parsed again
+        errors = template.set_input('cpus', 'many')
+        self.assertEqual(self._get_errors(tpl, {'cpus': 'many'}),
+                         set(exception.ExceptionCollector.
+                             getExceptionsReport(False, errors)))
+        self.assertTrue(errors)
+        self.assertEqual('many', template.parsed_params['cpus'])
+        self.assertRaises(exception.ValidationError, template.validate)
+
+        edited = copy.deepcopy(tpl)
+        server_tpl = edited['topology_template']['node_templates'].pop(
+            'server')
+        errors = template.remove_node_template('server')
+        self.assertEqual(self._get_errors(edited, {'cpus': 'many'}),
+                         set(exception.ExceptionCollector.
+                             getExceptionsReport(False, errors)))
+        self.assertEqual(['client', 'other'],
+                         [node_tpl.name
+                          for node_tpl in template.nodetemplates])
+        self.assertRaises(KeyError, template.remove_node_template, 'server')
+
+        # only the node templates depending on the input are parsed again
+        client = topology.get_node_template('client')
+        other = topology.get_node_template('other')
+        template.set_input('cpus', 4)
+        self.assertIs(client, topology.get_node_template('client'))
+        errors = template.update_node_template('server', server_tpl)
+        self.assertEqual([], errors)
+        template.validate()
+        server = topology.get_node_template('server')
+        self.assertEqual(['client', 'other', 'server'],
+                         [node_tpl.name
+                          for node_tpl in template.nodetemplates])
+        self.assertEqual(4, server.get_capability('host').
+                         get_property_value('num_cpus'))
+        client = topology.get_node_template('client')
+        self.assertEqual([server], list(client.relationships.values()))
+        self.assertIs(other, topology.get_node_template('other'))
+        self.assertEqual(set(template.nodetemplates),
+                         set(template.graph))
+
+    def test_update_lazy_template(self):
+        tpl = toscaparser.utils.yamlparser.load_yaml(self.tosca_elk_tpl)
+        kibana = tpl['topology_template']['node_templates']['kibana']
+        del kibana['requirements']
+        templates = [ToscaTemplate(self.tosca_elk_tpl, lazy=True),
+                     ToscaTemplate(self.tosca_elk_tpl)]
+        reports = []
+        for template in templates:
+            template.update_node_template('kibana', copy.deepcopy(kibana))
+            errors = template.remove_node_template('elasticsearch')
+            reports.append(exception.ExceptionCollector.getExceptionsReport(
+                False, errors))
+        self.assertIn(_('KeyError: \'Node template "elasticsearch" was not '
+                        'found in "logstash".\''), reports[0])
+        self.assertEqual(reports[1], reports[0])
+        lazy, eager = templates
+        self.assertEqual(
+            [(node_tpl.name, sorted(trgt.name for trgt
+                                    in node_tpl.relationships.values()))
+             for node_tpl in eager.nodetemplates],
+            [(node_tpl.name, sorted(trgt.name for trgt
+                                    in node_tpl.relationships.values()))
+             for node_tpl in lazy.nodetemplates])
+
+    def test_max_errors(self):
+        path = utils.get_sample_test_path(
+            'data/test_multiple_validation_errors.yaml')
+        err = self.assertRaises(exception.ValidationError, ToscaTemplate,
+                                path, collect_traces=False, max_errors=1)
+        self.assertEqual(1, len(str(err).split('\n\t')[1:]))
+        self.assertIn(_('InvalidTemplateVersion: The template version '
+                        '"tosca_simple_yaml_1" is invalid.'), str(err))
+
+        # the node templates are parsed, not the graph of the requirements
+        tpl = toscaparser.utils.yamlparser.simple_parse('''
+        tosca_definitions_version: tosca_simple_yaml_1_0
+        topology_template:
+          node_templates:
+            server:
+              type: tosca.nodes.Compute
+            app:
+              type: xyz
+              requirements:
+                - host: server
+        ''')
+        with mock.patch('toscaparser.tosca_template.ToscaGraph') as graph:
+            err = self.assertRaises(exception.ValidationError, ToscaTemplate,
+                                    yaml_dict_tpl=tpl, max_errors=5)
+        graph.assert_not_called()
+        self.assertIn(_('InvalidTypeError: Type "xyz" is not a valid '
+                        'type.'), str(err))
+
+    def test_changed_definitions(self):
+        # a template edited in place is validated against its new content
+        tpl = toscaparser.utils.yamlparser.simple_parse('''
+        tosca_definitions_version: tosca_simple_yaml_1_0
+        node_types:
+          my.Base:
+            derived_from: tosca.nodes.Root
+            properties:
+              mem:
+                type: integer
+          my.Server:
+            derived_from: tosca.nodes.Root
+            properties:
+              cpus:
+                type: integer
+                constraints:
+                  - in_range: [1, 2]
+        topology_template:
+          node_templates:
+            server:
+              type: my.Server
+              properties:
+                cpus: 4
+        ''')
+        constraints = tpl['node_types']['my.Server']['properties'][
+            'cpus']['constraints']
+        err = self.assertRaises(exception.ValidationError, ToscaTemplate,
+                                yaml_dict_tpl=tpl)
+        self.assertIn('(min:1, max:2)', str(err))
+        constraints[0]['in_range'][1] = 10
+        ToscaTemplate(yaml_dict_tpl=tpl)
+        constraints[0]['in_range'][0] = 5
+        err = self.assertRaises(exception.ValidationError, ToscaTemplate,
+                                yaml_dict_tpl=tpl)
+        self.assertIn('(min:5, max:10)', str(err))
+
+        # and so is a node template updated after its type was changed
+        constraints[0]['in_range'][0] = 1
+        template = ToscaTemplate(yaml_dict_tpl=tpl)
+        tpl['node_types']['my.Server']['derived_from'] = 'my.Base'
+        errors = template.update_node_template(
+            'server', tpl['topology_template']['node_templates']['server'])
+        self.assertIn("missing required field \"['mem']\"",
+                      exception.ExceptionCollector.
+                      getExceptionsReport(False, errors)[0])
+
+    def test_unexpected_error(self):
+        # the archive is unmounted and the errors are no longer collected
+        path = utils.get_sample_test_path('data/CSAR/csar_hello_world.zip')
+        with mock.patch.object(ToscaTemplate, '_validate_field',
+                               side_effect=KeyError('boom')):
+            self.assertRaises(KeyError, ToscaTemplate, path)
+        self.assertEqual({}, zipfs._mounts)
+        self.assertFalse(exception.ExceptionCollector.collecting)
+
+    def test_named_relationship_interface(self):
+        # the functions of named relationship templates are not resolved,
+        # they may be shared by several node templates
+        tpl = toscaparser.utils.yamlparser.simple_parse('''
+        tosca_definitions_version: tosca_simple_yaml_1_0
+        topology_template:
+          inputs:
+            port:
+              type: integer
+              default: 80
+          relationship_templates:
+            link:
+              type: tosca.relationships.ConnectsTo
+              interfaces:
+                Configure:
+                  pre_configure_source:
+                    implementation: link.sh
+                    inputs:
+                      port: { get_input: port }
+          node_templates:
+            server:
+              type: tosca.nodes.Compute
+            client:
+              type: tosca.nodes.SoftwareComponent
+              requirements:
+                - host: server
+                - dependency:
+                    node: server
+                    relationship: link
+        ''')
+        template = ToscaTemplate(yaml_dict_tpl=tpl)
+        link = template.topology_template.get_relationship_template('link')
+        self.assertEqual([{'port': {'get_input': 'port'}}],
+                         [interface.inputs
+                          for interface in link.interfaces])
+
     def test_relationship_interface(self):
         template = ToscaTemplate(self.tosca_elk_tpl)
         for node_tpl in template.nodetemplates:
@@ -604,19 +895,52 @@ class ToscaTemplateTest(TestCase):
                                                      "db_port": 3306,
                                                      "cpus": 4}))
 
+    def test_csar_parsing_without_extraction(self):
+        csar_archive = utils.get_sample_test_path(
+            "data/CSAR/csar_relative_path_import_check.zip")
+        tosca = ToscaTemplate(csar_archive)
+        root = tosca.csar.filesystem.root
+        # the files were read from the archive
+        self.assertFalse(os.path.exists(root))
+        self.assertIsNone(tosca.csar.temp_dir)
+        self.assertIsNone(zipfs.lookup(root))
+
+        # and are extracted for the callers needing them on disk
+        try:
+            self.assertTrue(tosca.path.startswith(root))
+            self.assertTrue(os.path.isfile(tosca.path))
+            self.assertEqual(root, tosca.csar.temp_dir)
+        finally:
+            tosca.csar.filesystem.cleanup()
+        self.assertFalse(os.path.exists(root))
+
+    def test_csar_path(self):
+        # the path of the template exists once parsed, lazily or not
+        csar_archive = utils.get_sample_test_path(
+            "data/CSAR/csar_wordpress.zip")
+        params = {"db_name": "mysql", "db_user": "mysql",
+                  "db_root_pwd": "1234", "db_pwd": "5678",
+                  "db_port": 3306, "cpus": 4}
+        for lazy in (False, True):
+            tosca = ToscaTemplate(csar_archive, parsed_params=params,
+                                  lazy=lazy)
+            self.addCleanup(tosca.csar.filesystem.cleanup)
+            directory = os.path.dirname(tosca.path)
+            with open(os.path.join(directory, 'wordpress.yaml')) as f:
+                self.assertIn('tosca.nodes.WebApplication.WordPress',
+                              f.read())
+
     @mock.patch.object(requests, 'get')
     def test_csar_parsing_elk_url_based(self, mock_requests_get):
         csar_archive = 'https://example.com/csar_elk.zip'
 
-        class TestResponse:
-            content: bytes
-
-        response = TestResponse()
+        # a server not supporting range requests
+        response = requests.models.Response()
+        response.status_code = 200
         file_path = utils.get_sample_test_path("data/CSAR/csar_elk.zip")
 
         with open(file_path, 'br') as f:
-            response.content = f.read()
-        f.close()
+            response.raw = io.BytesIO(f.read())
 
         mock_requests_get.return_value = response
         self.assertTrue(ToscaTemplate(csar_archive, a_file=False,
@@ -1071,3 +1395,24 @@ class ToscaTemplateTest(TestCase):
                 (t.tpl["topology_template"]["node_templates"]["wordpress"]
                     ["interfaces"]["Standard"]["configure"]["inputs"]).keys())
             self.assertEqual(expected, actual)
+
+    def test_concurrent_parsing(self):
+        invalid_tpl = utils.get_sample_test_path(
+            "data/test_invalid_section_names.yaml")
+        valid_tpl = utils.get_sample_test_path(
+            "data/tosca_single_instance_wordpress.yaml")
+        params = {'db_name': 'my_wordpress', 'db_user': 'my_db_user',
+                  'db_root_pwd': '12345678'}
+
+        def parse(path):
+            try:
+                ToscaTemplate(path, params)
+            except exception.ValidationError:
+                return exception.ExceptionCollector.getExceptionsReport(False)
+            return []
+
+        with futures.ThreadPoolExecutor(max_workers=4) as executor:
+            reports = list(executor.map(parse, [invalid_tpl, valid_tpl] * 4))
+        expected = parse(invalid_tpl)
+        self.assertTrue(expected)
+        self.assertEqual([expected, []] * 4, reports)
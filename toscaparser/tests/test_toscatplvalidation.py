@@ -553,6 +553,38 @@ tosca-parser/master/toscaparser/tests/data/custom_types/wordpress.yaml
         ld2 = ImportsLoader(imports, path, "node_types", local_defs)
         self.assertEqual(ld1.get_custom_defs(), ld2.get_custom_defs())
 
+    def test_imports_loaded_in_parallel(self):
+        tpl_snippet = '''
+        imports:
+          - custom_types/elasticsearch.yaml
+          - logstash: custom_types/logstash.yaml
+          - custom_types/missing.yaml
+          - kibana:
+              file: custom_types/kibana.yaml
+              namespace_prefix: kb
+          - custom_types/collectd.yaml
+        '''
+        path = utils.get_sample_test_path("data/tosca_elk.yaml")
+        imports = (toscaparser.utils.yamlparser.
+                   simple_parse(tpl_snippet)['imports'])
+        results = []
+        for max_workers in (1, 4):
+            exception.ExceptionCollector.start()
+            loader = ImportsLoader(imports, path, "node_types",
+                                   max_workers=max_workers)
+            exception.ExceptionCollector.stop()
+            results.append(
+                (loader.get_custom_defs(), loader.get_nested_imports(),
+                 exception.ExceptionCollector.getExceptionsReport(False)))
+        serial, parallel = results
+        self.assertEqual(serial, parallel)
+        self.assertEqual(list(serial[0]), list(parallel[0]))
+        self.assertIn('kb.tosca.nodes.SoftwareComponent.Kibana', serial[0])
+        self.assertEqual(
+            [_('ImportError: Import "custom_types/missing.yaml" is not '
+               'valid.')],
+            serial[2])
+
     def test_imports_file_with_suffix_yml(self):
         tpl_snippet = '''
         imports:
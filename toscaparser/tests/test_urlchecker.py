@@ -0,0 +1,109 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import http.server
+import threading
+import time
+
+from toscaparser.tests.base import TestCase
+from toscaparser.utils.urlchecker import URLChecker
+from toscaparser.utils.urlutils import UrlUtils
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    def do_HEAD(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(('HEAD', self.path))
+            server.inflight += 1
+            server.max_inflight = max(server.max_inflight, server.inflight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.inflight -= 1
+        if self.path.startswith('/no-head'):
+            self.send_response(405)
+        elif self.path.startswith('/missing'):
+            self.send_response(404)
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append(('GET', self.path))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+class URLCheckerTest(TestCase):
+
+    def setUp(self):
+        super(URLCheckerTest, self).setUp()
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        server.daemon_threads = True
+        server.lock = threading.Lock()
+        server.requests = []
+        server.inflight = 0
+        server.max_inflight = 0
+        server.delay = 0
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.server = server
+        self.base_url = 'http://127.0.0.1:%d/' % server.server_port
+
+    def test_url_accessible(self):
+        self.assertTrue(UrlUtils.url_accessible(self.base_url + 'script.sh'))
+        self.assertFalse(UrlUtils.url_accessible(self.base_url + 'missing'))
+        # servers not supporting HEAD are sent a GET request
+        self.assertTrue(UrlUtils.url_accessible(self.base_url + 'no-head'))
+        self.assertEqual([('HEAD', '/script.sh'), ('HEAD', '/missing'),
+                          ('HEAD', '/no-head'), ('GET', '/no-head')],
+                         self.server.requests)
+
+    def test_check_in_order_and_cached(self):
+        checker = URLChecker()
+        urls = [self.base_url + name for name in
+                ['a.sh', 'missing/b.sh', 'a.sh', 'c.sh', 'missing/d.sh']]
+        self.assertEqual([True, False, True, True, False],
+                         checker.check(urls))
+        self.assertEqual(4, len(self.server.requests))
+
+        self.assertTrue(checker.is_accessible(urls[0]))
+        self.assertEqual(4, len(self.server.requests))
+        checker.clear()
+        self.assertTrue(checker.is_accessible(urls[0]))
+        self.assertEqual(5, len(self.server.requests))
+
+    def test_check_concurrently(self):
+        self.server.delay = 0.2
+        checker = URLChecker(max_workers=8, max_per_host=2)
+        urls = [self.base_url + 'file%d.sh' % i for i in range(8)]
+        start = time.monotonic()
+        self.assertEqual([True] * 8, checker.check(urls))
+        elapsed = time.monotonic() - start
+        # four rounds of two requests instead of eight requests in a row
+        self.assertTrue(elapsed < 8 * 0.2)
+        self.assertEqual(2, self.server.max_inflight)
+
+    def test_unreachable_url(self):
+        checker = URLChecker(timeout=1)
+        self.assertFalse(checker.is_accessible('http://127.0.0.1:1/a.sh'))
@@ -11,6 +11,8 @@
 #    under the License.
 
 
+import collections
+import contextlib
 import logging
 
 from toscaparser.common import exception
@@ -25,6 +27,7 @@ from toscaparser.relationship_template import RelationshipTemplate
 from toscaparser.substitution_mappings import SubstitutionMappings
 from toscaparser.tpl_relationship_graph import ToscaGraph
 from toscaparser.utils.gettextutils import _
+from toscaparser.utils import profiling
 
 
 # Topology template key names
@@ -35,23 +38,192 @@ SECTIONS = (DESCRIPTION, INPUTS, NODE_TEMPLATES,
             'relationship_templates', 'outputs', 'groups',
             'substitution_mappings', 'policies')
 
+TOPOLOGY_TEMPLATE = 'topology_template'
+
+# parts of a topology template parsed again by the incremental updates,
+# along with the input, node template and relationship template names
+PARTS = (FIELDS_PART, INPUT_PART, NODE_PART, RELATIONSHIP_PART,
+         OUTPUT_PART, GROUPS_PART, SUBSTITUTION_PART) = \
+        (('fields',), 'input', 'node', 'relationship', 'output', ('groups',),
+         ('substitution_mappings',))
+
 log = logging.getLogger("tosca.model")
 
 
+def _get_requirement_targets(node_tpl):
+    '''Yield the node and the relationship of the requirements of node_tpl.'''
+    requirements = node_tpl.get('requirements')
+    if not isinstance(requirements, list):
+        return
+    for req in requirements:
+        if not isinstance(req, dict):
+            continue
+        for value in req.values():
+            if isinstance(value, dict):
+                yield value.get('node'), value.get('relationship')
+            else:
+                yield value, None
+
+
+def _add_function_references(value, references):
+    '''Add the inputs and node templates the functions in value refer to.
+
+    Return True if one of them refers to the HOST, SOURCE or TARGET of a
+    node template, i.e. to the targets of its requirements.
+    '''
+    relative = False
+    value = functions.get_raw_function(value)
+    if isinstance(value, dict):
+        if functions.is_function(value):
+            name, args = list(value.items())[0]
+            args = args if isinstance(args, list) else [args]
+            if args and isinstance(args[0], str):
+                if name == functions.GET_INPUT:
+                    references.add((INPUT_PART, args[0]))
+                elif name != functions.CONCAT and name != functions.TOKEN:
+                    if args[0] in (functions.HOST, functions.SOURCE,
+                                   functions.TARGET):
+                        relative = True
+                    elif args[0] != functions.SELF:
+                        references.add((NODE_PART, args[0]))
+        for item in value.values():
+            relative = _add_function_references(item, references) or relative
+    elif isinstance(value, list):
+        for item in value:
+            relative = _add_function_references(item, references) or relative
+    return relative
+
+
+class _TemplateList(list):
+    '''A list of templates which counts its changes, see _TemplateIndex.'''
+
+    changes = 0
+
+
+def _counting(method):
+    def change(self, *args, **kwargs):
+        self.changes += 1
+        return method(self, *args, **kwargs)
+    return change
+
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__',
+              'append', 'clear', 'extend', 'insert', 'pop', 'remove',
+              'reverse', 'sort'):
+    setattr(_TemplateList, _name, _counting(getattr(list, _name)))
+
+
+class _TemplateIndex(dict):
+    '''Templates by name, kept in line with their list.'''
+
+    _templates = None
+    _changes = None
+
+    def lookup(self, templates, name):
+        '''Return the template name of templates, None if there is none.
+
+        The index is built again when templates was changed or replaced
+        since it was last built, or when one of them was renamed.
+        '''
+        if templates is not self._templates or \
+                not isinstance(templates, _TemplateList) or \
+                templates.changes != self._changes:
+            self.refresh(templates)
+        tpl = self.get(name)
+        if tpl is not None and tpl.name == name:
+            return tpl
+        if any(key != indexed.name for key, indexed in self.items()):
+            self.refresh(templates)
+            return self.get(name)
+
+    def refresh(self, templates):
+        '''Build the index of templates again.'''
+        # updated in place, it is shared with the node templates
+        self.clear()
+        self.update((tpl.name, tpl) for tpl in templates)
+        self._templates = templates
+        self._changes = getattr(templates, 'changes', None)
+
+
+class _NodeTemplateIndex(_TemplateIndex):
+    '''Node templates by name, parsed when first looked up.'''
+
+    def __init__(self, parse):
+        super(_NodeTemplateIndex, self).__init__()
+        self._parse = parse
+
+    def __missing__(self, name):
+        tpl = self._parse(name)
+        if tpl is None:
+            raise KeyError(name)
+        return tpl
+
+
 class TopologyTemplate(object):
 
+    # sections parsed when first accessed in lazy mode, with their parser
+    LAZY_SECTIONS = {'inputs': '_inputs',
+                     'relationship_templates': '_relationship_templates',
+                     'nodetemplates': '_lazy_nodetemplates',
+                     'outputs': '_lazy_outputs',
+                     'graph': '_graph',
+                     'groups': '_groups',
+                     'policies': '_policies',
+                     'substitution_mappings': '_substitution_mappings'}
+
     '''Load the template data.'''
     def __init__(self, template, custom_defs,
                  rel_types=None, parsed_params=None,
-                 sub_mapped_node_template=None):
+                 sub_mapped_node_template=None, lazy=False):
         self.tpl = template
         self.sub_mapped_node_template = sub_mapped_node_template
+        # in lazy mode the sections and the node templates are parsed and
+        # validated when first accessed, the errors found are collected
+        # with those of the parsing this template is part of, if any
+        self.lazy = lazy
+        self._collector = exception.ExceptionCollector.current() \
+            if lazy and exception.ExceptionCollector.collecting else None
+        self._node_templates_by_name = \
+            _NodeTemplateIndex(self._parse_node_template) if lazy \
+            else _TemplateIndex()
+        self._relationship_templates_by_name = _TemplateIndex()
+        # errors and references of each part, see _track()
+        self._errors = None
+        self._references = {}
+        self._dependents = collections.defaultdict(set)
         if self.tpl:
             self.custom_defs = custom_defs
             self.rel_types = rel_types
             self.parsed_params = parsed_params
             self._validate_field()
             self.description = self._tpl_description()
+            if not lazy:
+                self._parse_sections()
+
+    def __getattr__(self, name):
+        # only called for the attributes not set, i.e. in lazy mode for the
+        # sections not parsed yet
+        parser = self.LAZY_SECTIONS.get(name)
+        if parser is None or not vars(self).get('lazy') or \
+                not vars(self).get('tpl'):
+            raise AttributeError("'%s' object has no attribute '%s'"
+                                 % (type(self).__name__, name))
+        with self._collecting():
+            value = getattr(self, parser)()
+        setattr(self, name, value)
+        return value
+
+    def _collecting(self):
+        if self._collector is None:
+            return contextlib.nullcontext()
+        return exception.ExceptionCollector.resume(self._collector)
+
+    def _locate(self, *keys):
+        return exception.ExceptionCollector.location(TOPOLOGY_TEMPLATE,
+                                                     *keys)
+
+    def _parse_sections(self):
+        if not self.lazy:
             self.inputs = self._inputs()
             self.relationship_templates = self._relationship_templates()
             self.nodetemplates = self._nodetemplates()
@@ -62,10 +234,20 @@ class TopologyTemplate(object):
             self.policies = self._policies()
             self._process_intrinsic_functions()
             self.substitution_mappings = self._substitution_mappings()
+        else:
+            # parse the sections not accessed yet
+            for name in self.LAZY_SECTIONS:
+                getattr(self, name)
 
+    @profiling.timed('topology.inputs')
     def _inputs(self):
         inputs = []
         for name, attrs in self._tpl_inputs().items():
+            inputs.append(self._create_input(name, attrs))
+        return inputs
+
+    def _create_input(self, name, attrs):
+        with self._locate(INPUTS, name):
             input = Input(name, attrs)
             if self.parsed_params and name in self.parsed_params:
                 input.validate(self.parsed_params[name])
@@ -78,52 +260,101 @@ class TopologyTemplate(object):
                     and input.default is None:
                 log.warning('The required parameter %s '
                             'is not provided' % input.name)
+            return input
 
-            inputs.append(input)
-        return inputs
-
+    @profiling.timed('topology.node_templates')
     def _nodetemplates(self):
-        nodetemplates = []
+        nodetemplates = _TemplateList()
         tpls = self._tpl_nodetemplates()
         if tpls:
             for name in tpls:
-                tpl = NodeTemplate(name, tpls, self.custom_defs,
-                                   self.relationship_templates,
-                                   self.rel_types)
-                if (tpl.type_definition and
-                    (tpl.type in tpl.type_definition.TOSCA_DEF or
-                     (tpl.type not in tpl.type_definition.TOSCA_DEF and
-                      bool(tpl.custom_def)))):
-                    tpl.validate(self)
+                tpl = self._create_node_template(name, tpls)
+                if tpl is not None:
                     nodetemplates.append(tpl)
+                    self._node_templates_by_name[name] = tpl
+        return nodetemplates
+
+    def _create_node_template(self, name, tpls):
+        with self._locate(NODE_TEMPLATES, name):
+            tpl = NodeTemplate(name, tpls, self.custom_defs,
+                               self.relationship_templates,
+                               self.rel_types,
+                               self._node_templates_by_name)
+            if (tpl.type_definition and
+                (tpl.type in tpl.type_definition.TOSCA_DEF or
+                 (tpl.type not in tpl.type_definition.TOSCA_DEF and
+                  bool(tpl.custom_def)))):
+                tpl.validate(self)
+                return tpl
+
+    def _parse_node_template(self, name):
+        # parse a node template of a lazy topology template on its first
+        # look up, once all of them are parsed the index is complete
+        tpls = self._tpl_nodetemplates()
+        if 'nodetemplates' in vars(self) or not isinstance(tpls, dict) or \
+                name not in tpls:
+            return None
+        with self._collecting():
+            tpl = self._create_node_template(name, tpls)
+            if tpl is not None:
+                # indexed first, the functions may refer back to it
+                self._node_templates_by_name[name] = tpl
+                self._process_node_functions(tpl)
+        return tpl
+
+    @profiling.timed('topology.node_templates')
+    def _lazy_nodetemplates(self):
+        nodetemplates = _TemplateList()
+        for name in self._tpl_nodetemplates() or ():
+            tpl = self.get_node_template(name)
+            if tpl is not None:
+                nodetemplates.append(tpl)
         return nodetemplates
 
+    @profiling.timed('topology.relationship_templates')
     def _relationship_templates(self):
-        rel_templates = []
+        rel_templates = _TemplateList()
         tpls = self._tpl_relationship_templates()
         for name in tpls:
-            tpl = RelationshipTemplate(tpls[name], name, self.custom_defs)
+            with self._locate(RELATIONSHIP_TEMPLATES, name):
+                tpl = RelationshipTemplate(tpls[name], name,
+                                           self.custom_defs)
             rel_templates.append(tpl)
+            self._relationship_templates_by_name[name] = tpl
         return rel_templates
 
     def _outputs(self):
         outputs = []
         for name, attrs in self._tpl_outputs().items():
             output = Output(name, attrs)
-            output.validate()
+            with self._locate(OUTPUTS, name):
+                output.validate()
             outputs.append(output)
         return outputs
 
+    def _lazy_outputs(self):
+        self.outputs = self._outputs()
+        self._process_output_functions()
+        return self.outputs
+
+    def _graph(self):
+        return ToscaGraph(self.nodetemplates)
+
     def _substitution_mappings(self):
         tpl_substitution_mapping = self._tpl_substitution_mappings()
         # if tpl_substitution_mapping and self.sub_mapped_node_template:
         if tpl_substitution_mapping:
-            return SubstitutionMappings(tpl_substitution_mapping,
-                                        self.nodetemplates,
-                                        self.inputs,
-                                        self.outputs,
-                                        self.sub_mapped_node_template,
-                                        self.custom_defs)
+            with self._locate(SUBSTITUION_MAPPINGS):
+                return self._create_substitution_mappings(
+                    tpl_substitution_mapping)
+
+    def _create_substitution_mappings(self, tpl_substitution_mapping):
+        return SubstitutionMappings(tpl_substitution_mapping,
+                                    self.nodetemplates,
+                                    self.inputs,
+                                    self.outputs,
+                                    self.sub_mapped_node_template,
+                                    self.custom_defs)
 
     def _policies(self):
         policies = []
@@ -137,69 +368,348 @@ class TopologyTemplate(object):
                     if not target_objects:
                         targets_type = "node_templates"
                         target_objects = self._get_group_members(target_list)
-                policyObj = Policy(policy_name, policy_tpl,
-                                   target_objects, targets_type,
-                                   self.custom_defs)
-                # If the policyObj.type is defined in TOSCA_definition_1_0.yaml
-                # or is defined as a custom definition, validate the properties
-                # before adding it to the policies list.
-                if (policyObj.type_definition and
-                    (policyObj.type in policyObj.type_definition.TOSCA_DEF or
-                     (policyObj.type not in policyObj.type_definition.TOSCA_DEF
-                      and bool(policyObj.custom_def)))):
-                    policyObj.validate()
+                with self._locate(POLICIES, policy_name):
+                    policyObj = self._create_policy(policy_name, policy_tpl,
+                                                    target_objects,
+                                                    targets_type)
+                if policyObj is not None:
                     policies.append(policyObj)
         return policies
 
+    def _create_policy(self, name, policy_tpl, target_objects,
+                       targets_type):
+        policyObj = Policy(name, policy_tpl, target_objects, targets_type,
+                           self.custom_defs)
+        # If the policyObj.type is defined in TOSCA_definition_1_0.yaml
+        # or is defined as a custom definition, validate the properties
+        # before adding it to the policies list.
+        if (policyObj.type_definition and
+            (policyObj.type in policyObj.type_definition.TOSCA_DEF or
+             (policyObj.type not in policyObj.type_definition.TOSCA_DEF
+              and bool(policyObj.custom_def)))):
+            policyObj.validate()
+            return policyObj
+
     def _groups(self):
         groups = []
         member_nodes = None
         for group_name, group_tpl in self._tpl_groups().items():
-            member_names = group_tpl.get('members')
-            if member_names is not None:
-                DataEntity.validate_datatype('list', member_names)
-                if len(member_names) < 1 or \
-                        len(member_names) != len(set(member_names)):
-                    exception.ExceptionCollector.appendException(
-                        exception.InvalidGroupTargetException(
-                            message=_('Member nodes "%s" should be >= 1 '
-                                      'and not repeated') % member_names))
-                else:
-                    member_nodes = self._get_group_members(member_names)
-            group = Group(group_name, group_tpl,
-                          member_nodes,
-                          self.custom_defs)
+            with self._locate(GROUPS, group_name):
+                member_names = group_tpl.get('members')
+                if member_names is not None:
+                    DataEntity.validate_datatype('list', member_names)
+                    if len(member_names) < 1 or \
+                            len(member_names) != len(set(member_names)):
+                        exception.ExceptionCollector.appendException(
+                            exception.InvalidGroupTargetException(
+                                message=_('Member nodes "%s" should be >= 1 '
+                                          'and not repeated') % member_names))
+                    else:
+                        member_nodes = self._get_group_members(member_names)
+                group = Group(group_name, group_tpl,
+                              member_nodes,
+                              self.custom_defs)
             groups.append(group)
         return groups
 
+    def get_node_template(self, name):
+        '''Return the node template with the given name, if any.
+
+        In lazy mode only that node template is parsed, if not yet.
+        '''
+        nodetemplates = vars(self).get('nodetemplates')
+        if nodetemplates is None:
+            if self.lazy and self.tpl:
+                return self._node_templates_by_name.get(name) or \
+                    self._parse_node_template(name)
+            return None
+        return self._node_templates_by_name.lookup(nodetemplates, name)
+
+    def get_relationship_template(self, name):
+        '''Return the relationship template with the given name, if any.'''
+        rel_templates = getattr(self, 'relationship_templates', None)
+        if rel_templates is None:
+            return None
+        return self._relationship_templates_by_name.lookup(rel_templates,
+                                                           name)
+
     def _get_group_members(self, member_names):
         member_nodes = []
         self._validate_group_members(member_names)
         for member in member_names:
-            for node in self.nodetemplates:
-                if node.name == member:
-                    member_nodes.append(node)
+            node = self.get_node_template(member)
+            if node is not None:
+                member_nodes.append(node)
         return member_nodes
 
     def _get_policy_groups(self, member_names):
         member_groups = []
+        groups = {group.name: group for group in self.groups}
         for member in member_names:
-            for group in self.groups:
-                if group.name == member:
-                    member_groups.append(group)
+            if member in groups:
+                member_groups.append(groups[member])
         return member_groups
 
     def _validate_group_members(self, members):
-        node_names = []
-        for node in self.nodetemplates:
-            node_names.append(node.name)
         for member in members:
-            if member not in node_names:
+            if self.get_node_template(member) is None:
                 exception.ExceptionCollector.appendException(
                     exception.InvalidGroupTargetException(
                         message=_('Target member "%s" is not found in '
                                   'node_templates') % member))
 
+    def update_node_template(self, name, template):
+        '''Add or replace the node template name, defined by template.
+
+        Only the parts of the topology template depending on it are parsed
+        and validated again. Return the errors of the topology template,
+        the same as when it is parsed again with the change.
+        '''
+        self._track()
+        if not isinstance(self.tpl.get(NODE_TEMPLATES), dict):
+            self.tpl[NODE_TEMPLATES] = {}
+        self.tpl[NODE_TEMPLATES][name] = template
+        self._update({(NODE_PART, name)})
+        return self._get_errors()
+
+    def remove_node_template(self, name):
+        '''Remove the node template name, see update_node_template().'''
+        self._track()
+        node_templates = self._tpl_nodetemplates()
+        if not node_templates or name not in node_templates:
+            raise KeyError(_('Node template "%s" was not found.') % name)
+        del node_templates[name]
+        self._update({(NODE_PART, name)})
+        return self._get_errors()
+
+    def set_input(self, name, value):
+        '''Set the value of the input name, see update_node_template().'''
+        self._track()
+        # the parameters given are not changed
+        self.parsed_params = dict(self.parsed_params or {})
+        self.parsed_params[name] = value
+        self._update({(INPUT_PART, name)})
+        return self._get_errors()
+
+    def _track(self):
+        '''Parse the topology template again, part by part.
+
+        Done on the first incremental update, the errors of each part and
+        the inputs and templates it refers to are recorded. An update then
+        only parses again the parts it affects.
+        '''
+        if self._errors is not None:
+            return
+        if not self.tpl:
+            raise ValueError(_('The template has no topology template.'))
+        if self.lazy:
+            self._parse_sections()
+        self._errors = {}
+        with exception.ExceptionCollector.capture() as captured:
+            self._validate_field()
+            self.relationship_templates[:] = self._relationship_templates()
+        self._errors[FIELDS_PART] = captured.exceptions
+        parts = {GROUPS_PART}
+        parts.update((INPUT_PART, name) for name in self._tpl_inputs())
+        parts.update((NODE_PART, name)
+                     for name in self._tpl_nodetemplates() or ())
+        parts.update((OUTPUT_PART, name) for name in self._tpl_outputs())
+        self._update(parts)
+
+    @profiling.timed('topology.update')
+    def _update(self, parts):
+        # the node templates may have been changed since the last update
+        self._node_templates_by_name.refresh(self.nodetemplates)
+        tpls = self._tpl_nodetemplates() or {}
+        parts = set(parts) | self._get_affected(parts, tpls)
+        for name in self._tpl_inputs():
+            if (INPUT_PART, name) in parts:
+                self._parse_input(name)
+
+        for part in parts:
+            if part[0] == NODE_PART:
+                self._remove_node_template(part[1])
+        parsed = []
+        for name in tpls:
+            if (NODE_PART, name) in parts:
+                tpl = self._parse_node_template_part(name, tpls)
+                if tpl is not None:
+                    parsed.append(tpl)
+        self.nodetemplates[:] = [self._node_templates_by_name[name]
+                                 for name in tpls
+                                 if name in self._node_templates_by_name]
+        for tpl in parsed:
+            with exception.ExceptionCollector.capture() as captured:
+                # resolve the requirements first, as when parsing them all
+                tpl.relationships
+            self._errors[(NODE_PART, tpl.name)].extend(captured.exceptions)
+        for tpl in parsed:
+            with exception.ExceptionCollector.capture() as captured:
+                self._process_node_functions(tpl)
+            self._errors[(NODE_PART, tpl.name)].extend(captured.exceptions)
+
+        for name in self._tpl_outputs():
+            if (OUTPUT_PART, name) in parts:
+                self._parse_output(name)
+        if GROUPS_PART in parts:
+            self._parse_groups()
+        if self._tpl_substitution_mappings():
+            with exception.ExceptionCollector.capture() as captured:
+                self.substitution_mappings = self._substitution_mappings()
+            self._errors[SUBSTITUTION_PART] = captured.exceptions
+        with exception.ExceptionCollector.capture():
+            # the errors of the requirements were found above already
+            self.graph.update(parsed)
+
+    def _get_affected(self, parts, tpls):
+        # the parts referring to the parts changed, and so on as their
+        # node templates are replaced, along with the node templates
+        # using the same relationship templates as a node template replaced
+        affected = set()
+        changed = list(parts)
+        for part in parts:
+            if part[0] == NODE_PART:
+                references = self._references.get(part, set()) | \
+                    self._get_node_references(part[1], tpls)
+                changed.extend(reference for reference in references
+                               if reference[0] == RELATIONSHIP_PART)
+        while changed:
+            for part in self._dependents.get(changed.pop(), ()):
+                if part not in affected:
+                    affected.add(part)
+                    if part[0] == NODE_PART:
+                        changed.append(part)
+                        changed.extend(
+                            reference for reference in self._references[part]
+                            if reference[0] == RELATIONSHIP_PART)
+        return affected
+
+    def _set_references(self, part, references):
+        for reference in self._references.pop(part, ()):
+            self._dependents[reference].discard(part)
+        if references:
+            self._references[part] = references
+            for reference in references:
+                self._dependents[reference].add(part)
+
+    def _get_node_references(self, name, tpls):
+        node_tpl = tpls.get(name)
+        references = set()
+        if not isinstance(node_tpl, dict):
+            return references
+        relative = _add_function_references(node_tpl, references)
+        rel_tpls = self._tpl_relationship_templates()
+        targets = []
+        for node, relationship in _get_requirement_targets(node_tpl):
+            if isinstance(node, str):
+                references.add((NODE_PART, node))
+                targets.append(node)
+            if isinstance(relationship, str) and relationship in rel_tpls:
+                references.add((RELATIONSHIP_PART, relationship))
+        if relative:
+            # the functions may refer to the targets of the targets
+            seen = set()
+            while targets:
+                target = targets.pop()
+                if target in seen or not isinstance(tpls.get(target), dict):
+                    continue
+                seen.add(target)
+                references.add((NODE_PART, target))
+                targets.extend(node for node, relationship
+                               in _get_requirement_targets(tpls[target])
+                               if isinstance(node, str))
+        return references
+
+    def _parse_input(self, name):
+        with exception.ExceptionCollector.capture() as captured:
+            input = self._create_input(name, self._tpl_inputs()[name])
+        self._errors[(INPUT_PART, name)] = captured.exceptions
+        for index, old in enumerate(self.inputs):
+            if old.name == name:
+                self.inputs[index] = input
+                break
+        else:
+            self.inputs.append(input)
+
+    def _remove_node_template(self, name):
+        tpl = self._node_templates_by_name.pop(name, None)
+        if tpl is not None:
+            # the relationship templates of its requirements are removed
+            # from their targets, not to resolve the relationships again
+            for target in tpl._relationships.values():
+                target.relationship_tpl[:] = [
+                    rel_tpl for rel_tpl in target.relationship_tpl
+                    if rel_tpl.source is not tpl]
+        self._errors.pop((NODE_PART, name), None)
+        self._set_references((NODE_PART, name), None)
+
+    def _parse_node_template_part(self, name, tpls):
+        with exception.ExceptionCollector.capture() as captured:
+            tpl = self._create_node_template(name, tpls)
+        if tpl is not None:
+            self._node_templates_by_name[name] = tpl
+        self._errors[(NODE_PART, name)] = captured.exceptions
+        self._set_references((NODE_PART, name),
+                             self._get_node_references(name, tpls))
+        return tpl
+
+    def _parse_output(self, name):
+        attrs = self._tpl_outputs()[name]
+        with exception.ExceptionCollector.capture() as captured:
+            output = Output(name, attrs)
+            with self._locate(OUTPUTS, name):
+                output.validate()
+            for index, old in enumerate(self.outputs):
+                if old.name == name:
+                    self.outputs[index] = output
+                    break
+            else:
+                self.outputs.append(output)
+            self._process_output_function(output)
+        self._errors[(OUTPUT_PART, name)] = captured.exceptions
+        references = set()
+        _add_function_references(attrs, references)
+        self._set_references((OUTPUT_PART, name), references)
+
+    def _parse_groups(self):
+        with exception.ExceptionCollector.capture() as captured:
+            self.groups[:] = self._groups()
+            self.policies[:] = self._policies()
+        self._errors[GROUPS_PART] = captured.exceptions
+        references = set()
+        for group_tpl in self._tpl_groups().values():
+            members = group_tpl.get('members') \
+                if isinstance(group_tpl, dict) else None
+            if isinstance(members, list):
+                references.update((NODE_PART, member) for member in members
+                                  if isinstance(member, str))
+        for policy in self._tpl_policies():
+            for policy_tpl in policy.values():
+                targets = policy_tpl.get('targets') \
+                    if isinstance(policy_tpl, dict) else None
+                if isinstance(targets, list):
+                    references.update((NODE_PART, target)
+                                      for target in targets
+                                      if isinstance(target, str))
+        self._set_references(GROUPS_PART, references)
+
+    def _get_errors(self):
+        '''Return the errors of the parts, in their order in the template.'''
+        parts = [FIELDS_PART]
+        parts.extend((INPUT_PART, name) for name in self._tpl_inputs())
+        parts.extend((NODE_PART, name)
+                     for name in self._tpl_nodetemplates() or ())
+        parts.extend((OUTPUT_PART, name) for name in self._tpl_outputs())
+        parts.extend((GROUPS_PART, SUBSTITUTION_PART))
+        errors = []
+        messages = set()
+        for part in parts:
+            for error in self._errors.get(part, ()):
+                if str(error) not in messages:
+                    messages.add(str(error))
+                    errors.append(error)
+        return errors
+
     # topology template can act like node template
     # it is exposed by substitution_mappings.
     def nodetype(self):
@@ -276,6 +786,7 @@ class TopologyTemplate(object):
                 exception.ExceptionCollector.appendException(
                     exception.UnknownFieldError(what='Template', field=name))
 
+    @profiling.timed('topology.intrinsic_functions')
     def _process_intrinsic_functions(self):
         """Process intrinsic functions
 
@@ -284,60 +795,75 @@ class TopologyTemplate(object):
         """
         if hasattr(self, 'nodetemplates'):
             for node_template in self.nodetemplates:
-                for prop in node_template.get_properties_objects():
-                    prop.value = functions.get_function(self,
-                                                        node_template,
-                                                        prop.value)
-                for interface in node_template.interfaces:
+                self._process_node_functions(node_template)
+        self._process_output_functions()
+
+    def _process_node_functions(self, node_template):
+        with self._locate(NODE_TEMPLATES, node_template.name):
+            self._process_node_template_functions(node_template)
+
+    def _process_node_template_functions(self, node_template):
+        for prop in node_template.get_properties_objects():
+            prop.value = functions.get_function(self,
+                                                node_template,
+                                                prop.value)
+        # the functions of the raw template are parsed again, in case the
+        # node template is parsed again after an update
+        for interface in node_template.interfaces:
+            if interface.inputs:
+                for name, value in interface.inputs.items():
+                    interface.inputs[name] = functions.get_function(
+                        self,
+                        node_template,
+                        functions.get_raw_function(value))
+        if node_template.requirements and \
+           isinstance(node_template.requirements, list):
+            for req in node_template.requirements:
+                rel = req
+                for req_name, req_item in req.items():
+                    if isinstance(req_item, dict):
+                        rel = req_item.get('relationship')
+                        break
+                if rel and 'properties' in rel:
+                    for key, value in rel['properties'].items():
+                        rel['properties'][key] = functions.get_function(
+                            self, req, functions.get_raw_function(value))
+        if node_template.get_capabilities_objects():
+            for cap in node_template.get_capabilities_objects():
+                if cap.get_properties_objects():
+                    for prop in cap.get_properties_objects():
+                        propvalue = functions.get_function(
+                            self,
+                            node_template,
+                            prop.value)
+                        if isinstance(propvalue, functions.GetInput):
+                            propvalue = propvalue.result()
+                            for p, v in cap._properties.items():
+                                if p == prop.name:
+                                    cap._properties[p] = propvalue
+        # the relationship templates of its requirements, added to their
+        # targets along with those of the other node templates
+        for node in node_template.relationships.values():
+            for rel_tpl in node.relationship_tpl:
+                if rel_tpl.source is not node_template:
+                    continue
+                for interface in rel_tpl.interfaces:
                     if interface.inputs:
                         for name, value in interface.inputs.items():
                             interface.inputs[name] = functions.get_function(
-                                self,
-                                node_template,
-                                value)
-                if node_template.requirements and \
-                   isinstance(node_template.requirements, list):
-                    for req in node_template.requirements:
-                        rel = req
-                        for req_name, req_item in req.items():
-                            if isinstance(req_item, dict):
-                                rel = req_item.get('relationship')
-                                break
-                        if rel and 'properties' in rel:
-                            for key, value in rel['properties'].items():
-                                rel['properties'][key] = \
-                                    functions.get_function(self,
-                                                           req,
-                                                           value)
-                if node_template.get_capabilities_objects():
-                    for cap in node_template.get_capabilities_objects():
-                        if cap.get_properties_objects():
-                            for prop in cap.get_properties_objects():
-                                propvalue = functions.get_function(
-                                    self,
-                                    node_template,
-                                    prop.value)
-                                if isinstance(propvalue, functions.GetInput):
-                                    propvalue = propvalue.result()
-                                    for p, v in cap._properties.items():
-                                        if p == prop.name:
-                                            cap._properties[p] = propvalue
-                for rel, node in node_template.relationships.items():
-                    rel_tpls = node.relationship_tpl
-                    if rel_tpls:
-                        for rel_tpl in rel_tpls:
-                            for interface in rel_tpl.interfaces:
-                                if interface.inputs:
-                                    for name, value in \
-                                            interface.inputs.items():
-                                        interface.inputs[name] = \
-                                            functions.get_function(self,
-                                                                   rel_tpl,
-                                                                   value)
+                                self, rel_tpl,
+                                functions.get_raw_function(value))
+
+    def _process_output_functions(self):
         for output in self.outputs:
-            func = functions.get_function(self, self.outputs, output.value)
-            if isinstance(func, functions.GetAttribute):
-                output.attrs[output.VALUE] = func
+            self._process_output_function(output)
+
+    def _process_output_function(self, output):
+        with self._locate(OUTPUTS, output.name):
+            func = functions.get_function(
+                self, self.outputs, functions.get_raw_function(output.value))
+        if isinstance(func, functions.GetAttribute):
+            output.attrs[output.VALUE] = func
 
     @classmethod
     def get_sub_mapping_node_type(cls, topology_tpl):
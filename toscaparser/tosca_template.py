@@ -12,15 +12,18 @@
 
 
 import logging
-import os
+import types
 
 from copy import deepcopy
 from toscaparser.common.exception import ExceptionCollector
 from toscaparser.common.exception import InvalidTemplateVersion
 from toscaparser.common.exception import MissingRequiredFieldError
+from toscaparser.common.exception import StopCollecting
 from toscaparser.common.exception import UnknownFieldError
 from toscaparser.common.exception import ValidationError
-from toscaparser.elements.entity_type import update_definitions
+from toscaparser.elements.definitions import CustomDefinitions
+from toscaparser.elements.definitions import get_definitions
+from toscaparser.elements.type_registry import TypeRegistry
 from toscaparser.extensions.exttools import ExtTools
 import toscaparser.imports
 from toscaparser.prereq.csar import CSAR
@@ -28,7 +31,10 @@ from toscaparser.repositories import Repository
 from toscaparser.topology_template import TopologyTemplate
 from toscaparser.tpl_relationship_graph import ToscaGraph
 from toscaparser.utils.gettextutils import _
+from toscaparser.utils.lazy import LazyAttribute
+from toscaparser.utils import profiling
 import toscaparser.utils.yamlparser
+from toscaparser.utils import zipfs
 
 
 # TOSCA template key names
@@ -53,33 +59,96 @@ YAML_LOADER = toscaparser.utils.yamlparser.load_yaml
 
 
 class ToscaTemplate(object):
-    exttools = ExtTools()
+    # the extensions are discovered when first needed, not on import
+    @LazyAttribute
+    def exttools(cls):
+        return ExtTools()
 
     MAIN_TEMPLATE_VERSIONS = ['tosca_simple_yaml_1_0',
                               'tosca_simple_yaml_1_2',
                               'tosca_simple_yaml_1_3']
 
-    VALID_TEMPLATE_VERSIONS = MAIN_TEMPLATE_VERSIONS + exttools.get_versions()
-
-    ADDITIONAL_SECTIONS = {'tosca_simple_yaml_1_0': SPECIAL_SECTIONS,
-                           'tosca_simple_yaml_1_2': SPECIAL_SECTIONS,
-                           'tosca_simple_yaml_1_3': SPECIAL_SECTIONS}
-
-    ADDITIONAL_SECTIONS.update(exttools.get_sections())
+    @LazyAttribute
+    def VALID_TEMPLATE_VERSIONS(cls):
+        return cls.MAIN_TEMPLATE_VERSIONS + cls.exttools.get_versions()
+
+    @LazyAttribute
+    def ADDITIONAL_SECTIONS(cls):
+        sections = {'tosca_simple_yaml_1_0': SPECIAL_SECTIONS,
+                    'tosca_simple_yaml_1_2': SPECIAL_SECTIONS,
+                    'tosca_simple_yaml_1_3': SPECIAL_SECTIONS}
+        sections.update(cls.exttools.get_sections())
+        return sections
+
+    # sections parsed when first accessed in lazy mode, with their parser
+    LAZY_SECTIONS = {'inputs': '_inputs',
+                     'relationship_templates': '_relationship_templates',
+                     'nodetemplates': '_nodetemplates',
+                     'outputs': '_outputs',
+                     'policies': '_policies',
+                     'nested_tosca_templates_with_topology':
+                     '_nested_tosca_templates_with_topology',
+                     'graph': '_graph'}
 
     '''Load the template data.'''
+    @profiling.timed('template')
     def __init__(self, path=None, parsed_params=None, a_file=True,
-                 yaml_dict_tpl=None, local_defs=None):
-
-        ExceptionCollector.start()
+                 yaml_dict_tpl=None, local_defs=None, collect_traces=True,
+                 lazy=False, error_listener=None, max_errors=None):
+
+        # collect_traces=False skips recording where each error was found,
+        # which is much cheaper for templates with many errors.
+        # error_listener is called with each error as soon as it is found,
+        # see toscaparser.diagnostics
+        # max_errors fails fast: the parse stops at the max_errors-th error,
+        # and once an error is found the parts of the template which are
+        # only validated (references of a CSAR, nested templates, graph of
+        # the requirements) are skipped, as is the topology template if the
+        # template or its imports are invalid
+        self._collector = ExceptionCollector.start(collect_traces,
+                                                   error_listener,
+                                                   max_errors)
+        # lazy=True only loads the template and its types, the sections of
+        # the topology template and its node templates are parsed when
+        # first accessed, validate() parses and validates everything
+        self.lazy = lazy
         self.a_file = a_file
         self.input_path = None
         self.path = None
         self.tpl = None
         self.nested_tosca_tpls_with_topology = {}
-        self.nested_tosca_templates_with_topology = []
+        if not lazy:
+            self.nested_tosca_templates_with_topology = []
         self.local_defs = local_defs
-
+        # the CSAR the template was read from, if any
+        self.csar = None
+        self.tosca_def = get_definitions()
+        self._custom_defs = CustomDefinitions({}, self.tosca_def)
+        # content of the imported templates, loaded once per template
+        self._loaded_imports = {}
+        # errors found before the topology template is parsed, and those of
+        # each node template when they are tracked, see _track()
+        self._template_error_count = 0
+        self._template_errors = None
+        self._node_errors = None
+        self._nested_templates = {}
+
+        try:
+            self._parse(path, parsed_params, yaml_dict_tpl)
+        except StopCollecting:
+            # the errors found are raised below
+            pass
+        finally:
+            # also on unexpected errors, not to leak into the next parse
+            if self.csar:
+                self.csar.filesystem.unmount()
+            ExceptionCollector.stop()
+        # the parts of a lazy template parsed later report all their errors
+        self._collector.max_errors = None
+        if not lazy or self._collector.exceptions:
+            self.verify_template()
+
+    def _parse(self, path, parsed_params, yaml_dict_tpl):
         if path:
             self.input_path = path
             self.path = self._get_path(path)
@@ -92,6 +161,9 @@ class ToscaTemplate(object):
                 print(msg)
         else:
             if yaml_dict_tpl:
+                # its types may have been changed in place since it was
+                # last parsed
+                TypeRegistry.clear()
                 self.tpl = yaml_dict_tpl
             else:
                 ExceptionCollector.appendException(
@@ -104,32 +176,208 @@ class ToscaTemplate(object):
             self.version = self._tpl_version()
             self.relationship_types = self._tpl_relationship_types()
             self.description = self._tpl_description()
+            self._custom_defs = self._get_all_custom_defs()
+            self._template_error_count = len(self._collector.exceptions)
+            if ExceptionCollector.failing():
+                # its node templates would be checked against invalid types
+                return
             self.topology_template = self._topology_template()
             self.repositories = self._tpl_repositories()
-            if self.topology_template.tpl:
+            if self.topology_template.tpl and not self.lazy:
                 self.inputs = self._inputs()
                 self.relationship_templates = self._relationship_templates()
                 self.nodetemplates = self._nodetemplates()
                 self.outputs = self._outputs()
                 self.policies = self._policies()
+                if ExceptionCollector.failing():
+                    return
                 self._handle_nested_tosca_templates_with_topology()
                 self.graph = ToscaGraph(self.nodetemplates)
                 self._validate_relationship_occurences()
 
-        ExceptionCollector.stop()
+    @property
+    def path(self):
+        '''Path of the main template.
+
+        The files of a CSAR are extracted on the first use of the path
+        after the parse, for it to exist on disk. They are not removed,
+        see CSAR.decompress().
+        '''
+        csar = vars(self).get('csar')
+        if csar is not None and not csar.filesystem.extracted and \
+                zipfs.lookup(self._path) is None:
+            csar.decompress()
+        return self._path
+
+    @path.setter
+    def path(self, path):
+        self._path = path
+
+    def __getattr__(self, name):
+        # only called for the attributes not set, i.e. in lazy mode for the
+        # sections not parsed yet
+        parser = self.LAZY_SECTIONS.get(name)
+        if parser is None or not vars(self).get('lazy') or \
+                not self._has_topology_template() and \
+                name != 'nested_tosca_templates_with_topology':
+            raise AttributeError("'%s' object has no attribute '%s'"
+                                 % (type(self).__name__, name))
+        with ExceptionCollector.resume(self._collector):
+            value = getattr(self, parser)()
+        setattr(self, name, value)
+        return value
+
+    def _has_topology_template(self):
+        topology_template = vars(self).get('topology_template')
+        return topology_template is not None and \
+            bool(topology_template.tpl)
+
+    def validate(self):
+        '''Parse what was not yet and raise the errors found, if any.
+
+        This is only needed in lazy mode, a template which is not lazy is
+        validated when it is created.
+        '''
+        if self.lazy and self._has_topology_template():
+            with ExceptionCollector.resume(self._collector):
+                for name in self.LAZY_SECTIONS:
+                    getattr(self, name)
+                self.topology_template._parse_sections()
+                self._validate_relationship_occurences()
         self.verify_template()
 
+    def update_node_template(self, name, template):
+        '''Add or replace the node template name, defined by template.
+
+        Only the parts of the template depending on the node template are
+        parsed and validated again, with the same result as parsing the
+        whole template again. Return the errors of the template, which
+        validate() raises.
+        '''
+        self._track()
+        before = self._get_node_templates()
+        self.topology_template.update_node_template(name, template)
+        return self._update(before)
+
+    def remove_node_template(self, name):
+        '''Remove the node template name, see update_node_template().'''
+        self._track()
+        before = self._get_node_templates()
+        self.topology_template.remove_node_template(name)
+        return self._update(before)
+
+    def set_input(self, name, value):
+        '''Set the value of the input name, see update_node_template().'''
+        self._track()
+        before = self._get_node_templates()
+        self.topology_template.set_input(name, value)
+        self.parsed_params = self.topology_template.parsed_params
+        # the nested templates get the values of all the inputs
+        return self._update(before, [name for name, nested
+                                     in self._nested_templates.items()
+                                     if nested])
+
+    def _track(self):
+        # the types of the template may have been changed in place since
+        # the last update
+        TypeRegistry.clear()
+        # record the errors of the parts of the template, the first time
+        if self._node_errors is not None:
+            return
+        if not self._has_topology_template():
+            raise ValueError(_('The template has no topology template.'))
+        for name in self.LAZY_SECTIONS:
+            getattr(self, name)
+        self._template_errors = \
+            self._collector.exceptions[:self._template_error_count]
+        with ExceptionCollector.capture() as captured:
+            self._tpl_repositories()
+        self._template_errors.extend(captured.exceptions)
+        self._node_errors = {}
+        self.topology_template._track()
+        self._update({})
+
+    def _get_node_templates(self):
+        return {tpl.name: tpl for tpl in self.nodetemplates}
+
+    def _update(self, before, names=()):
+        # the nested templates and the occurrences of the requirements of
+        # the node templates parsed again, or removed, are validated again
+        after = self._get_node_templates()
+        names = set(names)
+        names.update(name for name in set(before) | set(after)
+                     if before.get(name) is not after.get(name))
+        nested = self.nested_tosca_templates_with_topology
+        nested[:] = [tpl for tpl in nested
+                     if tpl.sub_mapped_node_template.name not in names]
+        for name in names:
+            self._node_errors.pop(name, None)
+            self._nested_templates.pop(name, None)
+        nodetemplates = [tpl for tpl in self.nodetemplates
+                         if tpl.name in names]
+        for tpl in nodetemplates:
+            with ExceptionCollector.capture() as captured:
+                self._handle_nested_node_template(tpl)
+                tpl._validate_relationship_occurrences()
+            self._node_errors[tpl.name] = captured.exceptions
+        # in the order of the nested templates then of the node templates
+        positions = {name: index for index, name in enumerate(after)}
+        nested[:] = [tpl for index, position, tpl in sorted(
+            (index, positions[name], tpl)
+            for name, tpls in self._nested_templates.items()
+            for index, tpl in tpls)]
+        with ExceptionCollector.capture():
+            # the errors of the requirements are those of the topology
+            self.graph.update(nodetemplates)
+
+        errors = list(self._template_errors)
+        errors.extend(self.topology_template._get_errors())
+        for tpl in self.nodetemplates:
+            errors.extend(self._node_errors.get(tpl.name, ()))
+        self._collector.replace(errors)
+        return list(self._collector.exceptions)
+
+    def _handle_nested_node_template(self, nodetemplate):
+        nested = []
+        for index, (fname, tosca_tpl) in enumerate(
+                self.nested_tosca_tpls_with_topology.items()):
+            if self._is_sub_mapped_node(nodetemplate, tosca_tpl):
+                parsed_params = self._get_params_for_nested_template(
+                    nodetemplate)
+                topology_with_sub_mapping = TopologyTemplate(
+                    tosca_tpl.get(TOPOLOGY_TEMPLATE),
+                    self._custom_defs,
+                    self.relationship_types,
+                    parsed_params,
+                    nodetemplate)
+                if topology_with_sub_mapping.substitution_mappings:
+                    nested.append((index, topology_with_sub_mapping))
+                    nodetemplate.sub_mapping_tosca_template = \
+                        topology_with_sub_mapping.substitution_mappings
+        self._nested_templates[nodetemplate.name] = nested
+
     def _validate_relationship_occurences(self):
         for tpl in self.nodetemplates:
             # Check if the requirements has a correct number of occurrences
             tpl._validate_relationship_occurrences()
 
+    @property
+    def custom_defs(self):
+        '''Read-only view of the custom types of the template.
+
+        They are resolved once, from the template and everything it imports,
+        and shared by the topology template and the nested ones.
+        '''
+        return types.MappingProxyType(self._custom_defs)
+
+    @profiling.timed('topology')
     def _topology_template(self):
         return TopologyTemplate(self._tpl_topology_template(),
-                                self._get_all_custom_defs(),
+                                self._custom_defs,
                                 self.relationship_types,
                                 self.parsed_params,
-                                None)
+                                None,
+                                self.lazy)
 
     def _inputs(self):
         return self.topology_template.inputs
@@ -177,6 +425,15 @@ class ToscaTemplate(object):
     def _policies(self):
         return self.topology_template.policies
 
+    def _graph(self):
+        return ToscaGraph(self.nodetemplates)
+
+    def _nested_tosca_templates_with_topology(self):
+        self.nested_tosca_templates_with_topology = []
+        if self._has_topology_template():
+            self._handle_nested_tosca_templates_with_topology()
+        return self.nested_tosca_templates_with_topology
+
     def _get_all_custom_defs(self, imports=None, path=None):
         types = [IMPORTS, NODE_TYPES, CAPABILITY_TYPES, RELATIONSHIP_TYPES,
                  DATA_TYPES, INTERFACE_TYPES, POLICY_TYPES, GROUP_TYPES]
@@ -194,8 +451,9 @@ class ToscaTemplate(object):
 
         # As imports are not custom_types, removing from the dict
         custom_defs_final.pop(IMPORTS, None)
-        return custom_defs_final
+        return CustomDefinitions(custom_defs_final, self.tosca_def)
 
+    @profiling.timed('custom_types')
     def _get_custom_types(self, type_definitions, imports=None,
                           path=None):
         """Handle custom types defined in imported template files
@@ -220,7 +478,7 @@ class ToscaTemplate(object):
         if imports:
             custom_service = toscaparser.imports.\
                 ImportsLoader(imports, path, type_defs, self.tpl,
-                              self.local_defs)
+                              self.local_defs, loaded=self._loaded_imports)
 
             nested_tosca_tpls = custom_service.get_nested_tosca_tpls()
             self._update_nested_tosca_tpls_with_topology(nested_tosca_tpls)
@@ -246,6 +504,7 @@ class ToscaTemplate(object):
                     self.nested_tosca_tpls_with_topology.keys())):
                 self.nested_tosca_tpls_with_topology.update(tpl)
 
+    @profiling.timed('nested_templates')
     def _handle_nested_tosca_templates_with_topology(self):
         for fname, tosca_tpl in self.nested_tosca_tpls_with_topology.items():
             for nodetemplate in self.nodetemplates:
@@ -255,7 +514,7 @@ class ToscaTemplate(object):
                     topology_tpl = tosca_tpl.get(TOPOLOGY_TEMPLATE)
                     topology_with_sub_mapping = TopologyTemplate(
                         topology_tpl,
-                        self._get_all_custom_defs(),
+                        self._custom_defs,
                         self.relationship_types,
                         parsed_params,
                         nodetemplate)
@@ -291,7 +550,7 @@ class ToscaTemplate(object):
                     valid_versions='", "'. join(self.VALID_TEMPLATE_VERSIONS)))
         else:
             if version not in self.MAIN_TEMPLATE_VERSIONS:
-                update_definitions(version)
+                self.tosca_def = get_definitions(version)
 
     def _get_path(self, path):
         if path.lower().endswith('.yaml') or path.lower().endswith('.yml'):
@@ -300,27 +559,33 @@ class ToscaTemplate(object):
             # a CSAR archive
             csar = CSAR(path, self.a_file)
             if csar.validate():
-                csar.decompress()
-                self.a_file = True  # the file has been decompressed locally
-                return os.path.join(csar.temp_dir, csar.get_main_template())
+                # the files are read from the archive while parsing, they
+                # are extracted when self.path is used after the parse
+                self.csar = csar
+                csar.filesystem.mount()
+                self.a_file = True
+                return csar.get_main_template_path()
         else:
             ExceptionCollector.appendException(
                 ValueError(_('"%(path)s" is not a valid file.')
                            % {'path': path}))
 
     def verify_template(self):
-        if ExceptionCollector.exceptionsCaught():
+        exceptions = self._collector.exceptions
+        if exceptions:
             if self.input_path:
                 raise ValidationError(
                     message=(_('\nThe input "%(path)s" failed validation with '
                                'the following error(s): \n\n\t')
                              % {'path': self.input_path}) +
-                    '\n\t'.join(ExceptionCollector.getExceptionsReport()))
+                    '\n\t'.join(ExceptionCollector.getExceptionsReport(
+                        exceptions=exceptions)))
             else:
                 raise ValidationError(
                     message=_('\nThe pre-parsed input failed validation with '
                               'the following error(s): \n\n\t') +
-                    '\n\t'.join(ExceptionCollector.getExceptionsReport()))
+                    '\n\t'.join(ExceptionCollector.getExceptionsReport(
+                        exceptions=exceptions)))
         else:
             if self.input_path:
                 msg = (_('The input "%(path)s" successfully passed '
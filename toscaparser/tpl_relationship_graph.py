@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from toscaparser.utils import profiling
+
 
 class ToscaGraph(object):
     '''Graph of Tosca Node Templates.'''
@@ -35,12 +37,29 @@ class ToscaGraph(object):
     def __iter__(self):
         return iter(self.vertices.values())
 
+    @profiling.timed('graph')
     def _create(self):
+        nodetemplates = {tpl.name: tpl for tpl in self.nodetemplates}
         for node in self.nodetemplates:
-            relation = node.relationships
-            if relation:
-                for rel, nodetpls in relation.items():
-                    for tpl in self.nodetemplates:
-                        if tpl.name == nodetpls.name:
-                            self._create_edge(node, tpl, rel)
-            self._create_vertex(node)
+            self._add_node(node, nodetemplates)
+
+    def _add_node(self, node, nodetemplates):
+        relation = node.relationships
+        if relation:
+            for rel, nodetpls in relation.items():
+                tpl = nodetemplates.get(nodetpls.name)
+                if tpl is not None:
+                    self._create_edge(node, tpl, rel)
+        self._create_vertex(node)
+
+    def update(self, nodetemplates):
+        '''Update the graph after nodetemplates were parsed again.
+
+        The vertices of the node templates removed from the list of the
+        graph are removed.
+        '''
+        names = {tpl.name: tpl for tpl in self.nodetemplates}
+        for node in nodetemplates:
+            self._add_node(node, names)
+        self.vertices = {name: self.vertices[name] for name in names
+                         if name in self.vertices}
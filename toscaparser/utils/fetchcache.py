@@ -0,0 +1,274 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+'''Cache of the remote files fetched while parsing templates.
+
+Remote imports and CSAR archives are downloaded on every parse unless a
+fetch cache is configured, e.g.:
+
+    from toscaparser.utils import fetchcache
+    fetchcache.set_fetch_cache(
+        fetchcache.DirectoryCache('/var/cache/tosca-parser',
+                                  max_size=512 * 1024 * 1024))
+
+The cached copy of a URL is revalidated with the server using its ETag and
+Last-Modified headers before being used, unless the cache is offline.
+'''
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from toscaparser.utils.gettextutils import _
+
+log = logging.getLogger('tosca')
+
+CACHED_SCHEMES = ('http', 'https')
+
+_fetch_cache = None
+
+
+def set_fetch_cache(cache):
+    '''Use cache for the remote files fetched, or no cache if None.'''
+    global _fetch_cache
+    _fetch_cache = cache
+
+
+def get_fetch_cache():
+    '''Return the fetch cache in use, None if remote files are not cached.'''
+    return _fetch_cache
+
+
+class CacheEntry(object):
+    '''A remote file stored in a fetch cache.'''
+
+    def __init__(self, url, path, etag=None, last_modified=None):
+        self.url = url
+        self.path = path
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class FetchCache(object):
+    '''Base class of the fetch caches.
+
+    A backend stores the content of URLs with the validators returned by
+    the server. The fetching and revalidation logic is shared by every
+    backend.
+    '''
+
+    def __init__(self, offline=False, timeout=None):
+        # an offline cache never contacts the servers
+        self.offline = offline
+        self.timeout = timeout
+
+    def lookup(self, url):
+        '''Return the CacheEntry of url, None if it is not cached.'''
+        raise NotImplementedError()
+
+    def store(self, url, content, etag=None, last_modified=None):
+        '''Store the content of url and return its CacheEntry.'''
+        raise NotImplementedError()
+
+    def touch(self, entry):
+        '''Record that a cached entry was used.'''
+
+    def invalidate(self, url=None):
+        '''Remove url from the cache, or everything if url is None.'''
+        raise NotImplementedError()
+
+    def fetch(self, url):
+        '''Return the CacheEntry of url, fetching it if needed.
+
+        urllib.error.URLError is raised if the URL cannot be fetched and
+        there is no cached copy of it, or if the server returns a client
+        error, e.g. 404, which the cached copy does not hide.
+        '''
+        entry = self.lookup(url)
+        if self.offline:
+            if entry is None:
+                raise urllib.error.URLError(
+                    _('"%s" is not cached and the cache is offline') % url)
+            self.touch(entry)
+            return entry
+
+        request = urllib.request.Request(url)
+        if entry is not None:
+            if entry.etag:
+                request.add_header('If-None-Match', entry.etag)
+            if entry.last_modified:
+                request.add_header('If-Modified-Since', entry.last_modified)
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if entry is None:
+                raise
+            if e.code != 304:
+                if e.code < 500:
+                    raise
+                # a server error is transient, the cached copy is used
+                log.warning(_('Using the cached copy of "%(url)s", it cannot '
+                              'be revalidated: HTTP Error %(code)s')
+                            % {'url': url, 'code': e.code})
+            self.touch(entry)
+            return entry
+        except urllib.error.URLError as e:
+            if entry is None:
+                raise
+            log.warning(_('Using the cached copy of "%(url)s", it cannot be '
+                          'revalidated: %(reason)s')
+                        % {'url': url, 'reason': e.reason})
+            self.touch(entry)
+            return entry
+        with response:
+            content = response.read()
+            headers = response.headers
+        return self.store(url, content, headers.get('ETag'),
+                          headers.get('Last-Modified'))
+
+
+class DirectoryCache(FetchCache):
+    '''Fetch cache storing the files in a local directory.
+
+    The content is stored once per distinct content, named after its
+    SHA-256 digest, and every URL refers to the content it returned. When
+    the size of the stored content goes over max_size bytes, the least
+    recently used URLs are removed.
+    '''
+
+    def __init__(self, directory, max_size=None, offline=False,
+                 timeout=None):
+        super(DirectoryCache, self).__init__(offline, timeout)
+        self.directory = directory
+        self.max_size = max_size
+        self._blobs = os.path.join(directory, 'blobs')
+        self._urls = os.path.join(directory, 'urls')
+        self._lock = threading.Lock()
+        os.makedirs(self._blobs, exist_ok=True)
+        os.makedirs(self._urls, exist_ok=True)
+
+    def _url_file(self, url):
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self._urls, name + '.json')
+
+    def _write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def lookup(self, url):
+        try:
+            with open(self._url_file(url)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        path = os.path.join(self._blobs, meta['digest'])
+        if meta.get('url') != url or not os.path.isfile(path):
+            return None
+        return CacheEntry(url, path, meta.get('etag'),
+                          meta.get('last_modified'))
+
+    def store(self, url, content, etag=None, last_modified=None):
+        digest = hashlib.sha256(content).hexdigest()
+        path = os.path.join(self._blobs, digest)
+        meta = {'url': url, 'digest': digest, 'etag': etag,
+                'last_modified': last_modified}
+        with self._lock:
+            if not os.path.isfile(path):
+                self._write(path, content)
+            self._write(self._url_file(url),
+                        json.dumps(meta).encode('utf-8'))
+            self._evict(keep=digest)
+        return CacheEntry(url, path, etag, last_modified)
+
+    def touch(self, entry):
+        try:
+            os.utime(self._url_file(entry.url))
+        except OSError:
+            pass
+
+    def invalidate(self, url=None):
+        with self._lock:
+            if url is None:
+                urls = [os.path.join(self._urls, name)
+                        for name in os.listdir(self._urls)]
+            else:
+                urls = [self._url_file(url)]
+            for url_file in urls:
+                try:
+                    os.remove(url_file)
+                except OSError:
+                    pass
+            self._evict()
+
+    def _evict(self, keep=None):
+        '''Remove unused content and the least recently used URLs.'''
+        entries = []
+        used = {}
+        for name in os.listdir(self._urls):
+            url_file = os.path.join(self._urls, name)
+            try:
+                with open(url_file) as f:
+                    digest = json.load(f)['digest']
+                mtime = os.path.getmtime(url_file)
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append((mtime, url_file, digest))
+            used[digest] = used.get(digest, 0) + 1
+
+        sizes = {}
+        for digest in os.listdir(self._blobs):
+            path = os.path.join(self._blobs, digest)
+            if digest in used:
+                sizes[digest] = os.path.getsize(path)
+            elif digest != keep and len(digest) == 64:
+                # content not referenced by any URL anymore
+                os.remove(path)
+
+        if self.max_size is None:
+            return
+        total = sum(sizes.values())
+        for mtime, url_file, digest in sorted(entries):
+            if total <= self.max_size:
+                break
+            if digest == keep:
+                continue
+            os.remove(url_file)
+            used[digest] -= 1
+            if not used[digest]:
+                os.remove(os.path.join(self._blobs, digest))
+                total -= sizes[digest]
+
+
+def is_cached_url(url):
+    '''Return True if url is fetched through the fetch cache.'''
+    return (_fetch_cache is not None and
+            urllib.parse.urlparse(url).scheme in CACHED_SCHEMES)
+
+
+def fetch(url):
+    '''Return the content of url, from the fetch cache if possible.'''
+    if is_cached_url(url):
+        return _fetch_cache.fetch(url).read()
+    with urllib.request.urlopen(url) as response:
+        return response.read()
@@ -0,0 +1,179 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+'''Seekable files over HTTP, to read remote archives without downloading.
+
+open_url() returns a file object zipfile can read a remote CSAR from. When
+the server supports range requests only the parts of the file being read
+are fetched, e.g. the central directory of the archive and the templates,
+never its large artifacts. Otherwise the file is streamed to a temporary
+file, kept in memory only while it is small.
+'''
+
+import collections
+import io
+import re
+import tempfile
+import threading
+
+import requests
+
+from toscaparser.utils.gettextutils import _
+from toscaparser.utils import profiling
+
+# size of the blocks fetched with range requests
+BLOCK_SIZE = 64 * 1024
+# number of blocks kept in memory
+MAX_BLOCKS = 64
+# size of the content kept in memory when the file has to be downloaded
+SPOOL_SIZE = 16 * 1024 * 1024
+
+_CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+
+class HTTPRangeFile(io.RawIOBase):
+    '''Read-only seekable file reading a URL with HTTP range requests.
+
+    The blocks read are cached, up to MAX_BLOCKS of them, the least
+    recently used being dropped first.
+    '''
+
+    def __init__(self, url, size, tail=b'', timeout=None):
+        super(HTTPRangeFile, self).__init__()
+        self.url = url
+        self.size = size
+        self.timeout = timeout
+        self.requests = 0
+        self._pos = 0
+        self._blocks = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # keep the blocks fully covered by the end of the file already read
+        start = size - len(tail)
+        first = -(-start // BLOCK_SIZE)
+        for index in range(first, self._block_count()):
+            offset = index * BLOCK_SIZE - start
+            self._blocks[index] = tail[offset:offset + BLOCK_SIZE]
+
+    def _block_count(self):
+        return -(-self.size // BLOCK_SIZE)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(_('Negative seek position %d.') % offset)
+        self._pos = offset
+        return offset
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def read(self, size=-1):
+        with self._lock:
+            end = self.size if size is None or size < 0 else \
+                min(self.size, self._pos + size)
+            if self._pos >= end:
+                return b''
+            first = self._pos // BLOCK_SIZE
+            last = (end - 1) // BLOCK_SIZE
+            blocks = self._get_blocks(first, last)
+            data = b''.join(blocks)
+            offset = self._pos - first * BLOCK_SIZE
+            data = data[offset:offset + end - self._pos]
+            self._pos = end
+            return data
+
+    def readall(self):
+        return self.read()
+
+    def _get_blocks(self, first, last):
+        blocks = {}
+        missing = []
+        for index in range(first, last + 1):
+            if index in self._blocks:
+                self._blocks.move_to_end(index)
+                blocks[index] = self._blocks[index]
+            else:
+                missing.append(index)
+        # fetch each run of consecutive missing blocks with one request
+        run = []
+        for index in missing + [None]:
+            if run and (index is None or index != run[-1] + 1):
+                blocks.update(self._fetch(run[0], run[-1]))
+                run = []
+            if index is not None:
+                run.append(index)
+        return [blocks[index] for index in range(first, last + 1)]
+
+    def _fetch(self, first, last):
+        start = first * BLOCK_SIZE
+        end = min(self.size, (last + 1) * BLOCK_SIZE) - 1
+        self.requests += 1
+        profiling.count('http.range_requests')
+        response = requests.get(self.url, timeout=self.timeout,
+                                headers={'Range': 'bytes=%d-%d'
+                                         % (start, end)})
+        if response.status_code != 206:
+            raise IOError(_('The server of "%(url)s" did not return the '
+                            'range requested, status %(status)s.')
+                          % {'url': self.url,
+                             'status': response.status_code})
+        content = response.content
+        blocks = {}
+        for index in range(first, last + 1):
+            offset = (index - first) * BLOCK_SIZE
+            blocks[index] = self._blocks[index] = \
+                content[offset:offset + BLOCK_SIZE]
+        while len(self._blocks) > MAX_BLOCKS:
+            self._blocks.popitem(last=False)
+        return blocks
+
+
+def _spool(response):
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    for chunk in response.iter_content(BLOCK_SIZE):
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def open_url(url, timeout=None):
+    '''Return a seekable file object with the content of url.
+
+    The end of the file is requested first, which for a zip archive
+    includes its central directory. If the server returns the whole file
+    instead of that range, the file is downloaded.
+    '''
+    response = requests.get(url, timeout=timeout, stream=True,
+                            headers={'Range': 'bytes=-%d' % BLOCK_SIZE})
+    with response:
+        response.raise_for_status()
+        match = _CONTENT_RANGE.match(
+            response.headers.get('Content-Range', ''))
+        if response.status_code != 206 or not match:
+            return _spool(response)
+        tail = response.content
+    profiling.count('http.range_requests')
+    return HTTPRangeFile(url, int(match.group(3)), tail, timeout)
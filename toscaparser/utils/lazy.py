@@ -0,0 +1,47 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+# computing an attribute may need another one
+_lock = threading.RLock()
+
+
+class LazyAttribute(object):
+    '''Class attribute computed when first accessed, e.g.:
+
+        class ToscaTemplate(object):
+            @LazyAttribute
+            def VALID_TEMPLATE_VERSIONS(cls):
+                return ...
+
+    The value then replaces the descriptor in the class, where it is a
+    plain class attribute: it is only computed once and can be changed
+    like any other. This defers the work done by class definitions, e.g.
+    the discovery of the extensions, from the import of their module.
+    '''
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance, owner):
+        with _lock:
+            value = self.owner.__dict__.get(self.name, self)
+            if value is self:
+                value = self.func(self.owner)
+                setattr(self.owner, self.name, value)
+        return value
@@ -0,0 +1,220 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+'''Timers and counters of the parsing phases.
+
+The parser reports how long its phases take and how often some operations
+happen to the profiling hook in use. Nothing is measured when there is no
+hook, e.g. to get a report of the parsing of a template:
+
+    from toscaparser.utils import profiling
+    with profiling.profile(profiling.Profiler()) as profiler:
+        ToscaTemplate(path)
+    print(profiler.report())
+
+Timers are inclusive: the time of a phase includes the time of the phases
+run while it runs, e.g. the YAML files loaded by the imports.
+'''
+
+import collections
+import contextlib
+import contextvars
+import functools
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+_hook = contextvars.ContextVar('tosca_profiling_hook', default=None)
+
+
+class ProfilingHook(object):
+    '''Base class of the objects receiving the timers and counters.'''
+
+    def start(self):
+        '''Called when the hook is installed by profile().'''
+
+    def stop(self):
+        '''Called when the hook is removed by profile().'''
+
+    def timer_started(self, name):
+        '''Called when the phase name starts.
+
+        The value returned is passed to timer_stopped() for the same phase.
+        '''
+
+    def timer_stopped(self, name, elapsed, state):
+        '''Called when the phase name ends, after elapsed seconds.'''
+
+    def counted(self, name, value):
+        '''Called when value is added to the counter name.'''
+
+
+def get_hook():
+    '''Return the profiling hook in use, None if there is none.'''
+    return _hook.get()
+
+
+def set_hook(hook):
+    '''Use hook for the parsing done in the current context.'''
+    _hook.set(hook)
+
+
+@contextlib.contextmanager
+def profile(hook):
+    '''Use hook for the parsing done in the block.'''
+    token = _hook.set(hook)
+    hook.start()
+    try:
+        yield hook
+    finally:
+        hook.stop()
+        _hook.reset(token)
+
+
+@contextlib.contextmanager
+def timer(name):
+    '''Time the block as the phase name.'''
+    hook = _hook.get()
+    if hook is None:
+        yield
+        return
+    state = hook.timer_started(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        hook.timer_stopped(name, time.perf_counter() - start, state)
+
+
+def timed(name):
+    '''Decorator timing each call of a function as the phase name.'''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            hook = _hook.get()
+            if hook is None:
+                return func(*args, **kwargs)
+            state = hook.timer_started(name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hook.timer_stopped(name, time.perf_counter() - start, state)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    '''Add value to the counter name.'''
+    hook = _hook.get()
+    if hook is not None:
+        hook.counted(name, value)
+
+
+def import_time(module='toscaparser.tosca_template', runs=5):
+    '''Return the seconds taken to import module in a new interpreter.
+
+    This is the fixed cost paid by each short-lived program using the
+    parser. The best time of runs interpreters is returned.
+    '''
+    code = ('import time; start = time.perf_counter(); import %s; '
+            'print(time.perf_counter() - start)' % module)
+    return min(float(subprocess.check_output([sys.executable, '-c', code]))
+               for run in range(runs))
+
+
+class TimerStats(object):
+    '''Accumulated measures of a phase.'''
+
+    def __init__(self):
+        self.calls = 0
+        self.elapsed = 0.0
+        # net memory allocated, only known when allocations are traced
+        self.allocated = None
+
+
+class Profiler(ProfilingHook):
+    '''Profiling hook accumulating the timers and counters.
+
+    With trace_allocations set to True the memory allocated by each phase
+    is measured as well, using tracemalloc. This slows the parsing down
+    noticeably and the measure is approximate when phases run in parallel
+    threads.
+    '''
+
+    def __init__(self, trace_allocations=False):
+        self.trace_allocations = trace_allocations
+        self.timers = collections.OrderedDict()
+        self.counters = collections.OrderedDict()
+        self.peak_memory = None
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    def start(self):
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        if self._tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _tracing(self):
+        return self.trace_allocations and tracemalloc.is_tracing()
+
+    def timer_started(self, name):
+        with self._lock:
+            if name not in self.timers:
+                # phases are reported in the order they first started
+                self.timers[name] = TimerStats()
+        if self._tracing():
+            return tracemalloc.get_traced_memory()[0]
+
+    def timer_stopped(self, name, elapsed, state):
+        allocated = None
+        if state is not None and self._tracing():
+            allocated = tracemalloc.get_traced_memory()[0] - state
+        with self._lock:
+            stats = self.timers[name]
+            stats.calls += 1
+            stats.elapsed += elapsed
+            if allocated is not None:
+                stats.allocated = (stats.allocated or 0) + allocated
+
+    def counted(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self):
+        '''Return a text report of the measures.'''
+        lines = ['%-32s %8s %12s %14s' % ('phase', 'calls', 'time (ms)',
+                                          'memory (KiB)')]
+        for name, stats in self.timers.items():
+            allocated = '-' if stats.allocated is None else \
+                '%.1f' % (stats.allocated / 1024.0)
+            lines.append('%-32s %8d %12.2f %14s'
+                         % (name, stats.calls, stats.elapsed * 1000,
+                            allocated))
+        if self.peak_memory is not None:
+            lines.append('peak memory: %.1f KiB'
+                         % (self.peak_memory / 1024.0))
+        if self.counters:
+            lines.append('')
+            lines.append('%-32s %8s' % ('counter', 'value'))
+            for name, value in self.counters.items():
+                lines.append('%-32s %8d' % (name, value))
+        return '\n'.join(lines)
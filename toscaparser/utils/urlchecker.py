@@ -0,0 +1,103 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from concurrent import futures
+import contextvars
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+from toscaparser.utils import profiling
+from toscaparser.utils.urlutils import URL_TIMEOUT
+from toscaparser.utils.urlutils import UrlUtils
+
+log = logging.getLogger('tosca')
+
+
+class URLChecker(object):
+    '''Check whether URLs are accessible, several at a time.
+
+    Each URL is checked with UrlUtils.url_accessible(), at most max_workers
+    at the same time and at most max_per_host at the same time on a
+    server. The results are kept for cache_ttl seconds, so a URL referenced
+    several times is only checked once.
+    '''
+
+    def __init__(self, max_workers=16, max_per_host=4, timeout=URL_TIMEOUT,
+                 cache_ttl=300):
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def check(self, urls):
+        '''Return whether each of the URLs is accessible, in their order.'''
+        results = {}
+        pending = []
+        seen = set()
+        now = time.monotonic()
+        with self._lock:
+            for url in urls:
+                cached = self._cache.get(url)
+                if cached is not None and now - cached[0] < self.cache_ttl:
+                    results[url] = cached[1]
+                elif url not in seen:
+                    seen.add(url)
+                    pending.append(url)
+
+        if len(pending) <= 1 or self.max_workers <= 1:
+            checked = [self._check(url) for url in pending]
+        else:
+            workers = min(self.max_workers, len(pending))
+            with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                tasks = [executor.submit(contextvars.copy_context().run,
+                                         self._check, url)
+                         for url in pending]
+                checked = [task.result() for task in tasks]
+
+        now = time.monotonic()
+        with self._lock:
+            for url, accessible in zip(pending, checked):
+                self._cache[url] = (now, accessible)
+                results[url] = accessible
+        return [results[url] for url in urls]
+
+    def is_accessible(self, url):
+        '''Return whether url is accessible.'''
+        return self.check([url])[0]
+
+    def clear(self):
+        '''Forget the results of the URLs already checked.'''
+        with self._lock:
+            self._cache.clear()
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(
+                    self.max_per_host)
+            return self._hosts[host]
+
+    def _check(self, url):
+        profiling.count('urls.checked')
+        with self._host_limit(url):
+            try:
+                return bool(UrlUtils.url_accessible(url, self.timeout))
+            except Exception as e:
+                log.debug('"%(url)s" is not accessible: %(error)s'
+                          % {'url': url, 'error': e})
+                return False
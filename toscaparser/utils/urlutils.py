@@ -11,14 +11,40 @@
 #    under the License.
 
 
+import threading
 import urllib.request as urllib2
 
 from urllib.parse import urljoin
 from urllib.parse import urlparse
 
+import requests
+import requests.adapters
+
 from toscaparser.common.exception import ExceptionCollector
 from toscaparser.utils.gettextutils import _
 
+# seconds to wait for a server when checking a URL
+URL_TIMEOUT = 30
+# connections kept open per host by the session checking URLs
+POOL_SIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    '''Return the HTTP session shared by the URL checks.'''
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
 
 class UrlUtils(object):
 
@@ -52,10 +78,21 @@ class UrlUtils(object):
         return urljoin(url, relative_path)
 
     @staticmethod
-    def url_accessible(url):
+    def url_accessible(url, timeout=URL_TIMEOUT):
         """Validates whether the given URL is accessible.
 
-        Returns true if the get call returns a 200 response code.
-        Otherwise, returns false.
+        Returns true if the URL returns a 200 response code, otherwise
+        returns false. HTTP URLs are checked with a HEAD request, or a GET
+        request not reading the content if the server does not support
+        HEAD, through a shared pool of connections.
         """
-        return urllib2.urlopen(url).getcode() == 200
+        if urlparse(url).scheme not in ('http', 'https'):
+            with urllib2.urlopen(url, timeout=timeout) as response:
+                return response.getcode() == 200
+        session = get_session()
+        response = session.head(url, allow_redirects=True, timeout=timeout)
+        if response.status_code in (405, 501):
+            with session.get(url, allow_redirects=True, stream=True,
+                             timeout=timeout) as response:
+                return response.status_code == 200
+        return response.status_code == 200
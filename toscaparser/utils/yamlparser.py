@@ -11,6 +11,13 @@
 #    under the License.
 
 import codecs
+import collections
+import contextlib
+import contextvars
+import hashlib
+import os
+import pickle
+import threading
 import urllib
 import yaml
 
@@ -18,7 +25,10 @@ from collections import OrderedDict
 
 from toscaparser.common.exception import ExceptionCollector
 from toscaparser.common.exception import URLException
+from toscaparser.utils import fetchcache
 from toscaparser.utils.gettextutils import _
+from toscaparser.utils import profiling
+from toscaparser.utils import zipfs
 
 
 if hasattr(yaml, 'CSafeLoader'):
@@ -27,15 +37,129 @@ else:
     yaml_loader = yaml.SafeLoader
 
 
+# files loaded in the current context, see record_loads()
+_loads = contextvars.ContextVar('tosca_yaml_loads', default=None)
+
+
+@contextlib.contextmanager
+def record_loads():
+    '''Record the files loaded by load_yaml() in the block.
+
+    A list is yielded, to which a (path, a_file, digest) tuple is added for
+    every file loaded, digest being the SHA-256 digest of its content.
+    '''
+    loads = []
+    token = _loads.set(loads)
+    try:
+        yield loads
+    finally:
+        _loads.reset(token)
+
+
+def _record_load(path, a_file, contents, digest=None):
+    loads = _loads.get()
+    if loads is not None:
+        if digest is None:
+            if isinstance(contents, str):
+                contents = contents.encode('utf-8')
+            digest = hashlib.sha256(contents).hexdigest()
+        loads.append((path, a_file, digest))
+
+
+# the content of the local files loaded, shared by the templates parsed in
+# the process, see set_load_cache()
+_load_cache = None
+
+
+def set_load_cache(cache):
+    '''Share the local files loaded with cache, or nothing if None.'''
+    global _load_cache
+    _load_cache = cache
+
+
+def get_load_cache():
+    '''Return the load cache in use, None if the files are not shared.'''
+    return _load_cache
+
+
+class LoadCache(object):
+    '''Content of the local YAML files loaded, shared between templates.
+
+    Used to parse many templates importing the same files, e.g. in a
+    batch. A file is loaded again only if its modification time or size
+    changed. The content is kept serialized, each load returns a new copy
+    of it, which the template loading it may modify. At most max_size
+    files are kept, the least recently used ones are dropped first.
+    '''
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path):
+        '''Return the content of the YAML file path.'''
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        stat = stat.st_mtime_ns, stat.st_size
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stat:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                entry = None
+                self.misses += 1
+        if entry is not None:
+            _record_load(path, True, None, entry[1])
+            return pickle.loads(entry[2])
+
+        with open(path, 'rb') as f:
+            contents = f.read()
+        digest = hashlib.sha256(contents).hexdigest()
+        _record_load(path, True, None, digest)
+        tpl = yaml.load(contents.decode('utf-8'), Loader=yaml_loader)
+        entry = (stat, digest, pickle.dumps(tpl, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return tpl
+
+    def clear(self):
+        '''Drop all the files loaded.'''
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@profiling.timed('yaml.load')
 def load_yaml(path, a_file=True):
     f = None
     try:
-        if a_file:
+        if a_file and zipfs.lookup(path) is not None:
+            # a file of a CSAR, read from the archive
+            contents = zipfs.read(path).decode('utf-8')
+            _record_load(path, a_file, contents)
+            return yaml.load(contents, Loader=yaml_loader)
+        elif a_file and _load_cache is not None:
+            return _load_cache.load(path)
+        elif a_file:
             f = codecs.open(path, encoding='utf-8', errors='strict')
+        elif fetchcache.is_cached_url(path):
+            contents = fetchcache.fetch(path)
+            _record_load(path, a_file, contents)
+            return yaml.load(contents, Loader=yaml_loader)
         else:
             f = urllib.request.urlopen(path)
         contents = f.read()
         f.close()
+        _record_load(path, a_file, contents)
         return yaml.load(contents, Loader=yaml_loader)
     except urllib.error.URLError as e:
         if hasattr(e, 'reason'):
@@ -0,0 +1,161 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+'''Read the files of a zip archive in place.
+
+A ZipFileSystem shows the files of an archive as if it was extracted to a
+directory, its root, without extracting anything. Once mounted, the paths
+under its root are understood by isfile() and read() of this module, which
+the template loaders use instead of the os functions, so templates and
+their imports are read straight from a CSAR.
+
+The root directory is only created when the archive is extracted, for the
+callers that need the files on disk.
+'''
+
+import contextlib
+import errno
+import os
+import posixpath
+import shutil
+import tempfile
+import threading
+import uuid
+
+_mounts = {}
+_lock = threading.Lock()
+
+
+def _new_root():
+    return os.path.join(tempfile.gettempdir(),
+                        'tosca-csar-' + uuid.uuid4().hex)
+
+
+class ZipFileSystem(object):
+    '''Files of a zip archive seen as if extracted to the directory root.'''
+
+    def __init__(self, zfile, root=None):
+        self.zfile = zfile
+        self.root = os.path.abspath(root) if root else _new_root()
+        self.extracted = False
+        self._files = {}
+        self._dirs = set()
+        for info in zfile.infolist():
+            name = posixpath.normpath(info.filename)
+            if info.is_dir():
+                self._dirs.add(name)
+                continue
+            self._files[name] = info
+            parent = posixpath.dirname(name)
+            while parent and parent not in self._dirs:
+                self._dirs.add(parent)
+                parent = posixpath.dirname(parent)
+
+    def __deepcopy__(self, memo):
+        # the archive is only read, it is shared by the copies
+        return self
+
+    def member(self, path):
+        '''Return the name in the archive of path, None if not under root.'''
+        path = os.path.abspath(path)
+        if path == self.root:
+            return ''
+        prefix = self.root + os.sep
+        if not path.startswith(prefix):
+            return None
+        return path[len(prefix):].replace(os.sep, '/')
+
+    def isfile(self, path):
+        return self.member(path) in self._files
+
+    def isdir(self, path):
+        name = self.member(path)
+        return name == '' or name in self._dirs
+
+    def exists(self, path):
+        return self.isfile(path) or self.isdir(path)
+
+    def read(self, path):
+        '''Return the content of the file path, read from the archive.'''
+        name = self.member(path)
+        if name not in self._files:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT),
+                                    path)
+        return self.zfile.read(self._files[name])
+
+    def extract(self, path=None):
+        '''Extract the file path, or the whole archive, under root.
+
+        Return the path of what was extracted on disk.
+        '''
+        if path is None:
+            if not self.extracted:
+                self.zfile.extractall(self.root)
+                self.extracted = True
+            return self.root
+        name = self.member(path)
+        if name not in self._files:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT),
+                                    path)
+        return self.zfile.extract(self._files[name], self.root)
+
+    def cleanup(self):
+        '''Remove the files extracted on disk, if any.'''
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.extracted = False
+
+    def mount(self):
+        '''Make the files readable through the functions of this module.'''
+        with _lock:
+            _mounts[self.root] = self
+
+    def unmount(self):
+        with _lock:
+            if _mounts.get(self.root) is self:
+                del _mounts[self.root]
+
+    @contextlib.contextmanager
+    def mounted(self):
+        '''Mount the file system for the duration of the block.'''
+        self.mount()
+        try:
+            yield self
+        finally:
+            self.unmount()
+
+
+def lookup(path):
+    '''Return the mounted ZipFileSystem path belongs to, None if none.'''
+    if not _mounts:
+        return None
+    with _lock:
+        mounts = list(_mounts.values())
+    for fs in mounts:
+        if fs.member(path) is not None:
+            return fs
+
+
+def isfile(path):
+    '''os.path.isfile() also aware of the mounted archives.'''
+    fs = lookup(path)
+    if fs is not None:
+        return fs.isfile(path)
+    return os.path.isfile(path)
+
+
+def read(path):
+    '''Return the content of the file path, in a mounted archive or not.'''
+    fs = lookup(path)
+    if fs is not None:
+        return fs.read(path)
+    with open(path, 'rb') as f:
+        return f.read()